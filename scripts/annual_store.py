@@ -0,0 +1,276 @@
+"""年度序列共享存储：按年份对齐的 float64 列，内存映射后供各课程直接切片连接。
+
+GISTEMP J-D、CO₂ 年均、GMSL 年均、树轮、δ18O 等年序列写入同一个文件：
+
+- 行为连续年份 `year0 .. year0 + n_years - 1`，每个序列占一列，无数据的年份为 NaN；
+- 数值按列连续存放（列优先），任一序列在任一年份区间上的切片都是零拷贝视图；
+- 文件布局：魔数 + 头长度 + JSON 头（年份起点、列名、各列有效年份范围、输入指纹）+ 填充至
+  64 字节对齐 + 小端 float64 数据块。
+
+`AnnualSeriesStore` 以只读 `np.memmap` 打开：并行分支各自映射同一文件，数据页由操作系统页缓存
+共享，不经 pickle 复制。课程按年份连接两个序列时只需 `store.join("co2_annual", "gistemp_jd")`，
+在两列有效范围的交集上切片并剔除 NaN，不再构建 `{年份: 数值}` 字典或做集合求交。
+
+存储属于运行缓存（`.cache/annual-store`），按输入文件 SHA256 与解析器版本计算指纹；指纹不变时
+直接复用，否则重新解析并以临时文件 + 原子替换写出。它不经输出事务暂存，以便同一次运行中
+后续分支立即映射读取。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+from file_hashing import memoized_sha256
+from lazy_imports import lazy_module
+from series import ColumnarSeries
+
+np = lazy_module("numpy")
+
+
+STORE_MAGIC = b"CGAS1\n"
+STORE_FORMAT_VERSION = "1"
+DATA_ALIGNMENT = 64
+
+
+@dataclass(frozen=True)
+class AnnualColumn:
+    """存储中的一列：由一个原始文件经解析函数得到的年序列。
+
+    Attributes:
+        name: 列名（如 `gistemp_jd`）。
+        path: 原始文件路径；文件不存在时该列不写入存储。
+        load: 解析函数 `load(path) -> ColumnarSeries`（年份须唯一）；其 `version` 属性
+            （`cached_parser` 提供）计入指纹。
+    """
+
+    name: str
+    path: str
+    load: Callable[[str], ColumnarSeries]
+
+
+class AnnualSeriesStore:
+    """只读映射的年度序列存储。
+
+    Attributes:
+        path: 存储文件路径。
+        year0: 第 0 行对应的年份。
+        names: 列名（列顺序）。
+        spans: 列名 -> `(首个有效年份, 末个有效年份)`。
+        fingerprint: 构建时的输入指纹。
+        data: `(列数, 年数)` 只读 float64 内存映射。
+    """
+
+    def __init__(self, path: str) -> None:
+        """打开存储文件。
+
+        Raises:
+            ValueError: 魔数不匹配或文件被截断。
+        """
+
+        header, offset = read_header(path)
+        self.path = path
+        self.year0: int = header["year0"]
+        self.names: List[str] = list(header["columns"])
+        self.spans: Dict[str, Tuple[int, int]] = {k: tuple(v) for k, v in header["spans"].items()}
+        self.fingerprint: str = header.get("fingerprint", "")
+        shape = (len(self.names), int(header["n_years"]))
+        if os.path.getsize(path) < offset + 8 * shape[0] * shape[1]:
+            raise ValueError(f"年度序列存储被截断: {path}")
+        if shape[0] * shape[1] == 0:
+            self.data = np.empty(shape, dtype="<f8")
+        else:
+            self.data = np.memmap(path, dtype="<f8", mode="r", offset=offset, shape=shape)
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def __reduce__(self):
+        # 跨进程传递时只传路径，接收方重新映射同一文件
+        return (AnnualSeriesStore, (self.path,))
+
+    @property
+    def n_years(self) -> int:
+        return int(self.data.shape[1])
+
+    @property
+    def years(self) -> np.ndarray:
+        return np.arange(self.year0, self.year0 + self.n_years, dtype=np.int64)
+
+    def _row(self, year: int) -> int:
+        return min(max(int(year) - self.year0, 0), self.n_years)
+
+    def column(self, name: str) -> np.ndarray:
+        """返回整列视图（零拷贝，只读）。
+
+        Raises:
+            KeyError: 存储中没有该列。
+        """
+
+        try:
+            return self.data[self._index[name]]
+        except KeyError:
+            raise KeyError(f"年度序列存储中没有列 {name!r}（现有：{', '.join(self.names)}）") from None
+
+    def window(self, name: str, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """返回 `[start, end]` 年的 `(年份, 数值视图)`，超出存储范围的部分截去。"""
+
+        lo, hi = self._row(start), self._row(end + 1)
+        return self.years[lo:hi], self.column(name)[lo:hi]
+
+    def join(self, *names: str, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[np.ndarray, ...]:
+        """按年份内连接若干列：在各列有效范围的交集上切片，保留所有列均有值的年份。
+
+        Args:
+            names: 列名。
+            start: 起始年份（含）；缺省为各列首个有效年份的最大值。
+            end: 结束年份（含）；缺省为各列末个有效年份的最小值。
+
+        Returns:
+            `(years, values_1, ..., values_n)`：升序年份与各列对应数值（float64 副本）。
+        """
+
+        for name in names:
+            self.column(name)
+        lo_year = max(self.spans[n][0] for n in names) if start is None else start
+        hi_year = min(self.spans[n][1] for n in names) if end is None else end
+        lo, hi = self._row(lo_year), self._row(hi_year + 1)
+        block = [self.column(n)[lo:hi] for n in names]
+        if hi <= lo:
+            return (np.empty(0, dtype=np.int64),) + tuple(np.empty(0) for _ in names)
+        keep = np.logical_and.reduce([~np.isnan(b) for b in block])
+        return (self.years[lo:hi][keep],) + tuple(np.array(b[keep]) for b in block)
+
+    def series(self, name: str, record_type: Type) -> ColumnarSeries:
+        """将一列的有效年份还原为 `ColumnarSeries`（年份升序）。"""
+
+        years, values = self.join(name)
+        return ColumnarSeries(record_type, years, values)
+
+
+def read_header(path: str) -> Tuple[Dict[str, object], int]:
+    """读取存储头部。
+
+    Returns:
+        `(头部字典, 数据块偏移)`。
+
+    Raises:
+        ValueError: 魔数不匹配。
+    """
+
+    with open(path, "rb") as f:
+        prefix = f.read(len(STORE_MAGIC) + 4)
+        if len(prefix) < len(STORE_MAGIC) + 4 or not prefix.startswith(STORE_MAGIC):
+            raise ValueError(f"年度序列存储魔数不匹配: {path}")
+        (header_len,) = struct.unpack_from("<I", prefix, len(STORE_MAGIC))
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    return header, _data_offset(header_len)
+
+
+def _data_offset(header_len: int) -> int:
+    raw = len(STORE_MAGIC) + 4 + header_len
+    return -(-raw // DATA_ALIGNMENT) * DATA_ALIGNMENT
+
+
+def encode_store(named: Sequence[Tuple[str, ColumnarSeries]], fingerprint: str = "") -> bytes:
+    """将若干年序列编码为存储文件内容。
+
+    Args:
+        named: `(列名, 年序列)` 列表；各序列年份须唯一。
+        fingerprint: 写入头部的输入指纹。
+
+    Raises:
+        ValueError: 某序列年份重复。
+    """
+
+    spans: Dict[str, List[int]] = {}
+    for name, s in named:
+        if np.unique(s.years).size != len(s):
+            raise ValueError(f"年度序列 {name!r} 的年份不唯一")
+        valid = s.years[~np.isnan(s.values)]
+        if valid.size:
+            spans[name] = [int(valid.min()), int(valid.max())]
+        else:
+            spans[name] = [0, -1]
+    filled = [s for _, s in named if len(s)]
+    year0 = int(min(s.years.min() for s in filled)) if filled else 0
+    n_years = int(max(s.years.max() for s in filled)) - year0 + 1 if filled else 0
+    data = np.full((len(named), n_years), np.nan, dtype="<f8")
+    for i, (_, s) in enumerate(named):
+        data[i, s.years - year0] = s.values
+
+    header = json.dumps(
+        {
+            "format": STORE_FORMAT_VERSION,
+            "year0": year0,
+            "n_years": n_years,
+            "columns": [name for name, _ in named],
+            "spans": spans,
+            "fingerprint": fingerprint,
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+    prefix = STORE_MAGIC + struct.pack("<I", len(header)) + header
+    padding = b"\0" * (_data_offset(len(header)) - len(prefix))
+    return prefix + padding + data.tobytes()
+
+
+def columns_fingerprint(columns: Sequence[AnnualColumn]) -> str:
+    """由列名、输入文件 SHA256 与解析器版本计算存储指纹（缺失的输入文件记为空）。"""
+
+    parts = [STORE_FORMAT_VERSION]
+    for col in columns:
+        digest = memoized_sha256(col.path) if os.path.isfile(col.path) else ""
+        parts.append([col.name, digest, getattr(col.load, "__name__", ""), getattr(col.load, "version", "")])
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def ensure_annual_store(
+    path: str,
+    columns: Sequence[AnnualColumn],
+    load: Optional[Callable[[AnnualColumn], ColumnarSeries]] = None,
+) -> AnnualSeriesStore:
+    """打开年度序列存储；指纹不匹配或文件不可用时重新解析各列并写出。
+
+    单列解析失败只记警告并略去该列，不影响其余列；依赖该列的课程回退为自行加载
+    （届时按各自的容错规则报告或跳过）。
+
+    Args:
+        path: 存储文件路径。
+        columns: 列声明；原始文件缺失或解析失败的列不写入。
+        load: 重建时取列数据的函数（如经课程引擎的运行内缓存取用，避免同一文件重复解析）；
+            缺省为 `col.load(col.path)`。指纹始终按列声明中的解析器计算。
+
+    Returns:
+        已映射的存储。
+    """
+
+    fingerprint = columns_fingerprint(columns)
+    if os.path.isfile(path):
+        try:
+            header, _ = read_header(path)
+            if header.get("fingerprint") == fingerprint:
+                return AnnualSeriesStore(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"警告：年度序列存储不可用，重新构建 -> {e}")
+
+    named: List[Tuple[str, ColumnarSeries]] = []
+    for col in columns:
+        if not os.path.isfile(col.path):
+            continue
+        try:
+            named.append((col.name, load(col) if load is not None else col.load(col.path)))
+        except Exception as e:
+            print(f"警告：年度序列 {col.name} 解析失败，不写入存储 -> {e}")
+    blob = encode_store(named, fingerprint)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(blob)
+    os.replace(tmp, path)
+    return AnnualSeriesStore(path)
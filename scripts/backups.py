@@ -0,0 +1,392 @@
+"""输出文件备份管理：内容寻址去重存储 + 保留策略 + 垃圾回收。
+
+覆盖写出派生资产（CSV / JSON / 视频）前，旧文件不再就地改名为 `.bak-<时间戳>`，
+而是移入 `.cache/backups`：
+
+- `objects/<sha256 前两位>/<sha256>`：按内容寻址的备份对象，相同内容只存一份；
+- `refs/*.json`：每次备份一条引用记录（原路径、SHA256、时间），文件名唯一，
+  多个进程并发备份互不冲突。
+
+新内容与现有文件逐字节相同时直接跳过（既不备份也不重写，保留原 mtime）。
+每次备份后按保留策略（每个路径最多保留最近 N 份、且不超过最长保留天数）清理该路径的引用；
+不再被引用的对象由 `gc` 统一回收。`gc` 同时将目录树中遗留的 `*.bak-YYYYmmddHHMMSS`
+文件导入存储并删除原文件。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from file_hashing import compute_sha256
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STORE_DIR = os.path.join(BASE_DIR, ".cache", "backups")
+DEFAULT_KEEP_LAST = 5
+DEFAULT_MAX_AGE_DAYS = 30.0
+
+# gc 默认扫描遗留 .bak-* 文件的目录
+DEFAULT_GC_ROOTS = [
+    os.path.join(BASE_DIR, "assets"),
+    os.path.join(BASE_DIR, "data"),
+    os.path.join(BASE_DIR, "gh-pages-worktree", "assets"),
+    os.path.join(BASE_DIR, "climate-guardian", "public", "assets"),
+]
+
+LEGACY_BACKUP_RE = re.compile(r"^(?P<orig>.+)\.bak-(?P<ts>\d{14})$")
+
+
+@dataclass
+class BackupRef:
+    """一条备份引用记录。
+
+    Attributes:
+        path: 被备份文件的原绝对路径。
+        sha256: 备份内容的 SHA256（即对象名）。
+        size: 字节数。
+        created_ns: 备份时间（Unix 纳秒）。
+        ref_file: 引用记录文件路径。
+    """
+
+    path: str
+    sha256: str
+    size: int
+    created_ns: int
+    ref_file: str = ""
+
+
+@dataclass
+class GcReport:
+    """`gc` 的执行结果。
+
+    Attributes:
+        imported: 导入存储的遗留 `.bak-*` 文件数。
+        refs_removed: 按保留策略删除的引用数（含导入后随即过期的引用）。
+        objects_removed: 回收的无引用对象数。
+        bytes_freed: 实际离开磁盘的字节数：内容已在存储中的遗留文件，加上回收的对象。
+        removed_paths: 已导入并删除的遗留备份文件路径。
+    """
+
+    imported: int = 0
+    refs_removed: int = 0
+    objects_removed: int = 0
+    bytes_freed: int = 0
+    removed_paths: List[str] = field(default_factory=list)
+
+
+class BackupManager:
+    """内容寻址备份存储及其保留策略。"""
+
+    def __init__(
+        self,
+        store_dir: str = DEFAULT_STORE_DIR,
+        keep_last: int = DEFAULT_KEEP_LAST,
+        max_age_days: Optional[float] = DEFAULT_MAX_AGE_DAYS,
+    ) -> None:
+        """初始化备份管理器。
+
+        Args:
+            store_dir: 存储根目录。
+            keep_last: 每个路径最多保留的备份份数。
+            max_age_days: 备份最长保留天数；为 None 时不按时间清理。
+        """
+
+        self.store_dir = store_dir
+        self.keep_last = keep_last
+        self.max_age_days = max_age_days
+
+    # ---------- 存储布局 ----------
+
+    @property
+    def objects_dir(self) -> str:
+        return os.path.join(self.store_dir, "objects")
+
+    @property
+    def refs_dir(self) -> str:
+        return os.path.join(self.store_dir, "refs")
+
+    def object_path(self, sha256: str) -> str:
+        """返回内容对象路径。"""
+
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    # ---------- 备份 ----------
+
+    @staticmethod
+    def unchanged(path: str, data: bytes) -> bool:
+        """判断现有文件内容是否与 `data` 逐字节相同（先比较大小，再比较内容）。"""
+
+        try:
+            if os.path.getsize(path) != len(data):
+                return False
+            with open(path, "rb") as f:
+                return f.read() == data
+        except OSError:
+            return False
+
+    def backup(
+        self,
+        path: str,
+        created_ns: Optional[int] = None,
+        ref_path: Optional[str] = None,
+        retain: bool = True,
+        keep_original: bool = False,
+    ) -> Optional[str]:
+        """将现有文件移入（或复制入）存储（相同内容只保留一份对象）并记录引用。
+
+        Args:
+            path: 待备份文件路径；不存在时不做任何事。
+            created_ns: 备份时间（Unix 纳秒）；缺省为当前时间。
+            ref_path: 引用记录中登记的原路径；缺省为 `path`（导入遗留备份时为其原文件路径）。
+            retain: 是否随即对该路径执行保留策略（批量导入时由调用方统一执行）。
+            keep_original: 为 True 时复制而不移走原文件（随后由原子替换覆盖，期间原文件始终可读）。
+
+        Returns:
+            备份对象路径；原文件不存在时返回 None。
+        """
+
+        if not os.path.isfile(path):
+            return None
+        size = os.path.getsize(path)
+        digest = compute_sha256(path)
+        obj = self.object_path(digest)
+        if not os.path.exists(obj):
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            tmp = f"{obj}.{os.getpid()}.tmp"
+            if keep_original:
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, obj)
+            else:
+                try:
+                    os.replace(path, obj)
+                except OSError:
+                    # 跨文件系统时退化为复制后删除
+                    shutil.copyfile(path, tmp)
+                    os.replace(tmp, obj)
+        if not keep_original and os.path.exists(path):
+            os.remove(path)
+
+        owner = os.path.abspath(ref_path or path)
+        created_ns = created_ns if created_ns is not None else time.time_ns()
+        os.makedirs(self.refs_dir, exist_ok=True)
+        # 文件名含原路径摘要：不同原路径的同时间、同内容备份（如多个目录树中的遗留文件）互不覆盖
+        owner_tag = hashlib.sha256(owner.encode("utf-8")).hexdigest()[:12]
+        ref_file = os.path.join(self.refs_dir, f"{created_ns:020d}-{os.getpid()}-{owner_tag}-{digest[:12]}.json")
+        with open(ref_file, "w", encoding="utf-8") as f:
+            json.dump({"path": owner, "sha256": digest, "size": size, "created_ns": created_ns}, f, ensure_ascii=False)
+        if retain:
+            self.apply_retention(owner)
+        return obj
+
+    # ---------- 查询与保留策略 ----------
+
+    def list_refs(self, path: Optional[str] = None) -> List[BackupRef]:
+        """列出备份引用（按时间从新到旧）。
+
+        Args:
+            path: 仅列出该原路径的备份；缺省列出全部。
+        """
+
+        want = os.path.abspath(path) if path else None
+        refs: List[BackupRef] = []
+        try:
+            names = os.listdir(self.refs_dir)
+        except OSError:
+            return refs
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            ref_file = os.path.join(self.refs_dir, name)
+            try:
+                with open(ref_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                ref = BackupRef(data["path"], data["sha256"], data["size"], data["created_ns"], ref_file)
+            except (OSError, ValueError, KeyError):
+                continue
+            if want is None or ref.path == want:
+                refs.append(ref)
+        refs.sort(key=lambda r: r.created_ns, reverse=True)
+        return refs
+
+    def latest(self, path: str) -> Optional[str]:
+        """返回某路径最近一次备份的对象路径（可用于手动恢复）。"""
+
+        for ref in self.list_refs(path):
+            obj = self.object_path(ref.sha256)
+            if os.path.exists(obj):
+                return obj
+        return None
+
+    def expired(self, refs: List[BackupRef], now_ns: Optional[int] = None) -> List[BackupRef]:
+        """按保留策略挑出应删除的引用（`refs` 须为同一路径、从新到旧排列）。"""
+
+        now_ns = now_ns if now_ns is not None else time.time_ns()
+        max_age_ns = None if self.max_age_days is None else int(self.max_age_days * 86400 * 1e9)
+        drop: List[BackupRef] = []
+        for i, ref in enumerate(refs):
+            if i >= self.keep_last or (max_age_ns is not None and now_ns - ref.created_ns > max_age_ns):
+                drop.append(ref)
+        return drop
+
+    def partition(self, refs: Iterable[BackupRef]) -> Tuple[List[BackupRef], List[BackupRef]]:
+        """按保留策略将引用（可跨路径、任意顺序）划分为保留与过期两组，不修改任何文件。
+
+        Returns:
+            `(保留的引用, 过期的引用)`。
+        """
+
+        by_path: Dict[str, List[BackupRef]] = {}
+        for ref in sorted(refs, key=lambda r: r.created_ns, reverse=True):
+            by_path.setdefault(ref.path, []).append(ref)
+        now_ns = time.time_ns()
+        kept: List[BackupRef] = []
+        drop: List[BackupRef] = []
+        for group in by_path.values():
+            expired = {id(r) for r in self.expired(group, now_ns)}
+            for ref in group:
+                (drop if id(ref) in expired else kept).append(ref)
+        return kept, drop
+
+    def apply_retention(self, path: Optional[str] = None) -> int:
+        """对指定路径（缺省为全部路径）执行保留策略，删除超出的引用。
+
+        Returns:
+            删除的引用数。
+        """
+
+        _, drop = self.partition(self.list_refs(path))
+        removed = 0
+        for ref in drop:
+            try:
+                os.remove(ref.ref_file)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def sweep_objects(
+        self,
+        report: GcReport,
+        live: Iterable[str],
+        pending: Iterable[BackupRef] = (),
+        dry_run: bool = False,
+    ) -> None:
+        """回收不在 `live` 中的对象。
+
+        Args:
+            report: 累加回收数量与字节数。
+            live: 仍被引用的对象 SHA256。
+            pending: 预演时尚未导入的遗留备份；其中不被引用、存储中也尚无对象的内容，
+                实际运行时会先导入再回收，同样计入。
+            dry_run: 为 True 时仅统计。
+        """
+
+        live = set(live)
+        on_disk = set()
+        for root, _, names in os.walk(self.objects_dir):
+            for name in names:
+                on_disk.add(name)
+                if name in live:
+                    continue
+                obj = os.path.join(root, name)
+                try:
+                    size = os.path.getsize(obj)
+                    if not dry_run:
+                        os.remove(obj)
+                except OSError:
+                    continue
+                report.objects_removed += 1
+                report.bytes_freed += size
+        for ref in pending:
+            if ref.sha256 in live or ref.sha256 in on_disk:
+                continue
+            on_disk.add(ref.sha256)
+            report.objects_removed += 1
+            report.bytes_freed += ref.size
+
+    # ---------- 垃圾回收 ----------
+
+    def import_legacy(self, roots: Iterable[str], report: GcReport, dry_run: bool = False) -> List[BackupRef]:
+        """将目录树中遗留的 `<文件>.bak-YYYYmmddHHMMSS` 导入存储并删除原文件。
+
+        内容已在存储中（或本次已导入过相同内容）的遗留文件删除即释放空间，计入 `bytes_freed`；
+        其余文件的内容移入存储，仍占用磁盘，不计入。
+
+        Returns:
+            预演时将会登记的引用（`ref_file` 为空）；实际运行时为空列表。
+        """
+
+        pending: List[BackupRef] = []
+        imported = set()
+        for root in roots:
+            for dirpath, dirs, names in os.walk(root):
+                dirs[:] = [d for d in dirs if not d.startswith(".")]
+                for name in sorted(names):
+                    m = LEGACY_BACKUP_RE.match(name)
+                    if not m:
+                        continue
+                    bak = os.path.join(dirpath, name)
+                    stamp = datetime.strptime(m.group("ts"), "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
+                    created_ns = int(stamp.timestamp() * 1e9)
+                    size = os.path.getsize(bak)
+                    digest = compute_sha256(bak)
+                    report.imported += 1
+                    report.removed_paths.append(bak)
+                    if digest in imported or os.path.exists(self.object_path(digest)):
+                        report.bytes_freed += size
+                    imported.add(digest)
+                    # 以原文件路径登记引用，便于按路径执行保留策略
+                    orig = os.path.abspath(os.path.join(dirpath, m.group("orig")))
+                    if dry_run:
+                        pending.append(BackupRef(orig, digest, size, created_ns))
+                        continue
+                    self.backup(bak, created_ns=created_ns, ref_path=orig, retain=False)
+        return pending
+
+    def gc(self, roots: Iterable[str] = DEFAULT_GC_ROOTS, dry_run: bool = False) -> GcReport:
+        """垃圾回收：导入遗留 `.bak-*` 文件，执行保留策略，回收无引用对象。
+
+        Args:
+            roots: 扫描遗留备份文件的目录。
+            dry_run: 为 True 时仅统计，不修改任何文件。
+
+        Returns:
+            回收结果汇总。
+        """
+
+        report = GcReport()
+        pending = self.import_legacy(roots, report, dry_run=dry_run)
+        # 预演时把将要导入的引用一并纳入保留策略，使统计与实际运行一致
+        kept, drop = self.partition(self.list_refs() + pending)
+        for ref in drop:
+            if dry_run or not ref.ref_file:
+                report.refs_removed += 1
+                continue
+            try:
+                os.remove(ref.ref_file)
+                report.refs_removed += 1
+            except FileNotFoundError:
+                pass
+        self.sweep_objects(report, (r.sha256 for r in kept), pending, dry_run=dry_run)
+        return report
+
+
+_default_manager: Optional[BackupManager] = None
+
+
+def default_manager() -> BackupManager:
+    """返回进程内共享的默认备份管理器。"""
+
+    global _default_manager
+    if _default_manager is None:
+        _default_manager = BackupManager()
+    return _default_manager
+
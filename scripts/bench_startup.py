@@ -0,0 +1,113 @@
+"""启动耗时基准：约束 `process_data_assets` 的导入开销。
+
+matplotlib / numpy / xlrd 均改为按需加载后，仅导入脚本或只刷新元数据的运行不应再触发这些
+重量级依赖。本基准在全新子进程中分别测量：
+
+- `import`：仅导入 `process_data_assets`；
+- `metadata`：导入后为全部登记来源构造元数据条目（不写文件）。
+
+每个探针重复运行若干次（首次作为预热不计），取中位数与预算比较；同时检查探针结束时
+matplotlib / numpy / xlrd 是否已被真正导入。超出预算或依赖被提前加载时以非零状态退出。
+
+用法：`python scripts/bench_startup.py [--runs N] [--budget-ms MS]`
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RUNS = 7
+DEFAULT_BUDGET_MS = 100.0
+HEAVY_MODULES = ("matplotlib", "numpy", "xlrd")
+
+# 子进程内执行：计时探针代码，并报告哪些重量级依赖已真正执行导入
+# （`LazyLoader` 占位对象的类型在首次访问属性、完成导入后才变回 `ModuleType`）
+_PROBE_TEMPLATE = """
+import sys, time, json, types
+t0 = time.perf_counter()
+{body}
+ms = (time.perf_counter() - t0) * 1000
+loaded = [m for m in {heavy!r} if type(sys.modules.get(m)) is types.ModuleType]
+print(json.dumps({{"ms": ms, "loaded": loaded}}))
+"""
+
+PROBES: Dict[str, str] = {
+    "import": "import process_data_assets",
+    "metadata": (
+        "import process_data_assets as pda\n"
+        "[pda.source_metadata_entry(s, '2000-01-01') for s in pda.RAW_SOURCES]"
+    ),
+}
+
+
+def run_probe(body: str) -> Dict[str, object]:
+    """在全新解释器中执行一次探针，返回 `{"ms": 耗时, "loaded": 已加载的重量级依赖}`。
+
+    Raises:
+        RuntimeError: 子进程执行失败时抛出。
+    """
+
+    code = _PROBE_TEMPLATE.format(body=body, heavy=HEAVY_MODULES)
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SCRIPTS_DIR,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONPATH=SCRIPTS_DIR),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip() or f"探针退出码 {proc.returncode}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def bench(runs: int, budget_ms: float) -> List[str]:
+    """执行全部探针并打印结果。
+
+    Args:
+        runs: 每个探针计时的次数（另加一次预热）。
+        budget_ms: 中位耗时预算（毫秒）。
+
+    Returns:
+        未通过的检查描述列表；为空表示全部通过。
+    """
+
+    failures: List[str] = []
+    for name, body in PROBES.items():
+        run_probe(body)  # 预热：填充 .pyc 与文件系统缓存
+        samples = [run_probe(body) for _ in range(runs)]
+        times = [float(s["ms"]) for s in samples]
+        median = statistics.median(times)
+        loaded = sorted({m for s in samples for m in s["loaded"]})
+        print(f"{name:<10} 中位 {median:6.1f} ms（最小 {min(times):.1f} / 最大 {max(times):.1f}，{runs} 次）")
+        if median > budget_ms:
+            failures.append(f"{name}：中位耗时 {median:.1f} ms 超出预算 {budget_ms:g} ms")
+        if loaded:
+            failures.append(f"{name}：提前加载了 {', '.join(loaded)}")
+    return failures
+
+
+def main(argv: List[str] | None = None) -> None:
+    """命令行入口：超出预算或依赖被提前加载时以状态码 1 退出。"""
+
+    parser = argparse.ArgumentParser(description="测量 process_data_assets 的启动耗时并按预算校验")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, metavar="N", help=f"每个探针的计时次数（默认 {DEFAULT_RUNS}）")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, metavar="MS", help=f"中位耗时预算（默认 {DEFAULT_BUDGET_MS:g} ms）")
+    args = parser.parse_args(argv)
+
+    failures = bench(max(1, args.runs), args.budget_ms)
+    if failures:
+        for msg in failures:
+            print(f"未通过：{msg}")
+        sys.exit(1)
+    print("启动耗时基准通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""增量构建图：按内容指纹判断派生资产是否过期，仅重建过期目标。
+
+每个构建目标（`BuildTarget`）声明：原始输入（文件或目录）、输出文件与生成函数。
+构建清单（manifest）记录每个目标上次成功构建时的输入指纹与输出文件状态；
+再次运行时若输入指纹、生成逻辑版本与输出状态均未变化，则跳过该目标。
+
+文件指纹为 SHA256，经 `file_hashing` 按 (path, size, mtime_ns) 记忆：文件未被修改时
+仅需一次 `os.stat`，无需重新读取内容，因此无变化的重复运行可在亚秒级完成。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from file_hashing import default_memo, memoized_sha256
+
+
+MANIFEST_VERSION = 2
+
+
+@dataclass
+class BuildTarget:
+    """构建目标声明。
+
+    Attributes:
+        name: 目标名称（如 "lesson-12-csv"），作为清单中的键。
+        inputs: 原始输入路径列表（文件或目录；目录按其中全部文件计算指纹）。
+        outputs: 该目标生成的输出文件路径列表。
+        build: 无参生成函数，负责写出全部 `outputs`。
+        version: 生成逻辑版本号；修改生成逻辑后递增即可强制重建。
+    """
+
+    name: str
+    inputs: List[str]
+    outputs: List[str]
+    build: Callable[[], object]
+    version: str = "1"
+
+
+@dataclass
+class BuildReport:
+    """一次构建的结果汇总。
+
+    Attributes:
+        built: 已重建的目标名称列表。
+        skipped: 指纹未变化而跳过的目标名称列表。
+        failed: 构建失败的目标及错误信息 `(name, message)` 列表。
+    """
+
+    built: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def _list_dir_files(path: str) -> List[str]:
+    """递归列出目录下的全部普通文件（跳过隐藏文件），按路径排序。"""
+
+    files: List[str] = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(names):
+            if name.startswith("."):
+                continue
+            files.append(os.path.join(root, name))
+    return files
+
+
+class BuildManifest:
+    """构建清单：记录各目标的上次构建状态。
+
+    清单为 JSON 文件，结构：
+    - `targets`: `{name: {"fingerprint", "outputs": {path: {"size", "mtime_ns"}}}}`。
+    """
+
+    def __init__(self, path: str) -> None:
+        """加载清单；文件不存在或损坏时以空清单开始。
+
+        Args:
+            path: 清单 JSON 路径。
+        """
+
+        self.path = path
+        self.targets: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.targets = data.get("targets", {})
+            except (OSError, ValueError) as e:
+                print(f"警告：构建清单不可读，将全部重建 -> {e}")
+
+    def input_fingerprint(self, path: str) -> Optional[str]:
+        """计算单个输入的指纹；目录按 (相对路径, SHA256) 列表合成；不存在返回 None。"""
+
+        if os.path.isdir(path):
+            files = _list_dir_files(path)
+            digests, _ = default_memo().sha256_many(files)
+            h = hashlib.sha256()
+            for fp in files:
+                h.update(os.path.relpath(fp, path).encode("utf-8"))
+                h.update(digests[fp].encode("ascii"))
+            return h.hexdigest()
+        if os.path.isfile(path):
+            return memoized_sha256(path)
+        return None
+
+    def target_fingerprint(self, target: BuildTarget) -> str:
+        """合成目标指纹：生成逻辑版本 + 全部输入指纹。"""
+
+        payload = {
+            "version": target.version,
+            "inputs": {p: self.input_fingerprint(p) for p in target.inputs},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def is_fresh(self, target: BuildTarget, fingerprint: str) -> bool:
+        """判断目标是否无需重建：指纹一致且全部输出仍为上次写出的状态。"""
+
+        state = self.targets.get(target.name)
+        if not state or state.get("fingerprint") != fingerprint:
+            return False
+        recorded = state.get("outputs", {})
+        for out in target.outputs:
+            rec = recorded.get(out)
+            if rec is None or not os.path.isfile(out):
+                return False
+            st = os.stat(out)
+            if st.st_size != rec.get("size") or st.st_mtime_ns != rec.get("mtime_ns"):
+                return False
+        return True
+
+    def record(self, target: BuildTarget, fingerprint: str) -> None:
+        """记录目标构建成功后的指纹与输出状态。"""
+
+        outputs: Dict[str, Dict] = {}
+        for out in target.outputs:
+            if os.path.isfile(out):
+                st = os.stat(out)
+                outputs[out] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        self.targets[target.name] = {"fingerprint": fingerprint, "outputs": outputs}
+
+    def save(self) -> None:
+        """写回清单 JSON（先写临时文件再原子替换）。"""
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "targets": self.targets}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+
+def order_targets(targets: List[BuildTarget]) -> List[BuildTarget]:
+    """按依赖关系排序：若某目标的输入是另一目标的输出，则生产者先于消费者。
+
+    Args:
+        targets: 目标列表（声明顺序）。
+
+    Returns:
+        拓扑排序后的目标列表；无依赖关系的目标保持声明顺序。
+
+    Raises:
+        ValueError: 存在循环依赖时抛出。
+    """
+
+    producer = {out: t.name for t in targets for out in t.outputs}
+    by_name = {t.name: t for t in targets}
+    ordered: List[BuildTarget] = []
+    state: Dict[str, int] = {}  # 1 = 访问中, 2 = 已完成
+
+    def visit(t: BuildTarget) -> None:
+        mark = state.get(t.name)
+        if mark == 2:
+            return
+        if mark == 1:
+            raise ValueError(f"构建图存在循环依赖: {t.name}")
+        state[t.name] = 1
+        for inp in t.inputs:
+            dep = producer.get(inp)
+            if dep and dep != t.name:
+                visit(by_name[dep])
+        state[t.name] = 2
+        ordered.append(t)
+
+    for t in targets:
+        visit(t)
+    return ordered
+
+
+def run_build_graph(targets: List[BuildTarget], manifest_path: str, force: bool = False) -> BuildReport:
+    """执行构建图：仅重建过期目标，并更新清单。
+
+    构建失败的目标不写入清单（下次运行将重试），其余目标照常进行。
+
+    Args:
+        targets: 构建目标列表。
+        manifest_path: 构建清单 JSON 路径。
+        force: 为 True 时忽略清单，全部重建。
+
+    Returns:
+        构建结果汇总。
+    """
+
+    manifest = BuildManifest(manifest_path)
+    report = BuildReport()
+    for target in order_targets(targets):
+        fingerprint = manifest.target_fingerprint(target)
+        if not force and manifest.is_fresh(target, fingerprint):
+            report.skipped.append(target.name)
+            continue
+        try:
+            target.build()
+        except Exception as e:
+            print(f"警告：构建目标 {target.name} 失败 -> {e}")
+            report.failed.append((target.name, str(e)))
+            continue
+        manifest.record(target, fingerprint)
+        report.built.append(target.name)
+    manifest.save()
+    return report
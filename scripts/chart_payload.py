@@ -0,0 +1,148 @@
+"""图表二进制载荷：JSON 头 + 小端类型化数组块。
+
+逐时 CSV（如 `lesson-01-sample.csv`）的时间为 `2023-06-01 00:00` 文本，浏览器需逐行切分
+字符串并 `Date.parse`。本模块为图表另出一对文件：
+
+- `<名称>.chart.json`：头信息（`schema` / `version`、行数、各列名称、类型、单位及其在数据块中的
+  字节偏移与长度），可由课件 JSON 直接引用；
+- `<名称>.chart.bin`：依次排列的小端数组块，时间列为 int32“自 1970-01-01 00:00 起的分钟数”，
+  数值列为 float32（缺测为 NaN）；每块起始偏移按 4 字节对齐，前端可直接以
+  `new Int32Array(buf, offset, length)` / `new Float32Array(...)` 映射，无需解析。
+
+行按时间升序排列（CSV 保持原工作簿行序）。值全部相同的文本列（如第4课环境类型）
+记入头部 `constants`，不占数据块。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+
+
+PAYLOAD_SCHEMA = "climate-guardian/chart-payload"
+PAYLOAD_VERSION = 1
+HEADER_SUFFIX = ".chart.json"
+BLOB_SUFFIX = ".chart.bin"
+ALIGNMENT = 4
+
+# 头部 dtype 名 -> 小端 numpy 类型（与 JS 类型化数组一一对应）
+DTYPES = {"int32": "<i4", "float32": "<f4"}
+
+
+@dataclass
+class PayloadColumn:
+    """载荷中的一列。
+
+    Attributes:
+        name: 列名（与 CSV 表头一致）。
+        values: 数值数组。
+        dtype: 编码类型（`int32` / `float32`）。
+        unit: 单位（可选）。
+    """
+
+    name: str
+    values: np.ndarray
+    dtype: str = "float32"
+    unit: Optional[str] = None
+
+
+@dataclass
+class ChartPayload:
+    """一组图表序列（共享时间轴）。
+
+    Attributes:
+        name: 载荷名（通常为对应 CSV 的文件名去扩展名）。
+        time_min: int64 时间（分钟数）。
+        columns: 数值列。
+        constants: 常量文本列 `{列名: 值}`。
+        source: 对应 CSV 文件名（可选）。
+    """
+
+    name: str
+    time_min: np.ndarray
+    columns: List[PayloadColumn]
+    constants: Dict[str, str] = field(default_factory=dict)
+    source: Optional[str] = None
+
+    def encode(self) -> Tuple[bytes, bytes]:
+        """编码为 `(头 JSON 字节, 数据块字节)`（按时间稳定升序）。
+
+        Raises:
+            ValueError: 列长度与时间列不一致，或时间超出 int32 分钟数范围时抛出。
+        """
+
+        order = np.argsort(self.time_min, kind="stable")
+        time_min = np.asarray(self.time_min, dtype=np.int64)[order]
+        if time_min.size and (time_min[0] < np.iinfo(np.int32).min or time_min[-1] > np.iinfo(np.int32).max):
+            raise ValueError("时间超出 int32 分钟数范围")
+
+        blocks: List[Tuple[str, str, Optional[str], np.ndarray]] = [("time", "int32", None, time_min)]
+        for col in self.columns:
+            values = np.asarray(col.values)
+            if values.shape != self.time_min.shape:
+                raise ValueError(f"列 {col.name} 与时间列长度不一致")
+            blocks.append((col.name, col.dtype, col.unit, values[order]))
+
+        parts: List[bytes] = []
+        offset = 0
+        entries = []
+        for name, dtype, unit, values in blocks:
+            data = values.astype(DTYPES[dtype]).tobytes()
+            entry = {"name": name, "dtype": dtype, "offset": offset, "length": int(values.size)}
+            if name == "time":
+                entry["encoding"] = "epoch-minutes"
+            if unit:
+                entry["unit"] = unit
+            entries.append(entry)
+            pad = -len(data) % ALIGNMENT
+            parts.append(data + b"\0" * pad)
+            offset += len(data) + pad
+        blob = b"".join(parts)
+
+        header = {
+            "schema": PAYLOAD_SCHEMA,
+            "version": PAYLOAD_VERSION,
+            "name": self.name,
+            "rows": int(time_min.size),
+            "byteOrder": "little",
+            "blob": self.name + BLOB_SUFFIX,
+            "byteLength": len(blob),
+            "sha256": hashlib.sha256(blob).hexdigest(),
+            "columns": entries,
+        }
+        if self.constants:
+            header["constants"] = dict(self.constants)
+        if self.source:
+            header["source"] = self.source
+        return (json.dumps(header, ensure_ascii=False, indent=2) + "\n").encode("utf-8"), blob
+
+
+def decode_payload(header_bytes: bytes, blob: bytes) -> Dict[str, np.ndarray]:
+    """按头信息解码数据块为 `{列名: 数组}`（时间列名为 `time`）。
+
+    Raises:
+        ValueError: schema / 版本不符或数据块长度不一致时抛出。
+    """
+
+    header = json.loads(header_bytes.decode("utf-8"))
+    if header.get("schema") != PAYLOAD_SCHEMA or header.get("version") != PAYLOAD_VERSION:
+        raise ValueError("图表载荷 schema 或版本不匹配")
+    if header.get("byteLength") != len(blob):
+        raise ValueError("图表载荷数据块长度不一致")
+    return {
+        c["name"]: np.frombuffer(blob, dtype=DTYPES[c["dtype"]], count=c["length"], offset=c["offset"])
+        for c in header["columns"]
+    }
+
+
+def payload_paths(directory: str, name: str) -> Tuple[str, str]:
+    """返回载荷头与数据块的输出路径。"""
+
+    return os.path.join(directory, name + HEADER_SUFFIX), os.path.join(directory, name + BLOB_SUFFIX)
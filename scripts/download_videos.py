@@ -22,7 +22,6 @@ PEP 257: 全部函数采用规范文档字符串；函数级注释说明核心
 from __future__ import annotations
 
 import csv
-import hashlib
 import json
 import os
 import re
@@ -33,6 +32,10 @@ from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
 
+from backups import default_manager
+from file_hashing import hash_files
+from output_txn import keep_created_at, write_output_bytes
+
 
 # ------------------------------ 常量与工具函数 ------------------------------
 
@@ -52,42 +55,24 @@ def ensure_dir(path: str) -> None:
 
 
 def backup_if_exists(path: str) -> Optional[str]:
-    """如目标存在则以时间戳备份并返回备份路径。
-
-    Args:
-        path: 目标文件路径。
+    """如目标存在则复制入内容寻址备份存储（`.cache/backups`）并返回备份对象路径。
 
-    Returns:
-        备份文件路径；若原文件不存在则返回 None。
-    """
-
-    if os.path.exists(path):
-        ts = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-        bak = f"{path}.bak-{ts}"
-        os.rename(path, bak)
-        return bak
-    return None
-
-
-def compute_sha256(path: str) -> str:
-    """计算文件的SHA256校验值。
+    原文件保留在原处，由随后的原子替换覆盖；替换前它始终可读。
 
     Args:
-        path: 文件路径。
+        path: 目标文件路径。
 
     Returns:
-        十六进制字符串形式的SHA256校验值。
+        备份对象路径；若原文件不存在则返回 None。
     """
 
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            h.update(chunk)
-    return h.hexdigest()
+    return default_manager().backup(path, keep_original=True)
 
 
 def write_json_with_backup(out_path: str, obj: Dict) -> str:
-    """写出 JSON 内容；如目标存在则先备份后覆盖。
+    """写出 JSON 内容（原子替换）；内容未变化时跳过，否则先备份后覆盖。
+
+    除 `created_at` 外与现有文件内容相同时沿用其 `created_at`（见 `output_txn.keep_created_at`）。
 
     Args:
         out_path: 输出 JSON 路径。
@@ -98,11 +83,8 @@ def write_json_with_backup(out_path: str, obj: Dict) -> str:
     """
 
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    bak = backup_if_exists(out_path)
-    if bak:
-        print(f"已备份现有文件 -> {bak}")
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
+    obj = keep_created_at(out_path, obj)
+    write_output_bytes(out_path, json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8"))
     return out_path
 
 
@@ -206,6 +188,9 @@ def merge_video_entries(key_rows: List[Dict[str, str]], health_rows: List[Dict[s
 def download_with_curl(url: str, out_path: str) -> bool:
     """使用 curl 下载文件。
 
+    先下载到同目录临时文件，成功后备份旧文件并原子替换；失败时删除临时文件，
+    原有文件保持不变。
+
     Args:
         url: 下载链接（建议为MP4直链）。
         out_path: 输出文件路径。
@@ -215,18 +200,26 @@ def download_with_curl(url: str, out_path: str) -> bool:
     """
 
     ensure_dir(os.path.dirname(out_path))
-    backup_if_exists(out_path)
+    tmp = os.path.join(os.path.dirname(out_path), f".{os.path.basename(out_path)}.tmp-{os.getpid()}")
     cmd = [
         "curl",
         "-L",
         "--retry", "3",
         "--retry-delay", "2",
-        "-o", out_path,
+        "-o", tmp,
         url,
     ]
     print("执行:", " ".join(shlex.quote(c) for c in cmd))
-    res = subprocess.run(cmd)
-    return res.returncode == 0 and os.path.exists(out_path) and os.path.getsize(out_path) > 0
+    try:
+        res = subprocess.run(cmd)
+        if res.returncode != 0 or not os.path.exists(tmp) or os.path.getsize(tmp) == 0:
+            return False
+        backup_if_exists(out_path)
+        os.replace(tmp, out_path)
+        return True
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
 
 
 def download_with_ytdlp(url: str, out_dir: str, base_name: str) -> Optional[str]:
@@ -263,8 +256,18 @@ def download_with_ytdlp(url: str, out_dir: str, base_name: str) -> Optional[str]
     return None
 
 
-def write_video_sidecar(out_path: str, entry: VideoEntry, download_url: str) -> str:
-    """为下载的视频写旁注元数据 JSON。"""
+def write_video_sidecar(out_path: str, entry: VideoEntry, download_url: str, sha256: Optional[str] = None) -> str:
+    """为下载的视频写旁注元数据 JSON。
+
+    Args:
+        out_path: 视频文件路径。
+        entry: 视频条目。
+        download_url: 实际下载链接。
+        sha256: 预先计算的 SHA256；缺省时就地计算。
+    """
+
+    if sha256 is None and os.path.exists(out_path):
+        sha256 = hash_files([out_path]).digests.get(out_path)
 
     meta = {
         "lesson": entry.lesson,
@@ -275,7 +278,7 @@ def write_video_sidecar(out_path: str, entry: VideoEntry, download_url: str) ->
         "download_url": download_url,
         "duration_estimate_min": entry.duration_min,
         "quality": entry.quality,
-        "sha256": compute_sha256(out_path) if os.path.exists(out_path) else None,
+        "sha256": sha256,
         "use_restrictions": "仅用于教学用途，非商业使用；遵守来源站点使用条款。",
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
@@ -288,9 +291,7 @@ def write_url_placeholder(out_dir: str, base_name: str, entry: VideoEntry) -> st
 
     ensure_dir(out_dir)
     url_file = os.path.join(out_dir, base_name + ".url")
-    backup_if_exists(url_file)
-    with open(url_file, "w", encoding="utf-8") as f:
-        f.write(entry.page_url + "\n")
+    write_output_bytes(url_file, (entry.page_url + "\n").encode("utf-8"))
     # 旁注包含不可下载说明
     meta = {
         "lesson": entry.lesson,
@@ -324,6 +325,8 @@ def plan_and_download(csv_path: str, health_path: str, out_dir: str, overwrite:
     entries = merge_video_entries(key_rows, health_rows)
 
     outputs: List[str] = []
+    # 下载完成的视频：(路径, 条目, 下载链接)，循环结束后统一并发计算 SHA256 并写旁注
+    downloaded: List[Tuple[str, VideoEntry, str]] = []
     for e in entries:
         base = f"lesson-{e.lesson}-{sanitize_filename(e.title)}"
         mp4_direct = e.direct_mp4_url()
@@ -342,7 +345,7 @@ def plan_and_download(csv_path: str, health_path: str, out_dir: str, overwrite:
                 continue
             ok = download_with_curl(mp4_direct, target_mp4)
             if ok:
-                write_video_sidecar(target_mp4, e, mp4_direct)
+                downloaded.append((target_mp4, e, mp4_direct))
                 outputs.append(target_mp4)
             else:
                 print(f"下载失败，生成占位：{e.page_url}")
@@ -357,7 +360,7 @@ def plan_and_download(csv_path: str, health_path: str, out_dir: str, overwrite:
                 continue
             saved = download_with_ytdlp(e.page_url, out_dir, base)
             if saved and os.path.exists(saved):
-                write_video_sidecar(saved, e, e.page_url)
+                downloaded.append((saved, e, e.page_url))
                 outputs.append(saved)
                 continue
 
@@ -365,6 +368,14 @@ def plan_and_download(csv_path: str, health_path: str, out_dir: str, overwrite:
         print(f"不可直接下载或受限制，生成占位 .url -> {e.page_url}")
         outputs.append(write_url_placeholder(out_dir, base, e))
 
+    if downloaded:
+        report = hash_files(path for path, _, _ in downloaded)
+        for path, err in report.errors:
+            print(f"警告：无法计算 SHA256 {path} -> {err}")
+        print(f"视频 SHA256：{report.describe()}")
+        for path, e, url in downloaded:
+            write_video_sidecar(path, e, url, sha256=report.digests.get(path))
+
     return outputs
 
 
@@ -0,0 +1,209 @@
+"""图表用序列降采样：LTTB 与最小/最大包络。
+
+课程 CSV 保留全部原始样点（如第1/4课逐时气温 8,500 余点、第12课 NGRIP 序列），
+而投影仪/教室电脑上的 ECharts 图表宽度通常只有一两千像素。本模块为稠密序列生成
+目标分辨率（默认 500 / 2000 点）的变体文件 `<原文件名>-<点数>.csv`，前端可按视口宽度
+加载能满足需要的最小变体：
+
+- `lttb`：Largest-Triangle-Three-Buckets，每桶保留与相邻桶构成三角形面积最大的点，
+  适合折线（气温、δ18O）；
+- `minmax`：每桶保留最小值与最大值两个点，保证峰值不被抹平，适合风速、降雨等尖峰序列。
+
+变体中的行是原 CSV 行的子集（格式、列与原文件完全相同，行序保持不变）；
+样点数不超过目标点数时该档变体即原样全部行，使各档文件始终齐备。按 `groups` 分组时
+每组（如每条序列）分别降采样。
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Callable, Dict, List, Optional, Sequence, TypeVar
+
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+
+
+DEFAULT_TARGETS = (500, 2000)
+
+T = TypeVar("T")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets 降采样（`x` 须升序）。
+
+    首末点必选；其余点均分为 `threshold - 2` 个桶，每桶选出与上一已选点、下一桶均值点
+    构成三角形面积最大的点。
+
+    Args:
+        x: 横坐标（升序）。
+        y: 纵坐标。
+        threshold: 目标点数。
+
+    Returns:
+        选中点的下标（升序）；点数不超过目标时返回全部下标。
+    """
+
+    n = int(x.size)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # 桶边界以整数运算求得：第 i 桶为 [edges[i], edges[i+1])，edges[threshold-2] 恰为 n-1
+    edges = np.arange(threshold, dtype=np.int64) * (n - 2) // (threshold - 2) + 1
+    edges = np.minimum(edges, n)
+    # 下一桶均值（最后一桶的“下一桶”为末点）
+    csx = np.concatenate([[0.0], np.cumsum(x)])
+    csy = np.concatenate([[0.0], np.cumsum(y)])
+    nxt_start = edges[1:-1]
+    nxt_end = edges[2:]
+    count = nxt_end - nxt_start
+    avg_x = (csx[nxt_end] - csx[nxt_start]) / count
+    avg_y = (csy[nxt_end] - csy[nxt_start]) / count
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - avg_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """最小/最大包络降采样：首末点必选，其余点均分为 `(threshold - 2) // 2` 桶，每桶取最小与最大值点。
+
+    Args:
+        x: 横坐标（升序；仅用于确定点数）。
+        y: 纵坐标。
+        threshold: 目标点数（结果不超过该值）。
+
+    Returns:
+        选中点的下标（升序）；点数不超过目标时返回全部下标。
+    """
+
+    n = int(np.asarray(x).size)
+    buckets = (threshold - 2) // 2
+    if threshold >= n or buckets < 1:
+        return np.arange(n)
+    inner = np.arange(1, n - 1)
+    bucket_of = np.floor((inner - 1) * buckets / (n - 2)).astype(np.int64)
+    # 按 (桶, y) 排序后，每桶首行为最小值、末行为最大值
+    order = inner[np.lexsort((np.asarray(y)[inner], bucket_of))]
+    sorted_buckets = bucket_of[order - 1]
+    first = np.flatnonzero(np.r_[True, np.diff(sorted_buckets) != 0])
+    last = np.r_[first[1:] - 1, order.size - 1]
+    return np.unique(np.concatenate([[0, n - 1], order[first], order[last]]))
+
+
+METHODS: Dict[str, Callable[[np.ndarray, np.ndarray, int], np.ndarray]] = {
+    "lttb": lttb_indices,
+    "minmax": minmax_indices,
+}
+
+
+def downsample_indices(
+    x: Sequence[float],
+    y: Sequence[float],
+    threshold: int,
+    method: str = "lttb",
+    groups: Optional[Sequence] = None,
+) -> np.ndarray:
+    """返回降采样后保留的行下标（按原行序升序）。
+
+    各组分别按横坐标稳定排序后降采样；纵坐标为 NaN 的行不参与（也不保留）。
+
+    Args:
+        x: 横坐标（时间、年份等；无需有序）。
+        y: 纵坐标。
+        threshold: 每组目标点数。
+        method: `lttb` 或 `minmax`。
+        groups: 可选分组键（如序列名），与 `x` 等长。
+
+    Returns:
+        保留行的原始下标。
+
+    Raises:
+        ValueError: 未知的降采样方法。
+    """
+
+    if method not in METHODS:
+        raise ValueError(f"未知的降采样方法：{method}（可选 {', '.join(METHODS)}）")
+    x_arr = np.asarray(x, dtype=np.float64)
+    y_arr = np.asarray(y, dtype=np.float64)
+    if groups is None:
+        group_ids = np.zeros(x_arr.size, dtype=np.int64)
+    else:
+        _, group_ids = np.unique(np.asarray(groups), return_inverse=True)
+
+    keep: List[np.ndarray] = []
+    for g in np.unique(group_ids):
+        rows = np.flatnonzero((group_ids == g) & ~np.isnan(y_arr))
+        rows = rows[np.argsort(x_arr[rows], kind="stable")]
+        keep.append(rows[METHODS[method](x_arr[rows], y_arr[rows], threshold)])
+    return np.sort(np.concatenate(keep)) if keep else np.empty(0, dtype=np.int64)
+
+
+def variant_path(path: str, target: int) -> str:
+    """变体文件路径：`lesson-01-sample.csv` -> `lesson-01-sample-500.csv`。"""
+
+    stem, ext = os.path.splitext(path)
+    return f"{stem}-{target}{ext}"
+
+
+def downsample_rows(
+    rows: Sequence[T],
+    x: Sequence[float],
+    y: Sequence[float],
+    targets: Sequence[int] = DEFAULT_TARGETS,
+    method: str = "lttb",
+    groups: Optional[Sequence] = None,
+) -> Dict[int, List[T]]:
+    """为一组行生成各目标点数的降采样变体。
+
+    Args:
+        rows: 原数据行（CSV 行列表或已编码的行文本），与 `x`/`y` 一一对应。
+        x: 横坐标。
+        y: 纵坐标。
+        targets: 目标点数（每组）。
+        method: `lttb` 或 `minmax`。
+        groups: 可选分组键。
+
+    Returns:
+        `{目标点数: 行子集}`。
+    """
+
+    variants: Dict[int, List[T]] = {}
+    for target in sorted(targets):
+        idx = downsample_indices(x, y, target, method, groups)
+        variants[target] = [rows[i] for i in idx.tolist()]
+    return variants
+
+
+def csv_variants(
+    data: bytes,
+    x: Sequence[float],
+    y: Sequence[float],
+    targets: Sequence[int] = DEFAULT_TARGETS,
+    method: str = "lttb",
+) -> Dict[int, bytes]:
+    """为已渲染的 CSV（表头 + 每行一条记录，`\\r\\n` 行尾，字段内无换行）生成降采样变体。
+
+    Args:
+        data: 完整 CSV 内容。
+        x: 各数据行横坐标。
+        y: 各数据行纵坐标。
+        targets: 目标点数。
+        method: `lttb` 或 `minmax`。
+
+    Returns:
+        `{目标点数: 变体 CSV 内容}`。
+    """
+
+    header, *lines = data.split(b"\r\n")[:-1]
+    return {
+        target: b"\r\n".join([header, *subset]) + b"\r\n"
+        for target, subset in downsample_rows(lines, x, y, targets, method).items()
+    }
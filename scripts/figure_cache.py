@@ -0,0 +1,191 @@
+"""示例图 PNG 的内容寻址缓存。
+
+`plot_*` 每次运行都用 matplotlib 重新渲染，即使 GISTEMP / CO₂ 等输入未变——这是资产构建中
+最慢的一步。`cached_figure` 装饰绘图函数，以下列因素共同决定缓存键：
+
+- 输入序列哈希（`ColumnarSeries` 取其二进制编码的 SHA256，数组取原始字节，其余参数取 `repr`）；
+- 绘图函数名与版本号（修改绘图逻辑后递增）；
+- 应用样式后的 `rcParams` 快照（不含 backend 相关项）、渲染后端与 matplotlib 版本；
+- DPI。
+
+未命中时照常渲染，期间经 `save_figure_png` 写出的每张 PNG 都被记录，函数返回后整体存入缓存；
+命中时直接将缓存的 PNG 经输出事务写到原位置，不再执行绘图与 PNG 编码。
+缓存条目存放于 `.cache/figure-cache`，沿用 `parse_cache.ParseCache` 的原子写入与 LRU 容量淘汰。
+设置环境变量 `CG_NO_FIGURE_CACHE=1` 可整体禁用（子进程同样生效）。
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+import struct
+from typing import Callable, List, Optional, Tuple
+
+from lazy_imports import lazy_module
+from output_txn import write_output_bytes
+from parse_cache import ParseCache
+from series import ColumnarSeries
+
+np = lazy_module("numpy")
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "figure-cache")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+FIGURE_MAGIC = b"CGFIG1\n"
+
+
+def cache_disabled() -> bool:
+    """是否通过环境变量 `CG_NO_FIGURE_CACHE` 禁用了图像缓存。"""
+
+    return os.environ.get("CG_NO_FIGURE_CACHE", "") not in ("", "0")
+
+
+_default_cache: Optional[ParseCache] = None
+
+
+def default_cache() -> ParseCache:
+    """返回进程内共享的图像缓存实例。"""
+
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ParseCache(DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES)
+    return _default_cache
+
+
+def style_fingerprint() -> str:
+    """当前 `rcParams`（不含 backend 相关项）、实际选用的后端与 matplotlib 版本的 SHA256。"""
+
+    import matplotlib
+
+    params = {k: repr(v) for k, v in sorted(matplotlib.rcParams.items()) if not k.startswith("backend")}
+    src = json.dumps([matplotlib.__version__, matplotlib.get_backend(), params], ensure_ascii=False)
+    return hashlib.sha256(src.encode("utf-8")).hexdigest()
+
+
+def input_fingerprint(value) -> str:
+    """绘图输入的指纹：序列取二进制编码哈希，数组取字节哈希，其余取 `repr`。"""
+
+    if isinstance(value, ColumnarSeries):
+        return hashlib.sha256(value.to_bytes()).hexdigest()
+    if isinstance(value, np.ndarray):
+        return hashlib.sha256(str(value.dtype).encode() + np.ascontiguousarray(value).tobytes()).hexdigest()
+    return repr(value)
+
+
+def encode_entry(images: List[Tuple[str, bytes]], result) -> bytes:
+    """编码缓存条目：魔数 + 头长度 + JSON 头（各 PNG 路径/大小与返回值）+ 依次拼接的 PNG。"""
+
+    header = json.dumps(
+        {
+            "images": [{"path": os.path.relpath(path, BASE_DIR), "size": len(png)} for path, png in images],
+            "result": os.path.relpath(result, BASE_DIR) if isinstance(result, str) else None,
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+    return b"".join([FIGURE_MAGIC, struct.pack("<I", len(header)), header] + [png for _, png in images])
+
+
+def decode_entry(blob: bytes) -> Tuple[List[Tuple[str, bytes]], Optional[str]]:
+    """还原 `encode_entry` 的结果为 `(图像列表, 返回路径)`。
+
+    Raises:
+        ValueError: 魔数不匹配或长度不一致时抛出。
+    """
+
+    if not blob.startswith(FIGURE_MAGIC):
+        raise ValueError("图像缓存魔数不匹配")
+    offset = len(FIGURE_MAGIC)
+    (header_len,) = struct.unpack_from("<I", blob, offset)
+    offset += 4
+    header = json.loads(blob[offset : offset + header_len].decode("utf-8"))
+    offset += header_len
+    images = []
+    for item in header["images"]:
+        png = blob[offset : offset + item["size"]]
+        if len(png) != item["size"]:
+            raise ValueError("图像缓存条目被截断")
+        images.append((os.path.join(BASE_DIR, item["path"]), png))
+        offset += item["size"]
+    result = header["result"]
+    return images, os.path.join(BASE_DIR, result) if result is not None else None
+
+
+# 正在渲染（未命中）的绘图调用所写出的图像；无活动调用时为 None
+_recording: Optional[List[Tuple[str, bytes]]] = None
+
+
+def record_figure(path: str, png: bytes) -> None:
+    """登记一张已写出的 PNG（由 `save_figure_png` 调用；不在缓存绘图调用中时忽略）。"""
+
+    if _recording is not None:
+        _recording.append((os.path.abspath(path), png))
+
+
+def cached_figure(version: str, dpi: int, style: Optional[Callable[[], None]] = None) -> Callable:
+    """绘图函数装饰器：按 (输入哈希, 函数名, 版本, 样式, DPI) 缓存其写出的 PNG。
+
+    被装饰函数须经 `save_figure_png` 写出图像，并返回输出路径。
+
+    Args:
+        version: 绘图逻辑版本号。
+        dpi: 渲染 DPI（计入缓存键）。
+        style: 绘图前应用的样式函数（如配置中文字体）；在计算样式指纹前调用。
+
+    Returns:
+        装饰器。
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            global _recording
+            if style is not None:
+                style()
+            if cache_disabled():
+                return fn(*args, **kwargs)
+            key_src = json.dumps(
+                [
+                    fn.__name__,
+                    version,
+                    dpi,
+                    style_fingerprint(),
+                    [input_fingerprint(a) for a in args],
+                    [(k, input_fingerprint(v)) for k, v in sorted(kwargs.items())],
+                ],
+                ensure_ascii=False,
+            )
+            key = hashlib.sha256(key_src.encode("utf-8")).hexdigest()
+            cache = default_cache()
+            blob = cache.get(key)
+            if blob is not None:
+                try:
+                    images, result = decode_entry(blob)
+                except (ValueError, KeyError) as e:
+                    print(f"警告：图像缓存条目损坏，重新渲染 -> {e}")
+                else:
+                    for path, png in images:
+                        write_output_bytes(path, png, backup=False)
+                    return result
+
+            outer, _recording = _recording, []
+            try:
+                result = fn(*args, **kwargs)
+                images = _recording
+            finally:
+                _recording = outer
+            if outer is not None:
+                outer.extend(images)
+            try:
+                cache.put(key, encode_entry(images, result))
+            except OSError as e:
+                print(f"警告：图像缓存写入失败 -> {e}")
+            return result
+
+        wrapper.uncached = fn
+        return wrapper
+
+    return decorator
@@ -0,0 +1,277 @@
+"""文件 SHA256 计算与按 (path, size, mtime_ns) 的记忆化。
+
+原始数据文件可能达到数 GB，而每次运行中元数据、旁注、构建清单与解析缓存都需要其
+SHA256。`HashMemo` 以文件的 (绝对路径, 大小, 修改时间) 为键记忆校验值，并持久化到
+`.cache/sha256-memo.json`：文件未变时仅需一次 `os.stat`，变化后才重新读取内容。
+
+读取方式：大文件（>= `MMAP_THRESHOLD`）经内存映射按 8 MiB 切片送入哈希，其余文件以
+可复用的 1 MiB 缓冲区 `readinto` 读取，避免逐块分配。`hash_files` 在线程池中并发计算
+多个文件（`hashlib` 在大块更新时释放 GIL），并汇报总字节数与吞吐量。
+
+命令行：`python scripts/file_hashing.py [--jobs N] PATH...` 输出各文件 SHA256 与吞吐量。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MEMO_PATH = os.path.join(BASE_DIR, ".cache", "sha256-memo.json")
+
+BUFFER_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 16 * 1024 * 1024
+MMAP_SLICE = 8 * 1024 * 1024
+
+
+def compute_sha256(path: str) -> str:
+    """计算文件的 SHA256 校验值（不经记忆化）。
+
+    Args:
+        path: 文件路径。
+
+    Returns:
+        十六进制字符串形式的 SHA256 值。
+    """
+
+    h = hashlib.sha256()
+    with open(path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    for start in range(0, size, MMAP_SLICE):
+                        h.update(view[start : start + MMAP_SLICE])
+                finally:
+                    view.release()
+        else:
+            buf = bytearray(BUFFER_SIZE)
+            view = memoryview(buf)
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                h.update(view[:n])
+    return h.hexdigest()
+
+
+@dataclass
+class HashReport:
+    """一批文件的哈希结果与吞吐统计。
+
+    Attributes:
+        digests: `{path: sha256}`（仅含成功的文件）。
+        errors: 失败文件及错误信息 `(path, message)` 列表。
+        total_bytes: 实际读取的总字节数。
+        seconds: 墙钟耗时（秒）。
+    """
+
+    digests: Dict[str, str] = field(default_factory=dict)
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+    total_bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput_mib_s(self) -> float:
+        """吞吐量（MiB/s）；耗时为 0 时返回 0。"""
+
+        return self.total_bytes / (1024 * 1024) / self.seconds if self.seconds > 0 else 0.0
+
+    def describe(self) -> str:
+        """返回一行中文统计摘要。"""
+
+        return (
+            f"{len(self.digests)} 个文件，{self.total_bytes / (1024 * 1024):.1f} MiB，"
+            f"{self.seconds:.2f} 秒，{self.throughput_mib_s:.1f} MiB/s"
+        )
+
+
+def _hash_one(path: str) -> Tuple[str, str, int]:
+    return path, compute_sha256(path), os.path.getsize(path)
+
+
+def hash_files(paths: Iterable[str], workers: Optional[int] = None) -> HashReport:
+    """在线程池中并发计算多个文件的 SHA256。
+
+    单个文件读取失败不影响其余文件，错误记录于 `HashReport.errors`。
+
+    Args:
+        paths: 文件路径（重复路径只计算一次）。
+        workers: 线程数；缺省为 `min(8, CPU 数 + 2)`。
+
+    Returns:
+        哈希结果与吞吐统计。
+    """
+
+    unique = list(dict.fromkeys(paths))
+    report = HashReport()
+    if not unique:
+        return report
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = workers or min(8, (os.cpu_count() or 1) + 2)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(workers, len(unique))) as pool:
+        futures = {pool.submit(_hash_one, p): p for p in unique}
+        for fut, p in futures.items():
+            try:
+                path, digest, size = fut.result()
+            except OSError as e:
+                report.errors.append((p, str(e)))
+                continue
+            report.digests[path] = digest
+            report.total_bytes += size
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+class HashMemo:
+    """按 (path, size, mtime_ns) 记忆文件 SHA256，并持久化为 JSON。
+
+    Attributes:
+        memo_path: 持久化 JSON 路径；为 None 时仅在内存中记忆。
+        hits: 命中次数（未重新读取文件）。
+        misses: 未命中次数（实际计算了 SHA256）。
+    """
+
+    def __init__(self, memo_path: Optional[str] = DEFAULT_MEMO_PATH) -> None:
+        """加载已持久化的记忆；文件不存在或损坏时从空开始。"""
+
+        self.memo_path = memo_path
+        self.entries: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        if memo_path:
+            self.entries = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.memo_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def sha256(self, path: str) -> str:
+        """返回文件 SHA256；(size, mtime_ns) 未变化时直接复用记忆值。
+
+        Args:
+            path: 文件路径。
+
+        Returns:
+            十六进制 SHA256 字符串。
+        """
+
+        key = os.path.abspath(path)
+        st = os.stat(key)
+        cached = self._lookup(key, st)
+        if cached is not None:
+            return cached
+        digest = compute_sha256(key)
+        self.misses += 1
+        self.entries[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        self.save()
+        return digest
+
+    def _lookup(self, key: str, st: os.stat_result) -> Optional[str]:
+        cached = self.entries.get(key)
+        if cached and cached.get("size") == st.st_size and cached.get("mtime_ns") == st.st_mtime_ns:
+            self.hits += 1
+            return cached["sha256"]
+        return None
+
+    def sha256_many(self, paths: Iterable[str], workers: Optional[int] = None) -> Tuple[Dict[str, str], HashReport]:
+        """批量返回文件 SHA256：记忆命中的直接复用，其余在线程池中并发计算，最后统一持久化。
+
+        Args:
+            paths: 文件路径。
+            workers: 线程数（见 `hash_files`）。
+
+        Returns:
+            `({path: sha256}, 本次实际计算部分的 HashReport)`；返回字典以调用方传入的路径为键。
+        """
+
+        result: Dict[str, str] = {}
+        pending: Dict[str, Tuple[str, os.stat_result]] = {}
+        for path in paths:
+            key = os.path.abspath(path)
+            st = os.stat(key)
+            cached = self._lookup(key, st)
+            if cached is not None:
+                result[path] = cached
+            else:
+                pending[path] = (key, st)
+        report = hash_files([key for key, _ in pending.values()], workers=workers)
+        for path, (key, st) in pending.items():
+            digest = report.digests.get(key)
+            if digest is None:
+                continue
+            self.misses += 1
+            self.entries[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+            result[path] = digest
+        if pending:
+            self.save()
+        return result, report
+
+    def save(self) -> None:
+        """持久化记忆（与磁盘上其他进程写入的条目合并后原子替换）。"""
+
+        if not self.memo_path:
+            return
+        merged = self._load()
+        merged.update(self.entries)
+        os.makedirs(os.path.dirname(self.memo_path), exist_ok=True)
+        tmp = f"{self.memo_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(merged, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.memo_path)
+        except OSError as e:
+            print(f"警告：SHA256 记忆写入失败 -> {e}")
+
+
+_default_memo: Optional[HashMemo] = None
+
+
+def default_memo() -> HashMemo:
+    """返回进程内共享的默认记忆实例。"""
+
+    global _default_memo
+    if _default_memo is None:
+        _default_memo = HashMemo()
+    return _default_memo
+
+
+def memoized_sha256(path: str) -> str:
+    """经默认记忆实例计算文件 SHA256（同一次运行内每个文件至多读取一次）。"""
+
+    return default_memo().sha256(path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """命令行入口：并发计算给定文件的 SHA256 并输出吞吐量（不读写记忆）。"""
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="并发计算文件 SHA256 并汇报吞吐量")
+    parser.add_argument("paths", nargs="+", help="文件路径")
+    parser.add_argument("--jobs", type=int, default=None, metavar="N", help="线程数（默认 min(8, CPU 数 + 2)）")
+    args = parser.parse_args(argv)
+
+    report = hash_files(args.paths, workers=args.jobs)
+    for path, digest in report.digests.items():
+        print(f"{digest}  {path}")
+    for path, err in report.errors:
+        print(f"警告：无法读取 {path} -> {err}")
+    print(f"吞吐：{report.describe()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""GMSL（全球平均海平面）文本解析引擎：由文件头一次识别格式，数值块整体解析。
+
+支持的格式：
+
+- `podaac-v5`：PO.DAAC `MERGED_TP_J1_OSTM_OST_GMSL_ASCII_V5.x`，`HDR` 开头的头部以
+  `Header_End` 结束，列说明形如 `HDR <列号> <说明>`，其后为空白分隔的等宽数值块；
+- `tpjaos-5.2`：NASA 海平面网站发布的 `GMSL_TPJAOS_5.2.txt`，列布局同上，头部注明 TPJAOS；
+- `nasa-indicator`：`NASA_SSH_GMSL_INDICATOR.txt`，无 `HDR` 头，首列为日期（`YYYY-MM-DD` /
+  `YYYY/MM/DD`）或小数年，其后首个数值为海平面（通常为 cm）。
+
+此前的解析器逐行判断格式，并对每个字段做 `float()` 试探。这里先按头部确定格式与列号：
+V5 数值块整体切分一次，按列步长只将年份列与数值列批量转为 float64；指标格式则以一条
+编译好的正则在整个缓冲区上提取 `(年份, 数值)`。
+"""
+
+from __future__ import annotations
+
+import io
+import re
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+
+
+GMSL_MISSING = 99900.0
+DEFAULT_BATCH_ROWS = 65536
+
+# V5 头部缺少列说明时的默认列号（1 起，与头部说明一致）
+DEFAULT_YEAR_COLUMN = 3
+DEFAULT_VALUE_COLUMN = 11  # smoothed GMSL（GIA applied），mm
+DEFAULT_FALLBACK_COLUMN = 8  # smoothed GMSL（GIA not applied），mm
+
+HDR_COLUMN_RE = re.compile(r"^HDR[ \t]+(\d+)[ \t]+(.*?)[ \t]*$", re.MULTILINE)
+HEADER_END_RE = re.compile(r"^.*Header_End.*(?:\n|$)", re.MULTILINE)
+INDICATOR_ROW_RE = re.compile(
+    r"^[ \t]*(?P<year>\d{4})(?:[-/]\d{1,2}[-/]\d{1,2}|\.\d*)?[^\s,]*[ \t]*[ \t,][ \t,]*"
+    r"(?P<value>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)(?![^\s,])",
+    re.MULTILINE,
+)
+
+
+@dataclass(frozen=True)
+class GmslFormat:
+    """识别出的文件格式。
+
+    Attributes:
+        name: 格式名（`podaac-v5` / `tpjaos-5.2` / `nasa-indicator`）。
+        data_offset: 数值块在文本中的起始偏移。
+        year_column: 小数年列号（1 起；指标格式为 None）。
+        value_column: 海平面值列号（1 起；指标格式为 None）。
+        fallback_column: 值列缺失时回退的列号。
+        unit: 头部声明的单位（`mm` / `cm`）；未声明时为 None，按数值量级推断。
+    """
+
+    name: str
+    data_offset: int
+    year_column: Optional[int] = None
+    value_column: Optional[int] = None
+    fallback_column: Optional[int] = None
+    unit: Optional[str] = None
+
+
+def _column_unit(description: str) -> Optional[str]:
+    m = re.search(r"\((mm|cm)\)", description)
+    return m.group(1) if m else None
+
+
+def detect_format(text: str) -> GmslFormat:
+    """按文件头识别 GMSL 文本格式，并由 `HDR <列号>` 说明确定年份与数值列。
+
+    Args:
+        text: 完整文件文本。
+
+    Returns:
+        格式描述。
+    """
+
+    end = HEADER_END_RE.search(text)
+    if end is None and not text.lstrip().upper().startswith("HDR"):
+        return GmslFormat("nasa-indicator", 0)
+
+    if end is not None:
+        header, offset = text[: end.start()], end.end()
+    else:
+        # 无 Header_End 标记：头部止于最后一个 HDR 行
+        last = None
+        for last in re.finditer(r"^HDR.*(?:\n|$)", text, re.MULTILINE | re.IGNORECASE):
+            pass
+        header, offset = text[: last.end()], last.end()
+
+    year_col, value_col, fallback_col = DEFAULT_YEAR_COLUMN, DEFAULT_VALUE_COLUMN, DEFAULT_FALLBACK_COLUMN
+    unit: Optional[str] = "mm"
+    columns = {int(n): desc for n, desc in HDR_COLUMN_RE.findall(header)}
+    if columns:
+        for n, desc in columns.items():
+            lower = desc.lower()
+            if "year" in lower and "fraction" in lower:
+                year_col = n
+            elif "smoothed" in lower and "annual" not in lower and "gmsl" in lower:
+                if "gia applied" in lower or "(gia) applied" in lower:
+                    value_col = n
+                elif "not applied" in lower:
+                    fallback_col = n
+        unit = _column_unit(columns.get(value_col, ""))
+    name = "tpjaos-5.2" if "TPJAOS" in header else "podaac-v5"
+    return GmslFormat(name, offset, year_col, value_col, fallback_col, unit)
+
+
+def _clean_block(block: str) -> str:
+    """去除数值块中夹杂的注释行，并将逗号分隔统一为空白。"""
+
+    if "#" in block or "HDR" in block:
+        block = "\n".join(
+            line for line in block.splitlines() if not line.lstrip().upper().startswith(("#", "HDR"))
+        )
+    if "," in block:
+        block = block.replace(",", " ")
+    return block.strip()
+
+
+def _parse_v5(block: str, fmt: GmslFormat) -> Tuple[np.ndarray, np.ndarray]:
+    """解析 V5 数值块（`block` 为数据段文本，可为其中连续若干整行）。"""
+
+    block = _clean_block(block)
+    empty = (np.empty(0, dtype=np.int64), np.empty(0))
+    if not block:
+        return empty
+    ncols = len(block.split("\n", 1)[0].split())
+    if ncols < max(fmt.year_column, fmt.value_column):
+        return empty
+
+    # 快速路径：各行字段数一致时整块切分一次，按列步长只转换年份列与数值列
+    tokens = block.split()
+    nrows = block.count("\n") + 1
+    years = values = None
+    if len(tokens) == ncols * nrows:
+        try:
+            years = np.array(tokens[fmt.year_column - 1 :: ncols], dtype=np.float64)
+            values = np.array(tokens[fmt.value_column - 1 :: ncols], dtype=np.float64)
+        except ValueError:
+            years = values = None
+    if years is None:
+        # 行宽不一致或含非数值字段：逐行容错解析，缺失字段记为 NaN
+        table = np.atleast_2d(np.genfromtxt(io.StringIO(block), invalid_raise=False, usecols=range(ncols)))
+        years = table[:, fmt.year_column - 1]
+        values = table[:, fmt.value_column - 1]
+        if fmt.fallback_column is not None and fmt.fallback_column <= ncols:
+            values = np.where(np.isnan(values), table[:, fmt.fallback_column - 1], values)
+
+    keep = ~np.isnan(years) & ~np.isnan(values) & (np.abs(values) < GMSL_MISSING)
+    return np.trunc(years[keep]).astype(np.int64), values[keep]
+
+
+def _parse_indicator(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    rows: List[Tuple[str, str]] = INDICATOR_ROW_RE.findall(text)
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    years, values = zip(*rows)
+    return np.array(years, dtype=np.int64), np.array(values, dtype=np.float64)
+
+
+def mm_scale(fmt: GmslFormat, small: int, total: int) -> float:
+    """毫米换算系数：头部声明为 cm 时为 10；未声明单位时，若超过 80% 的样本绝对值 < 20，视为 cm。
+
+    Args:
+        fmt: 文件格式。
+        small: 绝对值 < 20 的样本数。
+        total: 样本总数。
+    """
+
+    if fmt.unit == "cm":
+        return 10.0
+    if fmt.unit is None and total and small / total > 0.8:
+        return 10.0
+    return 1.0
+
+
+def parse_gmsl_text(text: str) -> Tuple[GmslFormat, np.ndarray, np.ndarray, float]:
+    """解析 GMSL 文本为逐周期样本。
+
+    头部未声明单位时按量级推断：若超过 80% 的样本绝对值 < 20，视为 cm。
+
+    Args:
+        text: 完整文件文本。
+
+    Returns:
+        `(格式, 年份, 数值, 毫米换算系数)`：年份为 int64（小数年取整），数值保持文件原始单位
+        与行序；调用方聚合后再乘换算系数，与逐年均值后换算的结果逐位一致。
+    """
+
+    fmt = detect_format(text)
+    if fmt.name == "nasa-indicator":
+        years, values = _parse_indicator(text)
+    else:
+        years, values = _parse_v5(text[fmt.data_offset :], fmt)
+    return fmt, years, values, mm_scale(fmt, int(np.count_nonzero(np.abs(values) < 20.0)), values.size)
+
+
+def read_gmsl(path: str) -> Tuple[GmslFormat, np.ndarray, np.ndarray, float]:
+    """读取并解析 GMSL 文本文件（见 `parse_gmsl_text`）。"""
+
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return parse_gmsl_text(f.read())
+
+
+def _is_header_line(line: str) -> bool:
+    stripped = line.lstrip().upper()
+    return not stripped or stripped.startswith(("HDR", "#"))
+
+
+def iter_gmsl_batches(
+    path: str, batch_rows: int = DEFAULT_BATCH_ROWS
+) -> Iterator[Tuple[GmslFormat, np.ndarray, np.ndarray]]:
+    """逐批读取 GMSL 文本，内存占用与 `batch_rows` 成正比而与文件大小无关。
+
+    头部逐行读入直至 `Header_End`（或首个数据行）后按 `detect_format` 识别格式，数据段每
+    `batch_rows` 行整块解析一次。数值保持文件原始单位；调用方可按 `mm_scale` 汇总各批的
+    小值计数后统一换算。
+
+    Args:
+        path: GMSL 文本路径。
+        batch_rows: 每批行数。
+
+    Yields:
+        `(格式, 年份, 数值)`：与 `parse_gmsl_text` 相同口径的一批样本。
+    """
+
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        header: List[str] = []
+        pending: List[str] = []
+        for line in f:
+            if "Header_End" in line:
+                header.append(line)
+                break
+            if not _is_header_line(line):
+                pending.append(line)
+                break
+            header.append(line)
+        header_text = "".join(header)
+        if not header_text.lstrip().upper().startswith("HDR") and "Header_End" not in header_text:
+            # 无 HDR 头：指标格式，已读入的行均属数据段
+            fmt = GmslFormat("nasa-indicator", 0)
+            pending = header + pending
+        else:
+            fmt = detect_format(header_text)
+            fmt = GmslFormat(fmt.name, 0, fmt.year_column, fmt.value_column, fmt.fallback_column, fmt.unit)
+
+        def parse(lines: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+            block = "".join(lines)
+            return _parse_indicator(block) if fmt.name == "nasa-indicator" else _parse_v5(block, fmt)
+
+        batch = pending
+        for line in f:
+            batch.append(line)
+            if len(batch) >= batch_rows:
+                yield (fmt,) + parse(batch)
+                batch = []
+        if batch:
+            yield (fmt,) + parse(batch)
@@ -0,0 +1,390 @@
+"""ITRDB 树轮测量的批量导入：逐站点年表聚合 + 站点×年份矩阵。
+
+`parse_itrdb_rwl_template` 面向单个站点文件。整个 ITRDB 区域目录（数千个 `*-rwl-noaa.txt`、
+数百万个年轮测量值）则由本模块处理：
+
+- `site_chronology(path)`：经 `noaa_paleo.read_paleo_table` 读取一个站点的全部树芯，以向量化
+  分组（`np.unique` + `np.bincount`）得到逐年均值与样本深度（该年有测量值的树芯数）；
+- `ingest_directory(root)`：递归收集站点文件，在进程池中流式解析（结果按块返回，不在内存中
+  保留原始测量），定期打印进度；单个文件失败只记入报告，不影响其余站点；
+- `SiteYearMatrix`：将全部站点合并为站点×年份矩阵（均值 float32、样本深度 uint16，缺测为 NaN / 0），
+  以紧凑二进制写出（魔数 + 头长度 + JSON 头 + 小端数组块），供第2课按区域/站点出变体。
+
+命令行：`python scripts/itrdb_batch.py <目录> [-o 输出文件] [--jobs N] [--pattern GLOB]`
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import json
+import os
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from lazy_imports import lazy_module
+from noaa_paleo import read_paleo_table
+from output_txn import write_output_bytes
+
+np = lazy_module("numpy")
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT_DIR = os.path.join(BASE_DIR, ".cache", "itrdb")
+DEFAULT_PATTERN = "*-rwl-noaa.txt"
+MATRIX_MAGIC = b"CGRW1\n"
+PROGRESS_INTERVAL = 2.0  # 秒
+
+
+@dataclass
+class SiteChronology:
+    """一个站点的逐年年表。
+
+    Attributes:
+        site: 站点编号（文件名去掉 `-rwl-noaa.txt`，如 `cana426`）。
+        years: int64 年份（升序，仅含至少一个测量值的年份）。
+        mean: float64 逐年树轮宽度均值（对该年全部树芯测量值取算术平均）。
+        depth: int32 样本深度（该年有测量值的树芯数）。
+        cores: 树芯数。
+        measurements: 有效测量值个数。
+        metadata: 站点信息（`name`、`lat`、`lon`、`elevation_m`、`species`，缺失项省略）。
+    """
+
+    site: str
+    years: np.ndarray
+    mean: np.ndarray
+    depth: np.ndarray
+    cores: int = 0
+    measurements: int = 0
+    metadata: Dict[str, object] = field(default_factory=dict)
+
+
+def site_id(path: str) -> str:
+    """由文件名得到站点编号（`cana426-rwl-noaa.txt` -> `cana426`）。"""
+
+    name = os.path.basename(path)
+    for suffix in ("-rwl-noaa.txt", "-noaa.txt", ".txt"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def _site_metadata(meta: Dict[str, str]) -> Dict[str, object]:
+    """挑选站点头部信息；经纬度与海拔转为数值。"""
+
+    out: Dict[str, object] = {}
+    for key, src, numeric in (
+        ("name", "Site_Name", False),
+        ("lat", "Northernmost_Latitude", True),
+        ("lon", "Westernmost_Longitude", True),
+        ("elevation_m", "Elevation_m", True),
+        ("species", "Tree_Species_Code", False),
+    ):
+        value = meta.get(src)
+        if not value:
+            continue
+        if numeric:
+            try:
+                out[key] = float(value)
+            except ValueError:
+                continue
+        else:
+            out[key] = value
+    return out
+
+
+def site_chronology(path: str) -> SiteChronology:
+    """读取一个 ITRDB 站点文件并按年聚合全部树芯。
+
+    均值按行展开后以 `np.bincount` 累加，累加顺序与逐年逐芯求和一致。
+
+    Args:
+        path: `*-rwl-noaa.txt` 路径。
+
+    Returns:
+        站点年表。
+
+    Raises:
+        KeyError: 文件没有年份变量（`age_CE` / `age`）。
+    """
+
+    table = read_paleo_table(path)
+    year_col = table.first_present("age_CE", "age")
+    cores = [v.name for v in table.variables if v.name != year_col and v.numeric]
+    widths = table.matrix(cores)
+    flat_years = np.repeat(table.column(year_col), widths.shape[1])
+    flat_values = widths.ravel()
+    keep = ~np.isnan(flat_values) & ~np.isnan(flat_years)
+    years, inverse = np.unique(flat_years[keep].astype(np.int64), return_inverse=True)
+    sums = np.bincount(inverse, weights=flat_values[keep], minlength=years.size)
+    depth = np.bincount(inverse, minlength=years.size).astype(np.int32)
+    return SiteChronology(
+        site=site_id(path),
+        years=years,
+        mean=sums / depth if years.size else sums,
+        depth=depth,
+        cores=len(cores),
+        measurements=int(keep.sum()),
+        metadata=_site_metadata(table.metadata),
+    )
+
+
+def _chronology_safe(path: str) -> Tuple[str, Optional[SiteChronology], Optional[str]]:
+    """进程池任务：异常转为错误文本返回，单个文件失败不中断批次。"""
+
+    try:
+        return path, site_chronology(path), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def find_site_files(root: str, pattern: str = DEFAULT_PATTERN) -> List[str]:
+    """递归收集目录下匹配 `pattern` 的站点文件（按路径排序）。"""
+
+    found: List[str] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        found.extend(os.path.join(dirpath, n) for n in sorted(filenames) if fnmatch.fnmatch(n, pattern))
+    return found
+
+
+def iter_chronologies(
+    paths: Sequence[str], workers: Optional[int] = None
+) -> Iterator[Tuple[str, Optional[SiteChronology], Optional[str]]]:
+    """流式解析站点文件，按传入顺序逐个产出 `(路径, 年表或 None, 错误或 None)`。
+
+    Args:
+        paths: 站点文件路径。
+        workers: 进程数；缺省为 `min(CPU 数, 文件数)`，为 1 时在当前进程顺序解析。
+    """
+
+    workers = workers or min(os.cpu_count() or 1, len(paths))
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield _chronology_safe(path)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(1, min(32, len(paths) // (workers * 8)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_chronology_safe, paths, chunksize=chunksize)
+
+
+@dataclass
+class SiteYearMatrix:
+    """站点×年份矩阵。
+
+    Attributes:
+        sites: 站点编号（行顺序）。
+        year0: 第 0 列对应的年份。
+        mean: float32 `(站点数, 年数)` 逐年均值，缺测为 NaN。
+        depth: uint16 `(站点数, 年数)` 样本深度，缺测为 0。
+        site_info: 各站点信息（与 `sites` 同序）。
+    """
+
+    sites: List[str]
+    year0: int
+    mean: np.ndarray
+    depth: np.ndarray
+    site_info: List[Dict[str, object]] = field(default_factory=list)
+
+    @property
+    def years(self) -> np.ndarray:
+        return np.arange(self.year0, self.year0 + self.mean.shape[1], dtype=np.int64)
+
+    @classmethod
+    def from_chronologies(cls, chronologies: Sequence[SiteChronology]) -> "SiteYearMatrix":
+        """按站点编号排序合并各站点年表。"""
+
+        chrons = sorted((c for c in chronologies if c.years.size), key=lambda c: c.site)
+        if not chrons:
+            return cls([], 0, np.empty((0, 0), dtype=np.float32), np.empty((0, 0), dtype=np.uint16))
+        year0 = int(min(c.years[0] for c in chrons))
+        n_years = int(max(c.years[-1] for c in chrons)) - year0 + 1
+        mean = np.full((len(chrons), n_years), np.nan, dtype=np.float32)
+        depth = np.zeros((len(chrons), n_years), dtype=np.uint16)
+        for i, c in enumerate(chrons):
+            cols = c.years - year0
+            mean[i, cols] = c.mean
+            depth[i, cols] = np.minimum(c.depth, np.iinfo(np.uint16).max)
+        info = [
+            dict(c.metadata, cores=c.cores, first_year=int(c.years[0]), last_year=int(c.years[-1])) for c in chrons
+        ]
+        return cls([c.site for c in chrons], year0, mean, depth, info)
+
+    def site_series(self, site: str) -> Tuple[np.ndarray, np.ndarray]:
+        """返回某站点有测量值的 `(年份, 均值)`（float64），可直接构造第2课所用的年序列。
+
+        Raises:
+            KeyError: 站点不存在。
+        """
+
+        try:
+            i = self.sites.index(site)
+        except ValueError:
+            raise KeyError(f"矩阵中没有站点 {site!r}") from None
+        keep = self.depth[i] > 0
+        return self.years[keep], self.mean[i, keep].astype(np.float64)
+
+    def to_bytes(self) -> bytes:
+        """编码为紧凑二进制：魔数 + 头长度 + JSON 头 + 小端 float32 均值块 + uint16 深度块（行优先）。"""
+
+        header = json.dumps(
+            {
+                "sites": self.sites,
+                "year0": self.year0,
+                "n_years": int(self.mean.shape[1]),
+                "site_info": self.site_info,
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        return b"".join(
+            [
+                MATRIX_MAGIC,
+                struct.pack("<I", len(header)),
+                header,
+                self.mean.astype("<f4", copy=False).tobytes(),
+                self.depth.astype("<u2", copy=False).tobytes(),
+            ]
+        )
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "SiteYearMatrix":
+        """由 `to_bytes` 的结果还原矩阵。
+
+        Raises:
+            ValueError: 魔数不匹配或数据块长度不足时抛出。
+        """
+
+        if not blob.startswith(MATRIX_MAGIC):
+            raise ValueError("站点矩阵魔数不匹配")
+        offset = len(MATRIX_MAGIC)
+        (header_len,) = struct.unpack_from("<I", blob, offset)
+        offset += 4
+        header = json.loads(blob[offset : offset + header_len].decode("utf-8"))
+        offset += header_len
+        shape = (len(header["sites"]), header["n_years"])
+        n = shape[0] * shape[1]
+        if len(blob) < offset + 6 * n:
+            raise ValueError("站点矩阵数据块被截断")
+        mean = np.frombuffer(blob, dtype="<f4", count=n, offset=offset).reshape(shape)
+        depth = np.frombuffer(blob, dtype="<u2", count=n, offset=offset + 4 * n).reshape(shape)
+        return cls(header["sites"], header["year0"], mean, depth, header.get("site_info", []))
+
+
+def load_matrix(path: str) -> SiteYearMatrix:
+    """读取 `SiteYearMatrix.to_bytes` 写出的文件。"""
+
+    with open(path, "rb") as f:
+        return SiteYearMatrix.from_bytes(f.read())
+
+
+@dataclass
+class IngestReport:
+    """一次批量导入的结果。
+
+    Attributes:
+        files: 待处理文件数。
+        sites: 成功聚合的站点数。
+        measurements: 有效测量值总数。
+        failed: 失败文件 `(路径, 错误)`。
+        output: 矩阵输出路径（未写出时为 None）。
+        seconds: 墙钟耗时（秒）。
+    """
+
+    files: int = 0
+    sites: int = 0
+    measurements: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+    output: Optional[str] = None
+    seconds: float = 0.0
+
+    def describe(self) -> str:
+        """返回一行中文统计摘要。"""
+
+        return (
+            f"{self.files} 个文件，{self.sites} 个站点，{self.measurements} 个测量值，"
+            f"失败 {len(self.failed)} 个，{self.seconds:.2f} 秒"
+        )
+
+
+def ingest_directory(
+    root: str,
+    out_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    pattern: str = DEFAULT_PATTERN,
+    progress: bool = True,
+) -> Tuple[SiteYearMatrix, IngestReport]:
+    """批量导入一个 ITRDB 目录并写出站点×年份矩阵。
+
+    Args:
+        root: ITRDB 区域目录（递归搜索）。
+        out_path: 矩阵输出路径；为 None 时不写文件。
+        workers: 并行进程数（见 `iter_chronologies`）。
+        pattern: 站点文件名通配符。
+        progress: 是否定期打印进度。
+
+    Returns:
+        `(矩阵, 导入报告)`。
+    """
+
+    start = time.perf_counter()
+    paths = find_site_files(root, pattern)
+    report = IngestReport(files=len(paths))
+    chronologies: List[SiteChronology] = []
+    seen: Dict[str, str] = {}
+    last = start
+    for done, (path, chron, err) in enumerate(iter_chronologies(paths, workers), 1):
+        if chron is None:
+            report.failed.append((path, err or "未知错误"))
+        elif chron.site in seen:
+            report.failed.append((path, f"站点编号 {chron.site} 与 {seen[chron.site]} 重复，已跳过"))
+        else:
+            seen[chron.site] = path
+            chronologies.append(chron)
+            report.measurements += chron.measurements
+        now = time.perf_counter()
+        if progress and (now - last >= PROGRESS_INTERVAL or done == len(paths)):
+            last = now
+            print(
+                f"ITRDB 导入进度：{done}/{len(paths)} 个文件（{done * 100 // max(1, len(paths))}%），"
+                f"{report.measurements} 个测量值，失败 {len(report.failed)} 个"
+            )
+
+    matrix = SiteYearMatrix.from_chronologies(chronologies)
+    report.sites = len(matrix.sites)
+    if out_path is not None:
+        write_output_bytes(out_path, matrix.to_bytes(), backup=False)
+        report.output = out_path
+    report.seconds = time.perf_counter() - start
+    return matrix, report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """命令行入口：导入目录并输出统计与失败文件。"""
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="批量导入 ITRDB 树轮测量并写出站点×年份矩阵")
+    parser.add_argument("root", help="ITRDB 区域目录（递归搜索站点文件）")
+    parser.add_argument("-o", "--output", help="矩阵输出路径（默认 .cache/itrdb/<目录名>.cgrw）")
+    parser.add_argument("--jobs", type=int, default=None, metavar="N", help="并行进程数（默认 CPU 数）")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN, help=f"站点文件名通配符（默认 {DEFAULT_PATTERN}）")
+    args = parser.parse_args(argv)
+
+    out_path = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, os.path.basename(os.path.normpath(args.root)) + ".cgrw"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    matrix, report = ingest_directory(args.root, out_path, workers=args.jobs, pattern=args.pattern)
+    print(f"ITRDB 批量导入：{report.describe()}")
+    if matrix.sites:
+        print(f"- 矩阵: {report.output}（{len(matrix.sites)} 站点 × {matrix.mean.shape[1]} 年，起始 {matrix.year0}）")
+    for path, err in report.failed:
+        print(f"警告：{path} 导入失败 -> {err}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""按需导入重量级依赖（numpy / matplotlib.pyplot / xlrd）。
+
+`lazy_module(name)` 返回一个模块占位对象：首次访问其属性时才真正执行导入，此后与普通
+模块无异。各脚本以 `np = lazy_module("numpy")` 代替 `import numpy as np`，只做元数据刷新、
+增量构建判定等不触及数组计算的运行即可免去 numpy / matplotlib 的启动开销。
+
+要求：模块导入阶段不得访问占位对象的属性（类型注解须为字符串，即启用
+`from __future__ import annotations`）。
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_module(name: str) -> ModuleType:
+    """返回按需导入的模块；已导入时直接返回该模块。
+
+    Args:
+        name: 模块全名（如 `numpy`、`matplotlib.pyplot`）。
+
+    Returns:
+        模块对象（首次访问属性时完成导入）。
+
+    Raises:
+        ModuleNotFoundError: 模块不存在时立即抛出。
+    """
+
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
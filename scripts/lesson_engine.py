@@ -0,0 +1,367 @@
+"""声明式课程输出：课程规格登记 + 统一执行引擎。
+
+每课的教学 CSV 由一条 `LessonSpec` 描述，不再各写一个 `generate_lessonNN_csv`：
+
+- 输入：`LessonInput` 登记的原始输入键（年序列或逐条记录流）；
+- 变换：`Rolling`（滑动均值）、`Join`（按年份内连接）、`Window`（窗口聚合连接）、
+  `Concat`（多路记录流纵向拼接）；
+- 列与格式：`Column` 给出表头、取值字段与小数位；
+- 输出：文件名、是否备份、排序键（外部归并排序）、降采样变体与写出后的钩子（如元数据）。
+
+`LessonEngine` 在一次运行内为全部课程共享输入：每个输入键首次使用时加载并缓存，无论多少课
+引用都只解析一次（记录流输入每次重新打开，保持流式）；加载失败同样缓存，后续引用直接重抛同一
+异常而不再解析。课程之外需要同一原始序列的分支（图像、平滑对比、年度序列存储）也经
+`LessonEngine.load` 取用。按年连接优先在年度序列存储上切片。
+新增课程只需在登记表中追加规格。
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from downsample import csv_variants, variant_path
+from lazy_imports import lazy_module
+from output_txn import write_output_bytes
+from series import window_join
+from smoothing import rolling_mean
+from stages import Pipeline, csv_chunks, csv_sink
+
+np = lazy_module("numpy")
+
+
+@dataclass(frozen=True)
+class LessonInput:
+    """一个可供课程引用的输入。
+
+    Attributes:
+        key: 输入键（变换与列规格中引用的名称）。
+        paths: 所依赖的原始文件（缺失时引用它的课程跳过；亦作增量构建的输入）。
+        load: 无参加载函数：年序列返回 `ColumnarSeries`，记录流返回 `(样点, 年份, 数值)` 迭代器。
+        stream: 是否为一次性记录流（不缓存，每次使用重新调用 `load`）。
+    """
+
+    key: str
+    paths: Tuple[str, ...]
+    load: Callable[[], object]
+    stream: bool = False
+
+
+@dataclass(frozen=True)
+class Column:
+    """输出列：表头、取值字段与格式。
+
+    Attributes:
+        header: 表头文字。
+        field: 变换产出的字段名。
+        digits: 保留小数位；None 表示原样输出。缺失值（None / NaN）输出为空。
+    """
+
+    header: str
+    field: str
+    digits: Optional[int] = None
+
+    def format(self, value: object) -> object:
+        if value is None or value != value:
+            return ""
+        return round(value, self.digits) if self.digits is not None else value
+
+
+@dataclass(frozen=True)
+class Rolling:
+    """单个年序列 + 滑动均值：字段 `year`、`value`、`rolling`（见 `smoothing.rolling_mean`）。"""
+
+    input: str
+    window: int
+    kernel: str = "trailing"
+    min_periods: int = 1
+
+    @property
+    def inputs(self) -> Tuple[str, ...]:
+        return (self.input,)
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return ("year", "value", "rolling")
+
+    def rows(self, engine: "LessonEngine") -> Iterator[tuple]:
+        series = engine.load(self.input)
+        smoothed = rolling_mean(series.values, self.window, kernel=self.kernel, min_periods=self.min_periods)
+        return zip(series.years.tolist(), series.values.tolist(), smoothed.tolist())
+
+
+@dataclass(frozen=True)
+class Join:
+    """按年份内连接若干年序列：字段 `year` 与各输入键，只保留全部输入均有值的年份。"""
+
+    inputs: Tuple[str, ...]
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return ("year",) + self.inputs
+
+    def rows(self, engine: "LessonEngine") -> Iterator[tuple]:
+        return zip(*(col.tolist() for col in engine.join(self.inputs)))
+
+
+@dataclass(frozen=True)
+class Window:
+    """窗口聚合连接：在 `base` 的各年份上聚合 `other` 的 ±`radius` 年窗口（见 `series.window_join`）。
+
+    字段 `year`、`base`、`other`（以输入键命名）；窗口覆盖不足的年份剔除，行序同 `base`。
+    """
+
+    base: str
+    other: str
+    radius: int
+    agg: str = "mean"
+    min_coverage: float = 0.0
+
+    @property
+    def inputs(self) -> Tuple[str, ...]:
+        return (self.base, self.other)
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return ("year", self.base, self.other)
+
+    def rows(self, engine: "LessonEngine") -> Iterator[tuple]:
+        base, other = engine.load(self.base), engine.load(self.other)
+        joined, _ = window_join(
+            base.years, other.years, other.values, self.radius, agg=self.agg, min_coverage=self.min_coverage
+        )
+        keep = ~np.isnan(joined)
+        return zip(base.years[keep].tolist(), base.values[keep].tolist(), joined[keep].tolist())
+
+
+@dataclass(frozen=True)
+class Concat:
+    """纵向拼接多路 `(样点, 年份, 数值)` 记录流：字段 `site`、`year` 与各输入键，数值只填入所属输入的字段。"""
+
+    inputs: Tuple[str, ...]
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return ("site", "year") + self.inputs
+
+    def rows(self, engine: "LessonEngine") -> Iterator[tuple]:
+        def tagged(i: int, key: str) -> Iterator[tuple]:
+            blanks = [None] * len(self.inputs)
+            for site, year, value in engine.load(key):
+                row = list(blanks)
+                row[i] = value
+                yield (site, year, *row)
+
+        return itertools.chain.from_iterable(tagged(i, key) for i, key in enumerate(self.inputs))
+
+
+@dataclass(frozen=True)
+class LessonSpec:
+    """一课（一个 CSV）的声明式规格。
+
+    Attributes:
+        name: 规格名（亦为增量构建目标名，如 `lesson-21-csv`）。
+        title: 汇总输出中的说明（如 `第21课 CSV`）。
+        output: 输出文件名（位于引擎的输出目录）。
+        transform: 变换（`Rolling` / `Join` / `Window` / `Concat`）。
+        columns: 输出列。
+        sort_by: 排序字段（外部归并排序，稳定）；为空时保持变换产出顺序。
+        backup: 覆盖前是否备份旧文件。
+        downsample: 降采样变体的目标点数（为空则不生成）。
+        downsample_xy: 降采样所用横纵坐标字段。
+        downsample_method: `lttb` 或 `minmax`。
+        after: 写出后以输出路径调用的钩子（如写元数据）。
+        extra_outputs: 钩子写出的文件（计入增量构建输出）。
+        optional: 为 True 时生成失败只记警告，不中断运行。
+        version: 生成逻辑版本号（增量构建用）。
+    """
+
+    name: str
+    title: str
+    output: str
+    transform: object
+    columns: Tuple[Column, ...]
+    sort_by: Tuple[str, ...] = ()
+    backup: bool = False
+    downsample: Tuple[int, ...] = ()
+    downsample_xy: Tuple[str, str] = ("year", "value")
+    downsample_method: str = "lttb"
+    after: Optional[Callable[[str], object]] = None
+    extra_outputs: Tuple[str, ...] = ()
+    optional: bool = False
+    version: str = "1"
+
+
+@dataclass
+class LessonResult:
+    """一条规格的执行结果。
+
+    Attributes:
+        spec: 规格。
+        path: 输出路径；跳过或失败时为 None。
+        warnings: 提示与警告信息。
+    """
+
+    spec: LessonSpec
+    path: Optional[str] = None
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def summary(self) -> str:
+        if self.path is not None:
+            return f"- {self.spec.title}: {self.path}"
+        return f"- {self.spec.title}: 跳过（待提供原始数据）"
+
+
+class LessonEngine:
+    """按规格生成课程 CSV；同一引擎实例内每个输入至多加载一次。"""
+
+    def __init__(
+        self,
+        inputs: Sequence[LessonInput],
+        out_dir: str,
+        store: Optional[Callable[[], object]] = None,
+    ) -> None:
+        """初始化引擎。
+
+        Args:
+            inputs: 输入登记表。
+            out_dir: 输出目录。
+            store: 返回年度序列存储（`annual_store.AnnualSeriesStore`）的函数；提供时 `Join`
+                对存储中已有的列直接切片连接。
+        """
+
+        self.inputs: Dict[str, LessonInput] = {i.key: i for i in inputs}
+        self.out_dir = out_dir
+        self._store_factory = store
+        self._loaded: Dict[str, object] = {}
+        self._failed: Dict[str, Exception] = {}
+
+    # ---------- 输入 ----------
+
+    def _input(self, key: str) -> LessonInput:
+        try:
+            return self.inputs[key]
+        except KeyError:
+            raise KeyError(f"未登记的课程输入 {key!r}") from None
+
+    def input_paths(self, spec: LessonSpec) -> List[str]:
+        """规格依赖的原始文件（去重，保持顺序）。"""
+
+        return list(dict.fromkeys(p for key in spec.transform.inputs for p in self._input(key).paths))
+
+    def missing_inputs(self, spec: LessonSpec) -> List[str]:
+        """规格依赖但不存在的原始文件。"""
+
+        return [p for p in self.input_paths(spec) if not os.path.exists(p)]
+
+    def load(self, key: str) -> object:
+        """返回输入数据：首次使用时加载并缓存（记录流每次重新打开）。
+
+        Raises:
+            Exception: 加载失败时抛出加载函数的异常；失败亦缓存，同一输入不再重复解析。
+        """
+
+        source = self._input(key)
+        if source.stream:
+            return source.load()
+        if key in self._failed:
+            raise self._failed[key]
+        if key not in self._loaded:
+            try:
+                self._loaded[key] = source.load()
+            except Exception as e:
+                self._failed[key] = e
+                raise
+        return self._loaded[key]
+
+    def join(self, keys: Sequence[str]) -> Tuple[np.ndarray, ...]:
+        """按年份内连接若干年序列：`(years, values_1, ..., values_n)`。"""
+
+        store = self._store_factory() if self._store_factory is not None else None
+        if store is not None and all(k in store for k in keys):
+            return store.join(*keys)
+        series = [self.load(k) for k in keys]
+        years = series[0].years
+        for s in series[1:]:
+            years = np.intersect1d(years, s.years, assume_unique=True)
+        values = []
+        for s in series:
+            _, _, idx = np.intersect1d(years, s.years, assume_unique=True, return_indices=True)
+            values.append(s.values[idx])
+        return (years, *values)
+
+    # ---------- 生成 ----------
+
+    def output_path(self, spec: LessonSpec) -> str:
+        return os.path.join(self.out_dir, spec.output)
+
+    def outputs(self, spec: LessonSpec) -> List[str]:
+        """规格写出的全部文件（CSV、降采样变体与钩子输出）。"""
+
+        path = self.output_path(spec)
+        return [path] + [variant_path(path, t) for t in spec.downsample] + list(spec.extra_outputs)
+
+    def build(self, spec: LessonSpec) -> str:
+        """生成一课输出并执行写出钩子。
+
+        Returns:
+            CSV 输出路径。
+        """
+
+        transform = spec.transform
+        fields = transform.fields
+        rows: Iterable[tuple] = transform.rows(self)
+        if spec.sort_by:
+            positions = [fields.index(f) for f in spec.sort_by]
+            rows = Pipeline(rows).sorted(key=lambda r: tuple(r[i] for i in positions))
+        picks = [(fields.index(c.field), c) for c in spec.columns]
+
+        def render(row: tuple) -> List[object]:
+            return [c.format(row[i]) for i, c in picks]
+
+        header = [c.header for c in spec.columns]
+        path = self.output_path(spec)
+        if spec.downsample:
+            # 降采样需要全部行的坐标，先物化再渲染
+            raw = list(rows)
+            x_i, y_i = (fields.index(f) for f in spec.downsample_xy)
+            data = b"".join(csv_chunks(header, map(render, raw)))
+            write_output_bytes(path, data, backup=spec.backup)
+            x = [r[x_i] for r in raw]
+            y = [r[y_i] for r in raw]
+            for target, variant in csv_variants(data, x, y, spec.downsample, spec.downsample_method).items():
+                write_output_bytes(variant_path(path, target), variant, backup=False)
+        else:
+            Pipeline(rows).map(render).sink(csv_sink(path, header, backup=spec.backup))
+
+        if spec.after is not None:
+            spec.after(path)
+        return path
+
+    def run(self, specs: Sequence[LessonSpec]) -> List[LessonResult]:
+        """按登记顺序执行规格。
+
+        原始文件缺失的规格跳过并记提示；`optional` 规格失败时记警告，其余异常向上抛出。
+
+        Returns:
+            各规格的执行结果（与 `specs` 同序）。
+        """
+
+        results: List[LessonResult] = []
+        for spec in specs:
+            res = LessonResult(spec)
+            missing = self.missing_inputs(spec)
+            if missing:
+                res.warnings.append(f"提示：{spec.title} 所需数据不存在或不全，跳过 -> {', '.join(missing)}")
+            else:
+                try:
+                    res.path = self.build(spec)
+                except Exception as e:
+                    if not spec.optional:
+                        raise
+                    res.warnings.append(f"警告：{spec.title} 生成失败 -> {e}")
+            results.append(res)
+        return results
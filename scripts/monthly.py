@@ -0,0 +1,284 @@
+"""月分辨率气候序列引擎：GISTEMP 逐月温度异常与 Mauna Loa 逐月 CO₂。
+
+年度解析器只保留 GISTEMP 的 J-D 列、并把 CO₂ 月值立即平均为年值，季节循环与 Keeling 曲线
+所需的逐月细节随之丢失。这里把逐月数据读入按月对齐的列式数组 `MonthlySeries`：
+
+- 月序号 `year * 12 + (month - 1)` 连续递增，各列等长，无数据的月份为 NaN；
+- 年、季（DJF / MAM / JJA / SON）聚合均为一次向量化分组：由月序号直接算出组号，
+  `np.bincount` 按月份顺序累加（与逐组求和的浮点结果一致），有效月数不足的组剔除；
+- DJF 沿用 GISTEMP 约定，归入 1、2 月所在年份（含上一年 12 月）；
+- 滑动聚合在连续月轴上调用 `smoothing.rolling_mean`，缺测月份不参与计算。
+"""
+
+from __future__ import annotations
+
+import csv
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from lazy_imports import lazy_module
+from smoothing import rolling_mean
+
+np = lazy_module("numpy")
+
+
+MONTH_NAMES = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+SEASONS = ("DJF", "MAM", "JJA", "SON")
+
+# GISTEMP 缺测标记
+GISTEMP_MISSING = "***"
+
+
+class MonthlySeries:
+    """按月对齐的多列序列。
+
+    Attributes:
+        month0: 第 0 项的月序号（`year * 12 + month - 1`）。
+        columns: 列名 -> float64 数组（等长，缺测为 NaN）。
+    """
+
+    __slots__ = ("month0", "columns")
+
+    def __init__(self, month0: int, columns: Mapping[str, Sequence[float]]) -> None:
+        """构造序列。
+
+        Raises:
+            ValueError: 各列长度不一致时抛出。
+        """
+
+        self.month0 = int(month0)
+        self.columns: Dict[str, np.ndarray] = {k: np.asarray(v, dtype=np.float64) for k, v in columns.items()}
+        if len({v.shape for v in self.columns.values()}) > 1:
+            raise ValueError("各月度列长度不一致")
+
+    @classmethod
+    def from_rows(
+        cls, years: Sequence[int], months: Sequence[int], columns: Mapping[str, Sequence[float]]
+    ) -> "MonthlySeries":
+        """由逐行 `(年, 月, 数值...)` 构造；缺失的月份补 NaN。
+
+        Args:
+            years: 年份。
+            months: 月份（1-12）。
+            columns: 列名 -> 与行等长的数值。
+
+        Raises:
+            ValueError: 月份越界或同一月份出现多行。
+        """
+
+        idx = np.asarray(years, dtype=np.int64) * 12 + np.asarray(months, dtype=np.int64) - 1
+        if idx.size == 0:
+            return cls(0, {k: np.empty(0) for k in columns})
+        if np.any((np.asarray(months) < 1) | (np.asarray(months) > 12)):
+            raise ValueError("月份须在 1-12 之间")
+        if np.unique(idx).size != idx.size:
+            raise ValueError("同一月份出现多行记录")
+        month0 = int(idx.min())
+        n = int(idx.max()) - month0 + 1
+        out = {}
+        for name, values in columns.items():
+            col = np.full(n, np.nan)
+            col[idx - month0] = np.asarray(values, dtype=np.float64)
+            out[name] = col
+        return cls(month0, out)
+
+    def __len__(self) -> int:
+        return int(next(iter(self.columns.values())).size) if self.columns else 0
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.columns)
+
+    @property
+    def month_index(self) -> np.ndarray:
+        return np.arange(self.month0, self.month0 + len(self), dtype=np.int64)
+
+    @property
+    def years(self) -> np.ndarray:
+        return self.month_index // 12
+
+    @property
+    def months(self) -> np.ndarray:
+        return self.month_index % 12 + 1
+
+    @property
+    def decimal_years(self) -> np.ndarray:
+        """各月中点的小数年（如 1958 年 3 月 -> 1958.2083）。"""
+
+        return (self.month_index + 0.5) / 12.0
+
+    def column(self, name: str) -> np.ndarray:
+        """按列名返回数组。
+
+        Raises:
+            KeyError: 没有该列。
+        """
+
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise KeyError(f"月度序列中没有列 {name!r}（现有：{', '.join(self.names)}）") from None
+
+    def merge(self, other: "MonthlySeries") -> "MonthlySeries":
+        """合并两个序列的列，月轴取两者范围的并集（不重叠的部分为 NaN）。
+
+        Raises:
+            ValueError: 列名重复。
+        """
+
+        clash = set(self.columns) & set(other.columns)
+        if clash:
+            raise ValueError(f"合并的月度序列列名重复: {', '.join(sorted(clash))}")
+        parts = [s for s in (self, other) if len(s)]
+        if not parts:
+            return MonthlySeries(0, {**self.columns, **other.columns})
+        month0 = min(s.month0 for s in parts)
+        n = max(s.month0 + len(s) for s in parts) - month0
+        out: Dict[str, np.ndarray] = {}
+        for s in (self, other):
+            for name, values in s.columns.items():
+                col = np.full(n, np.nan)
+                col[s.month0 - month0 : s.month0 - month0 + values.size] = values
+                out[name] = col
+        return MonthlySeries(month0, out)
+
+    def window(self, start_year: int, end_year: int) -> "MonthlySeries":
+        """截取 `[start_year, end_year]` 年的全部月份（列为视图）。"""
+
+        lo = min(max(start_year * 12 - self.month0, 0), len(self))
+        hi = min(max((end_year + 1) * 12 - self.month0, lo), len(self))
+        return MonthlySeries(self.month0 + lo, {k: v[lo:hi] for k, v in self.columns.items()})
+
+    # ---------- 聚合 ----------
+
+    def _grouped_mean(self, name: str, keys: np.ndarray, min_count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """按升序组号分组求均值，剔除有效项少于 `min_count` 的组。"""
+
+        values = self.column(name)
+        valid = ~np.isnan(values)
+        if not valid.any():
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        offset = keys - keys[0]
+        n_groups = int(offset[-1]) + 1
+        sums = np.bincount(offset[valid], weights=values[valid], minlength=n_groups)
+        counts = np.bincount(offset[valid], minlength=n_groups)
+        keep = counts >= max(1, min_count)
+        return (keys[0] + np.arange(n_groups, dtype=np.int64))[keep], sums[keep] / counts[keep]
+
+    def annual(self, name: str, min_months: int = 12) -> Tuple[np.ndarray, np.ndarray]:
+        """逐年均值。
+
+        Args:
+            name: 列名。
+            min_months: 每年至少需要的有效月数；默认 12（只输出完整年份）。
+
+        Returns:
+            `(years, means)`。
+        """
+
+        return self._grouped_mean(name, self.month_index // 12, min_months)
+
+    def seasonal(self, name: str, min_months: int = 3) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """四季均值（一次分组得到全部季节）。
+
+        Args:
+            name: 列名。
+            min_months: 每季至少需要的有效月数；默认 3。
+
+        Returns:
+            季节名（`SEASONS`）-> `(years, means)`；DJF 的年份为 1、2 月所在年份。
+        """
+
+        # 月序号 +1 后每 3 个月为一组：上一年 12 月与当年 1、2 月落入同一组（组号 = 年 * 4 + 季）
+        keys, means = self._grouped_mean(name, (self.month_index + 1) // 3, min_months)
+        return {season: (keys[keys % 4 == i] // 4, means[keys % 4 == i]) for i, season in enumerate(SEASONS)}
+
+    def rolling(
+        self, name: str, window: int, kernel: str = "centered", min_periods: Optional[int] = None
+    ) -> np.ndarray:
+        """连续月轴上的滑动平均（如 12 个月滑动以消除季节循环）。
+
+        Args:
+            name: 列名。
+            window: 窗口长度（月）。
+            kernel: 窗口核，见 `smoothing.KERNELS`。
+            min_periods: 窗口内至少需要的有效月数；缺省为窗口的一半（向上取整）。
+
+        Returns:
+            与月轴等长的 float64 数组。
+        """
+
+        if min_periods is None:
+            min_periods = (window + 1) // 2
+        return rolling_mean(self.column(name), window, kernel=kernel, min_periods=min_periods)
+
+
+def _floats(tokens: Sequence[str], missing: Sequence[str] = ()) -> np.ndarray:
+    """批量转换为 float64；缺测标记、空串与无法解析的值为 NaN。"""
+
+    cleaned = ["nan" if (t in missing or not t) else t for t in (s.strip() for s in tokens)]
+    try:
+        return np.array(cleaned, dtype=np.float64)
+    except ValueError:
+        out = np.full(len(cleaned), np.nan)
+        for i, t in enumerate(cleaned):
+            try:
+                out[i] = float(t)
+            except ValueError:
+                continue
+        return out
+
+
+def read_gistemp_monthly(path: str, column: str = "temp_anomaly") -> MonthlySeries:
+    """读取 GISTEMP 表（`Year, Jan..Dec, J-D, ...`）的 Jan–Dec 列为逐月温度异常（°C）。
+
+    Raises:
+        RuntimeError: 未找到含 `Year` 与 12 个月份列名的表头。
+    """
+
+    with open(path, "r", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = None
+        for row in reader:
+            if row and row[0].strip() == "Year" and all(m in row for m in MONTH_NAMES):
+                header = [c.strip() for c in row]
+                break
+        if header is None:
+            raise RuntimeError("未找到表头（Year, Jan..Dec），请检查 GISTEMP 文件格式")
+        rows = [r for r in reader if r and r[0].strip().isdigit() and len(r) >= len(header)]
+
+    month_cols = [header.index(m) for m in MONTH_NAMES]
+    first = int(rows[0][0]) if rows else 0
+    years = np.array([int(r[0]) for r in rows], dtype=np.int64)
+    # 逐年 12 个月按行展开为一维（行优先即时间顺序），统一批量转换
+    flat = _floats([r[j] for r in rows for j in month_cols], missing=(GISTEMP_MISSING,))
+    if rows and np.array_equal(years, np.arange(first, first + len(rows))):
+        return MonthlySeries(first * 12, {column: flat})
+    months = np.tile(np.arange(1, 13), len(rows))
+    return MonthlySeries.from_rows(np.repeat(years, 12), months, {column: flat})
+
+
+def read_co2_monthly(path: str) -> MonthlySeries:
+    """读取 NOAA GML Mauna Loa 月度 CSV（`year,month,decimal date,average,deseasonalized,...`）。
+
+    返回列 `co2_average`（月均，ppm）与 `co2_deseasonalized`（去季节，ppm）。旧版文件以负值
+    （`-99.99` / `-9.99`）表示缺测，这里一律记为 NaN。
+    """
+
+    rows: List[List[str]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            parts = line.split(",")
+            if len(parts) < 5 or not parts[0].strip().isdigit():
+                continue
+            rows.append(parts)
+
+    years = [int(r[0]) for r in rows]
+    months = [int(r[1]) for r in rows]
+    columns = {}
+    for name, j in (("co2_average", 3), ("co2_deseasonalized", 4)):
+        values = _floats([r[j] for r in rows])
+        values[values < 0] = np.nan
+        columns[name] = values
+    return MonthlySeries.from_rows(years, months, columns)
@@ -0,0 +1,387 @@
+"""NOAA WDS-Paleo 模板文本读取器（ITRDB 树轮、冰芯、石笋、湖泊沉积等 NCEI 文件通用）。
+
+模板文件结构：
+
+- 以 `#` 开头的元数据头部；其中 `# Variables` 段每个变量一行，形如
+  `## <短名>\\t<what>,<material>,<error>,<units>,<seasonality>,<data_type>,<detail>,<method>,<C|N>,<附加说明>`；
+  `# Missing_Values: <标记>` 声明缺测标记；
+- 数据段：首行为以制表符分隔的变量短名表头，其后每行一条记录。
+
+`read_paleo_table` 一次读入全文：头部只解析一遍得到变量表与缺测标记，表头行把短名映射为
+列号；各行等宽时整块切分一次，按列步长取出所需列并批量转为 float64（字符列保留为字符串），
+缺测标记逐列替换为 NaN。调用方按变量名取列，不再按位置猜测列含义。
+
+远大于内存的文件用 `iter_paleo_batches` 逐批读取：同一套头部解析与列转换，每批只持有
+`batch_rows` 行。
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+
+
+# 未声明时也视为缺测的通用标记（不区分大小写）
+DEFAULT_MISSING = ("", "na", "nan", "n/a", "null")
+DEFAULT_BATCH_ROWS = 65536
+
+VARIABLE_RE = re.compile(r"^##[ \t]*(\S+)[ \t]*(.*?)\s*$")
+# 头部键值行，如 `#   Site_Name: Jasper Benchlands`、`# Missing_Values: NA`
+META_RE = re.compile(r"^#\s*([A-Za-z][A-Za-z0-9_]*)\s*:\s*(.*?)\s*$")
+
+
+@dataclass(frozen=True)
+class PaleoVariable:
+    """`# Variables` 段声明的一个变量。
+
+    Attributes:
+        name: 变量短名（与数据表头一致）。
+        what: 变量含义（如 `total ring width`）。
+        units: 单位（如 `millimeter`）。
+        data_format: 数据类型：`N` 为数值，`C` 为字符。
+        detail: 附加说明（模板最后一个字段）。
+    """
+
+    name: str
+    what: str = ""
+    units: str = ""
+    data_format: str = "N"
+    detail: str = ""
+
+    @property
+    def numeric(self) -> bool:
+        return self.data_format.upper() != "C"
+
+
+@dataclass
+class PaleoTable:
+    """一个模板文件的数据段（按列存储）。
+
+    Attributes:
+        variables: 按表头顺序排列的变量。
+        columns: 变量短名 -> 列数组（数值列为 float64，缺测为 NaN；字符列为 str 对象数组）。
+        missing_values: 生效的缺测标记（小写）。
+        metadata: 头部键值（如 `Site_Name`、`Northernmost_Latitude`），同名键取首个非空值。
+    """
+
+    variables: List[PaleoVariable]
+    columns: Dict[str, np.ndarray] = field(default_factory=dict)
+    missing_values: Tuple[str, ...] = DEFAULT_MISSING
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return int(next(iter(self.columns.values())).size) if self.columns else 0
+
+    @property
+    def names(self) -> List[str]:
+        return [v.name for v in self.variables]
+
+    def variable(self, name: str) -> PaleoVariable:
+        """按短名返回变量声明。
+
+        Raises:
+            KeyError: 文件中没有该变量。
+        """
+
+        for v in self.variables:
+            if v.name == name:
+                return v
+        raise KeyError(f"模板文件中没有变量 {name!r}（现有：{', '.join(self.names)}）")
+
+    def column(self, name: str) -> np.ndarray:
+        """按短名返回列数组。
+
+        Raises:
+            KeyError: 文件中没有该列，或读取时未选取该列。
+        """
+
+        if name not in self.columns:
+            self.variable(name)
+            raise KeyError(f"读取时未选取列 {name!r}")
+        return self.columns[name]
+
+    def first_present(self, *names: str) -> str:
+        """返回候选短名中第一个存在于文件中的变量名。
+
+        Raises:
+            KeyError: 候选均不存在。
+        """
+
+        for name in names:
+            if name in self.columns:
+                return name
+        raise KeyError(f"模板文件中没有变量 {' / '.join(names)}（现有：{', '.join(self.names)}）")
+
+    def matrix(self, names: Sequence[str]) -> np.ndarray:
+        """将若干数值列按行拼为二维 float64 矩阵（行 = 记录，列 = `names` 顺序）。"""
+
+        if not names:
+            return np.empty((len(self), 0))
+        return np.column_stack([self.column(n) for n in names])
+
+
+def parse_variable(line: str) -> Optional[PaleoVariable]:
+    """解析一行 `## <短名>\\t<逗号分隔的变量说明>`；不是变量行时返回 None。"""
+
+    m = VARIABLE_RE.match(line)
+    if m is None:
+        return None
+    name, desc = m.group(1), m.group(2)
+    parts = desc.split(",", 9)
+    parts += [""] * (10 - len(parts))
+    return PaleoVariable(
+        name=name,
+        what=parts[0].strip(),
+        units=parts[3].strip(),
+        data_format=parts[8].strip() or "N",
+        detail=parts[9].strip(),
+    )
+
+
+def _declared_missing(value: str) -> List[str]:
+    """`Missing_Values:` 的取值；带括号的说明性占位文字（部分文件原样保留了模板说明）忽略。"""
+
+    if not value or "(" in value:
+        return []
+    return [v.strip().lower() for v in value.split(",") if v.strip()]
+
+
+def _to_float(tokens: Sequence[str], missing: frozenset) -> np.ndarray:
+    """批量转换为 float64，缺测与无法解析的值为 NaN。
+
+    依次尝试：整列直接转换；把缺测标记（常见大小写形式）替换为 `nan` 后整列转换；
+    最后才逐项转换。
+    """
+
+    try:
+        return np.array(tokens, dtype=np.float64)
+    except ValueError:
+        pass
+    variants = {form for m in missing for form in (m, m.upper(), m.title())}
+    try:
+        return np.array(["nan" if t in variants else t for t in tokens], dtype=np.float64)
+    except ValueError:
+        pass
+    out = np.empty(len(tokens), dtype=np.float64)
+    for i, t in enumerate(tokens):
+        s = t.strip()
+        if s.lower() in missing:
+            out[i] = np.nan
+            continue
+        try:
+            out[i] = float(s)
+        except ValueError:
+            out[i] = np.nan
+    return out
+
+
+@dataclass
+class _Layout:
+    """头部解析结果与数据列布局（整文件解析与分批读取共用）。"""
+
+    variables: List[PaleoVariable]
+    metadata: Dict[str, str]
+    missing_set: frozenset
+    declared: Dict[str, PaleoVariable] = field(default_factory=dict)
+    index: Dict[str, int] = field(default_factory=dict)
+    ncols: int = 0
+    delimiter: Optional[str] = None
+
+    def table(self, wanted: Sequence[str]) -> PaleoTable:
+        ordered = [self.declared.get(n, PaleoVariable(n)) for n in self.index]
+        for name in wanted:
+            if name not in self.index:
+                raise KeyError(f"模板文件中没有变量 {name!r}（现有：{', '.join(self.index)}）")
+        return PaleoTable(ordered, {}, tuple(sorted(self.missing_set)), self.metadata)
+
+
+def _read_header(lines: Iterator[str]) -> Tuple[_Layout, Optional[str]]:
+    """逐行读取 `#` 头部，返回布局（尚未确定列）与首个非空数据行（无数据时为 None）。"""
+
+    variables: List[PaleoVariable] = []
+    metadata: Dict[str, str] = {}
+    missing_values = list(DEFAULT_MISSING)
+    first: Optional[str] = None
+    for line in lines:
+        if line.startswith("#"):
+            if line.startswith("##"):
+                var = parse_variable(line)
+                if var is not None:
+                    variables.append(var)
+            else:
+                m = META_RE.match(line)
+                if m is not None:
+                    key, value = m.group(1), m.group(2)
+                    if key.lower() == "missing_values":
+                        missing_values.extend(_declared_missing(value))
+                    elif value:
+                        metadata.setdefault(key, value)
+            continue
+        if line.strip():
+            first = line
+            break
+    layout = _Layout(variables, metadata, frozenset(missing_values), {v.name: v for v in variables})
+    return layout, first
+
+
+def _resolve_columns(layout: _Layout, first: Optional[str]) -> bool:
+    """由首个数据行确定分隔符与列号映射。
+
+    Returns:
+        首行是否为表头行（是则不属于数据）。
+    """
+
+    layout.delimiter = "\t" if first is not None and "\t" in first else None
+    header = [t.strip() for t in first.split(layout.delimiter)] if first is not None else []
+    if header and all(t in layout.declared for t in header if t):
+        # 表头行：记录每个短名所在的列位置（行尾多余的制表符产生的空列忽略）
+        layout.index = {t: j for j, t in enumerate(header) if t}
+        layout.ncols = len(header)
+        return True
+    # 无表头行：按变量声明顺序对应各列
+    layout.index = {v.name: j for j, v in enumerate(layout.variables)}
+    layout.ncols = len(layout.variables)
+    return False
+
+
+def _parse_rows(
+    layout: _Layout,
+    rows: List[str],
+    wanted: Sequence[str],
+    missing: Optional[Mapping[str, Sequence[str]]],
+) -> Dict[str, np.ndarray]:
+    """将若干数据行（已去除空行与行尾换行）按列批量转换。"""
+
+    if not rows or layout.ncols == 0:
+        return {name: np.empty(0) for name in wanted}
+
+    ncols, delimiter, missing_set = layout.ncols, layout.delimiter, layout.missing_set
+    # 快速路径：各行字段数一致时整块切分一次，按列步长取出所需列；
+    # 任一行字段数不符（参差行）时逐行取列，缺少的字段视为空，避免后续各行整体错位
+    if delimiter == "\t":
+        tokens = "\t".join(rows).split("\t")
+        aligned = len(tokens) == ncols * len(rows) and all(r.count("\t") == ncols - 1 for r in rows)
+    else:
+        tokens = " ".join(rows).split()
+        aligned = len(tokens) == ncols * len(rows) and all(len(r.split()) == ncols for r in rows)
+    if aligned:
+        def column_tokens(j: int) -> List[str]:
+            return tokens[j::ncols]
+    else:
+        split_rows = [r.split(delimiter) for r in rows]
+
+        def column_tokens(j: int) -> List[str]:
+            return [r[j] if j < len(r) else "" for r in split_rows]
+
+    extra = missing or {}
+    columns: Dict[str, np.ndarray] = {}
+    for name in wanted:
+        raw = column_tokens(layout.index[name])
+        var = layout.declared.get(name, PaleoVariable(name))
+        if not var.numeric:
+            columns[name] = np.array(
+                ["" if t.strip().lower() in missing_set else t.strip() for t in raw], dtype=object
+            )
+            continue
+        sentinels = [s.strip().lower() for s in extra.get(name, ())]
+        values = _to_float(raw, missing_set | frozenset(sentinels))
+        for s in sentinels:
+            try:
+                values[values == float(s)] = np.nan
+            except ValueError:
+                continue
+        columns[name] = values
+    return columns
+
+
+def parse_paleo_text(
+    text: str,
+    columns: Optional[Sequence[str]] = None,
+    missing: Optional[Mapping[str, Sequence[str]]] = None,
+) -> PaleoTable:
+    """解析 NOAA WDS-Paleo 模板文本。
+
+    Args:
+        text: 完整文件文本。
+        columns: 只读取这些变量（缺省为全部）；未知变量名会引发 KeyError。
+        missing: 逐列追加的缺测标记 `{短名: [标记, ...]}`（如树轮序列终止标记），数值标记
+            按数值比较。
+
+    Returns:
+        按列存储的数据表。
+
+    Raises:
+        KeyError: `columns` 中含文件未声明的变量。
+    """
+
+    lines = iter(text.splitlines())
+    layout, first = _read_header(lines)
+    rows = [first] if first is not None else []
+    rows += [line for line in lines if line.strip()]
+    if _resolve_columns(layout, first):
+        rows = rows[1:]
+    wanted = list(layout.index) if columns is None else list(columns)
+    table = layout.table(wanted)
+    table.columns = _parse_rows(layout, rows, wanted, missing)
+    return table
+
+
+def read_paleo_table(
+    path: str,
+    columns: Optional[Sequence[str]] = None,
+    missing: Optional[Mapping[str, Sequence[str]]] = None,
+) -> PaleoTable:
+    """读取并解析模板文件（见 `parse_paleo_text`）。"""
+
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return parse_paleo_text(f.read(), columns=columns, missing=missing)
+
+
+def iter_paleo_batches(
+    path: str,
+    columns: Optional[Sequence[str]] = None,
+    missing: Optional[Mapping[str, Sequence[str]]] = None,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+) -> Iterator[PaleoTable]:
+    """逐批读取模板文件：头部只解析一次，数据段每 `batch_rows` 行转换为一个 `PaleoTable`。
+
+    内存占用与批大小成正比，适合远大于内存的文件；各批的变量表、缺测标记与头部信息相同。
+
+    Args:
+        path: 模板文件路径。
+        columns: 只读取这些变量（缺省为全部）。
+        missing: 逐列追加的缺测标记（见 `parse_paleo_text`）。
+        batch_rows: 每批数据行数。
+
+    Yields:
+        按列存储的一批记录（文件无数据行时不产出）。
+
+    Raises:
+        KeyError: `columns` 中含文件未声明的变量。
+    """
+
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        lines = (line.rstrip("\r\n") for line in f)
+        layout, first = _read_header(lines)
+        has_header = _resolve_columns(layout, first)
+        wanted = list(layout.index) if columns is None else list(columns)
+        layout.table(wanted)  # 提前校验列名
+        batch: List[str] = [] if has_header or first is None else [first]
+        for line in lines:
+            if not line.strip():
+                continue
+            batch.append(line)
+            if len(batch) >= batch_rows:
+                table = layout.table(wanted)
+                table.columns = _parse_rows(layout, batch, wanted, missing)
+                yield table
+                batch = []
+        if batch:
+            table = layout.table(wanted)
+            table.columns = _parse_rows(layout, batch, wanted, missing)
+            yield table
@@ -0,0 +1,354 @@
+"""派生资产的事务式写出：同目录临时文件 + 批量 fsync + 提交时原子替换。
+
+长时间的重新生成过程中，静态文件服务器等并发读者不应看到缺失或写到一半的
+`lesson-*.csv` / 元数据 JSON。`OutputTransaction` 将每个输出先写入目标目录下的隐藏临时
+文件（`.<文件名>.tmp-<pid>-<序号>`），每累计 `fsync_batch` 个文件统一 `fsync` 一次；
+`commit()` 时先将旧文件复制入备份存储，再逐个 `os.replace` 为正式文件并同步所在目录。
+提交前任何异常都会回滚（删除临时文件），正式文件保持原状。
+
+用法：
+
+- `with OutputTransaction():` 期间，`write_output_bytes` 写出的文件均暂存于该事务，
+  退出时统一提交；
+- 进程池子进程中以 `staging(txn)` 暂存、`txn.detach()` 交出暂存清单，由父进程
+  `adopt()` 后一并提交，使整次运行的全部输出在同一时刻替换；子进程的状态信息（如“内容未变化”）
+  以 `collect_messages()` 收集后随结果交回，由父进程按分支顺序打印，不与父进程输出交错；
+- 无活动事务时，`write_output_bytes` 自动以单文件事务写出（同样为原子替换）。
+- 逐块生成的大文件以 `write_output_stream` 边生成边写入暂存文件，不在内存中拼接完整内容。
+- 带 `created_at` 时间戳的元数据先经 `keep_created_at` 处理：其余内容未变时沿用旧时间戳，
+  使“内容未变化时跳过”对元数据同样生效。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import filecmp
+import io
+import itertools
+import json
+import os
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from backups import default_manager
+
+
+DEFAULT_FSYNC_BATCH = 32
+
+_counter = itertools.count()
+
+
+@dataclass
+class StagedOutput:
+    """一个已暂存、待提交的输出。
+
+    Attributes:
+        tmp_path: 同目录临时文件路径。
+        final_path: 正式输出路径。
+        backup: 提交时是否先将旧文件备份入存储。
+    """
+
+    tmp_path: str
+    final_path: str
+    backup: bool = True
+
+
+class OutputTransaction:
+    """一次运行的输出事务。"""
+
+    def __init__(self, fsync_batch: int = DEFAULT_FSYNC_BATCH) -> None:
+        """初始化事务。
+
+        Args:
+            fsync_batch: 每累计多少个暂存文件执行一次批量 `fsync`。
+        """
+
+        self.fsync_batch = max(1, fsync_batch)
+        self.staged: Dict[str, StagedOutput] = {}
+        self._unsynced: List[Tuple[int, str]] = []  # (文件描述符, 临时路径)
+        self._outer: Optional[OutputTransaction] = None
+
+    # ---------- 暂存 ----------
+
+    def stage_bytes(self, path: str, data: bytes, backup: bool = True) -> bool:
+        """暂存一个输出；内容与现有正式文件逐字节相同时跳过。
+
+        Args:
+            path: 正式输出路径。
+            data: 完整文件内容。
+            backup: 提交时是否备份旧文件。
+
+        Returns:
+            是否实际暂存（内容未变化时为 False）。
+        """
+
+        final = os.path.abspath(path)
+        previous = self.staged.pop(final, None)
+        if previous is not None:
+            self._discard(previous.tmp_path)
+        if default_manager().unchanged(final, data):
+            print(f"内容未变化，跳过写入 -> {path}")
+            return False
+
+        directory = os.path.dirname(final)
+        os.makedirs(directory, exist_ok=True)
+        tmp = os.path.join(directory, f".{os.path.basename(final)}.tmp-{os.getpid()}-{next(_counter)}")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        except OSError:
+            os.close(fd)
+            self._discard(tmp)
+            raise
+        self._unsynced.append((fd, tmp))
+        self.staged[final] = StagedOutput(tmp, final, backup)
+        if len(self._unsynced) >= self.fsync_batch:
+            self.flush()
+        return True
+
+    def stage_stream(self, path: str, chunks: Iterable[bytes], backup: bool = True) -> bool:
+        """边生成边暂存一个输出：逐块写入临时文件，内存中不持有完整内容。
+
+        写完后与现有正式文件逐块比较，内容相同时丢弃临时文件。
+
+        Args:
+            path: 正式输出路径。
+            chunks: 依次产出的文件内容块。
+            backup: 提交时是否备份旧文件。
+
+        Returns:
+            是否实际暂存（内容未变化时为 False）。
+        """
+
+        final = os.path.abspath(path)
+        previous = self.staged.pop(final, None)
+        if previous is not None:
+            self._discard(previous.tmp_path)
+
+        directory = os.path.dirname(final)
+        os.makedirs(directory, exist_ok=True)
+        tmp = os.path.join(directory, f".{os.path.basename(final)}.tmp-{os.getpid()}-{next(_counter)}")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            for chunk in chunks:
+                view = memoryview(chunk)
+                while view:
+                    view = view[os.write(fd, view):]
+        except BaseException:
+            os.close(fd)
+            self._discard(tmp)
+            raise
+        if os.path.isfile(final) and filecmp.cmp(tmp, final, shallow=False):
+            os.close(fd)
+            self._discard(tmp)
+            print(f"内容未变化，跳过写入 -> {path}")
+            return False
+        self._unsynced.append((fd, tmp))
+        self.staged[final] = StagedOutput(tmp, final, backup)
+        if len(self._unsynced) >= self.fsync_batch:
+            self.flush()
+        return True
+
+    def flush(self) -> None:
+        """对尚未同步的临时文件批量执行 `fsync` 并关闭。"""
+
+        pending, self._unsynced = self._unsynced, []
+        for fd, _ in pending:
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _discard(self, tmp: str) -> None:
+        for i, (fd, path) in enumerate(self._unsynced):
+            if path == tmp:
+                os.close(fd)
+                del self._unsynced[i]
+                break
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+
+    # ---------- 跨进程交接 ----------
+
+    def detach(self) -> List[StagedOutput]:
+        """同步并交出暂存清单（所有权转移给调用方，本事务随即清空）。"""
+
+        self.flush()
+        staged = list(self.staged.values())
+        self.staged.clear()
+        return staged
+
+    def adopt(self, staged: List[StagedOutput]) -> None:
+        """接收其他事务（通常来自子进程）交出的暂存清单。"""
+
+        for item in staged:
+            previous = self.staged.pop(item.final_path, None)
+            if previous is not None:
+                self._discard(previous.tmp_path)
+            self.staged[item.final_path] = item
+
+    # ---------- 提交与回滚 ----------
+
+    def commit(self) -> List[str]:
+        """提交：备份旧文件后原子替换全部暂存输出，并同步所在目录。
+
+        Returns:
+            已替换的正式输出路径列表。
+        """
+
+        self.flush()
+        manager = default_manager()
+        committed: List[str] = []
+        for item in self.staged.values():
+            if item.backup:
+                try:
+                    obj = manager.backup(item.final_path, keep_original=True)
+                    if obj:
+                        print(f"已备份现有文件 -> {obj}")
+                except OSError as e:
+                    print(f"警告：无法备份 {item.final_path} -> {e}")
+            os.replace(item.tmp_path, item.final_path)
+            committed.append(item.final_path)
+        for directory in sorted({os.path.dirname(p) for p in committed}):
+            _fsync_dir(directory)
+        self.staged.clear()
+        return committed
+
+    def rollback(self) -> None:
+        """回滚：删除全部临时文件，正式文件保持不变。"""
+
+        for item in list(self.staged.values()):
+            self._discard(item.tmp_path)
+        self.staged.clear()
+        self.flush()
+
+    def __enter__(self) -> "OutputTransaction":
+        global _current
+        self._outer = _current
+        _current = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        global _current
+        _current = self._outer
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+
+def _fsync_dir(directory: str) -> None:
+    """同步目录项，使重命名在掉电后依然持久（不支持的平台上忽略）。"""
+
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+_current: Optional[OutputTransaction] = None
+
+
+def current_transaction() -> Optional[OutputTransaction]:
+    """返回当前活动的输出事务（无则为 None）。"""
+
+    return _current
+
+
+@contextlib.contextmanager
+def staging(txn: OutputTransaction) -> Iterator[OutputTransaction]:
+    """将 `txn` 设为当前事务但退出时不提交（供子进程暂存后 `detach` 交给父进程）。"""
+
+    global _current
+    outer, _current = _current, txn
+    try:
+        yield txn
+    except BaseException:
+        txn.rollback()
+        raise
+    finally:
+        _current = outer
+
+
+@contextlib.contextmanager
+def collect_messages() -> Iterator[List[str]]:
+    """收集期间打印到标准输出的状态信息（按行），供子进程随结果交回父进程统一打印。
+
+    退出前列表为空，正常退出时填入全部行；异常时先原样输出已收集的内容再抛出，不丢失诊断信息。
+    """
+
+    buf = io.StringIO()
+    lines: List[str] = []
+    try:
+        with contextlib.redirect_stdout(buf):
+            yield lines
+    except BaseException:
+        sys.stdout.write(buf.getvalue())
+        raise
+    lines.extend(buf.getvalue().splitlines())
+
+
+def write_output_bytes(path: str, data: bytes, backup: bool = True) -> bool:
+    """写出一个派生资产：有活动事务时暂存其中，否则以单文件事务原子写出。
+
+    Args:
+        path: 输出路径。
+        data: 完整文件内容。
+        backup: 覆盖前是否备份旧文件。
+
+    Returns:
+        是否实际写出（内容未变化时为 False）。
+    """
+
+    txn = current_transaction()
+    if txn is not None:
+        return txn.stage_bytes(path, data, backup=backup)
+    with OutputTransaction() as single:
+        return single.stage_bytes(path, data, backup=backup)
+
+
+def write_output_stream(path: str, chunks: Iterable[bytes], backup: bool = True) -> bool:
+    """流式写出一个派生资产（内容块逐个写入暂存文件），事务语义同 `write_output_bytes`。"""
+
+    txn = current_transaction()
+    if txn is not None:
+        return txn.stage_stream(path, chunks, backup=backup)
+    with OutputTransaction() as single:
+        return single.stage_stream(path, chunks, backup=backup)
+
+
+def keep_created_at(path: str, obj: Mapping[str, object]) -> Dict[str, object]:
+    """除 `created_at` 外与现有 JSON 文件内容相同时，沿用其 `created_at`。
+
+    避免仅时间戳不同导致元数据每次运行都被重写并备份。
+
+    Args:
+        path: 现有 JSON 文件路径（不存在或无法解析时视为无旧内容）。
+        obj: 待写出的对象。
+
+    Returns:
+        待写出的对象（必要时替换为旧的 `created_at`）。
+    """
+
+    obj = dict(obj)
+    if "created_at" not in obj:
+        return obj
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        return obj
+    if not isinstance(previous, dict) or "created_at" not in previous:
+        return obj
+    if {k: v for k, v in previous.items() if k != "created_at"} == {k: v for k, v in obj.items() if k != "created_at"}:
+        obj["created_at"] = previous["created_at"]
+    return obj
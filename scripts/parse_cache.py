@@ -0,0 +1,175 @@
+"""原始数据解析结果的内容寻址磁盘缓存。
+
+缓存键由原始文件的 SHA256（经 `file_hashing` 记忆化）、解析函数名、解析器版本号与附加参数共同决定；
+原始文件内容或解析逻辑（版本号）变化后自动失效，无需手动清理。
+
+缓存条目即解析结果 `ColumnarSeries` 的紧凑二进制形式（见 `series.ColumnarSeries.to_bytes`）：
+小端 int64 年份列、float64 数值列与可选 uint16 样点编码列。
+命中时直接由字节还原数组，不再逐行分词解析原始文本。
+
+缓存目录总大小超过上限时，按最近使用时间（命中时刷新 mtime）淘汰最旧条目。
+设置环境变量 `CG_NO_PARSE_CACHE=1` 可整体禁用缓存（子进程同样生效）。
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+from typing import Callable, List, Optional, Type
+
+from file_hashing import memoized_sha256
+from series import ColumnarSeries
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "parse-cache")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+ENTRY_SUFFIX = ".bin"
+
+
+class ParseCache:
+    """大小受限的解析结果磁盘缓存（LRU 淘汰）。"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """初始化缓存。
+
+        Args:
+            cache_dir: 缓存目录。
+            max_bytes: 缓存目录总大小上限（字节）。
+        """
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def entry_path(self, key: str) -> str:
+        """返回缓存键对应的条目路径。"""
+
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存条目；命中时刷新 mtime 作为最近使用时间。"""
+
+        path = self.entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return blob
+
+    def put(self, key: str, blob: bytes) -> None:
+        """写入缓存条目（临时文件 + 原子替换），随后执行容量淘汰。"""
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.entry_path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self) -> List[str]:
+        """按最近使用时间淘汰最旧条目，直至总大小不超过上限。
+
+        Returns:
+            被删除的条目路径列表。
+        """
+
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return []
+        for name in names:
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+            total += st.st_size
+
+        removed: List[str] = []
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed.append(path)
+        return removed
+
+
+def cache_disabled() -> bool:
+    """是否通过环境变量 `CG_NO_PARSE_CACHE` 禁用了解析缓存。"""
+
+    return os.environ.get("CG_NO_PARSE_CACHE", "") not in ("", "0")
+
+
+_default_cache: Optional[ParseCache] = None
+
+
+def default_cache() -> ParseCache:
+    """返回进程内共享的默认缓存实例。"""
+
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ParseCache()
+    return _default_cache
+
+
+def cached_parser(record_type: Type, version: str) -> Callable:
+    """解析函数装饰器：按 (文件 SHA256, 函数名, 版本, 附加参数) 缓存解析结果。
+
+    被装饰函数的首个参数须为原始文件路径，返回记录类型为 `record_type` 的 `ColumnarSeries`。
+    修改解析逻辑时递增 `version`，旧条目即不再命中并随容量淘汰清除。
+
+    Args:
+        record_type: 返回序列的记录数据类类型。
+        version: 解析器版本号。
+
+    Returns:
+        装饰器。
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(path: str, *args, **kwargs):
+            if cache_disabled() or not os.path.isfile(path):
+                return fn(path, *args, **kwargs)
+            key_src = json.dumps(
+                [memoized_sha256(path), fn.__name__, version, repr(args), repr(sorted(kwargs.items()))],
+                ensure_ascii=False,
+            )
+            key = hashlib.sha256(key_src.encode("utf-8")).hexdigest()
+            cache = default_cache()
+            blob = cache.get(key)
+            if blob is not None:
+                try:
+                    return ColumnarSeries.from_bytes(blob, record_type)
+                except (ValueError, KeyError) as e:
+                    print(f"警告：解析缓存条目损坏，重新解析 -> {e}")
+            series = fn(path, *args, **kwargs)
+            try:
+                cache.put(key, series.to_bytes())
+            except OSError as e:
+                print(f"警告：解析缓存写入失败 -> {e}")
+            return series
+
+        wrapper.uncached = fn
+        wrapper.version = version
+        return wrapper
+
+    return decorator
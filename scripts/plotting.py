@@ -0,0 +1,289 @@
+"""示例图渲染子系统（matplotlib，无界面后端）。
+
+从 `process_data_assets` 拆出，仅在确实需要渲染示例图时才被导入，使只生成元数据或 CSV 的
+运行免于 matplotlib 的启动与字体缓存扫描开销。
+
+- 后端：导入本模块时显式选用 `CG_MPL_BACKEND`（默认 Agg）；`matplotlib.pyplot` 推迟到
+  首次绘图时加载，图像缓存命中时只需读取 `rcParams`。
+- 字体：`resolve_cjk_font` 每个进程只按候选列表解析一次可显示中文的字体并缓存，不再写死
+  macOS 的 Heiti TC；找不到时回退 matplotlib 默认字体并只提示一次，同时屏蔽 `warnings` 与
+  `matplotlib.mathtext` / `font_manager` 日志中的逐字缺字提示，避免 Linux 构建机上刷屏。
+- 批量：`render_figures` 接收一组 `FigureSpec`，可在进程池中并行渲染；子进程的输出暂存后
+  交回父进程的当前事务统一提交。PNG 不写入 `Software` 等元数据，同一输入逐字节一致，
+  图像缓存因而稳定。
+"""
+
+from __future__ import annotations
+
+import functools
+import io
+import logging
+import os
+import re
+import warnings
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import matplotlib
+
+from figure_cache import cached_figure, record_figure
+from lazy_imports import lazy_module
+from output_txn import OutputTransaction, StagedOutput, collect_messages, current_transaction, staging, write_output_bytes
+from series import ColumnarSeries
+
+RENDER_BACKEND = os.environ.get("CG_MPL_BACKEND", "") or "Agg"
+matplotlib.use(RENDER_BACKEND)
+plt = lazy_module("matplotlib.pyplot")
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSETS_IMAGES_DIR = os.path.join(BASE_DIR, "assets", "images")
+# 示例图渲染 DPI（计入图像缓存键）
+FIGURE_DPI = 160
+# PNG 元数据：去除默认写入的 matplotlib 版本（`Software`），输出只取决于图像内容
+PNG_METADATA = {"Software": None}
+
+# 可显示中文的字体候选（按优先级）：macOS、Windows、Linux 常见 CJK 字体
+CJK_FONT_CANDIDATES = (
+    "Heiti TC",
+    "PingFang SC",
+    "Hiragino Sans GB",
+    "Microsoft YaHei",
+    "SimHei",
+    "Noto Sans CJK SC",
+    "Noto Sans SC",
+    "Source Han Sans SC",
+    "WenQuanYi Zen Hei",
+    "WenQuanYi Micro Hei",
+    "Droid Sans Fallback",
+    "Arial Unicode MS",
+)
+
+
+# 无中文字体时 matplotlib 对每个汉字各记一条的缺字日志
+MISSING_GLYPH_RE = re.compile(r"does not have a glyph|Glyph .* missing from font|findfont: Font family")
+MISSING_GLYPH_LOGGERS = ("matplotlib.mathtext", "matplotlib._mathtext", "matplotlib.font_manager")
+
+
+class _MissingGlyphFilter(logging.Filter):
+    """丢弃缺字日志记录，其余日志照常输出。"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not MISSING_GLYPH_RE.search(record.getMessage())
+
+
+def _silence_missing_glyphs() -> None:
+    """屏蔽逐字的缺字警告与日志（仅在已提示回退默认字体后调用）。"""
+
+    warnings.filterwarnings("ignore", message=r"Glyph .* missing from font", category=UserWarning)
+    for name in MISSING_GLYPH_LOGGERS:
+        logger = logging.getLogger(name)
+        if not any(isinstance(f, _MissingGlyphFilter) for f in logger.filters):
+            logger.addFilter(_MissingGlyphFilter())
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_cjk_font() -> Optional[str]:
+    """解析本机可用的中文字体（每个进程只解析一次）。
+
+    环境变量 `CG_CJK_FONT` 指定的字体优先，其次依次匹配 `CJK_FONT_CANDIDATES`，
+    最后取名称含 CJK 的任一已安装字体。
+
+    Returns:
+        字体族名；本机没有中文字体时返回 None（同时提示一次并屏蔽逐字的缺字警告）。
+    """
+
+    from matplotlib import font_manager
+
+    installed = {f.name for f in font_manager.fontManager.ttflist}
+    preferred = os.environ.get("CG_CJK_FONT", "")
+    for name in ((preferred,) if preferred else ()) + CJK_FONT_CANDIDATES:
+        if name in installed:
+            return name
+    cjk = sorted(name for name in installed if "CJK" in name)
+    if cjk:
+        return cjk[0]
+    print(
+        "警告：未找到可显示中文的字体，示例图回退为 matplotlib 默认字体（中文将显示为方框）；"
+        "可安装 Noto Sans CJK 或以 CG_CJK_FONT 指定字体"
+    )
+    _silence_missing_glyphs()
+    return None
+
+
+def configure_chinese_font() -> None:
+    """应用示例图的中文字体样式：使用解析到的 CJK 字体，并设置 `axes.unicode_minus` 为 False。"""
+
+    font = resolve_cjk_font()
+    matplotlib.rcParams["font.family"] = font if font is not None else "sans-serif"
+    matplotlib.rcParams["axes.unicode_minus"] = False
+
+
+# 兼容旧名称（此前写死 macOS 的 Heiti TC）
+configure_matplotlib_for_mac_chinese = configure_chinese_font
+
+
+def save_figure_png(out_path: str) -> str:
+    """将当前图像渲染为 PNG 并经输出事务原子写出（内容未变化时跳过），并登记到图像缓存。"""
+
+    buf = io.BytesIO()
+    plt.savefig(buf, format="png", metadata=PNG_METADATA)
+    png = buf.getvalue()
+    write_output_bytes(out_path, png, backup=False)
+    record_figure(out_path, png)
+    return out_path
+
+
+@dataclass(frozen=True)
+class FigureSpec:
+    """一张示例图的渲染任务。
+
+    Attributes:
+        name: 任务名（如 `lesson-15`），用于错误信息。
+        plot: 模块级绘图函数（返回输出路径）；须可按名称导入，以便在子进程中执行。
+        args: 绘图函数的位置参数（须可 pickle，如 `ColumnarSeries`）。
+    """
+
+    name: str
+    plot: Callable[..., str]
+    args: Tuple = ()
+
+
+def render_workers() -> int:
+    """批量渲染的默认进程数（环境变量 `CG_RENDER_JOBS`，缺省为 1 即串行）。"""
+
+    try:
+        return max(1, int(os.environ.get("CG_RENDER_JOBS", "1")))
+    except ValueError:
+        return 1
+
+
+def _render_staged(spec: FigureSpec) -> Tuple[str, List[StagedOutput], List[str]]:
+    """子进程：在暂存事务中渲染一张图，返回输出路径、暂存清单与状态信息。"""
+
+    txn = OutputTransaction()
+    with collect_messages() as messages, staging(txn):
+        path = spec.plot(*spec.args)
+    return path, txn.detach(), messages
+
+
+def render_figures(specs: Sequence[FigureSpec], workers: Optional[int] = None) -> List[str]:
+    """渲染一批示例图。
+
+    Args:
+        specs: 渲染任务。
+        workers: 进程数；缺省取 `render_workers()`。为 1 或只有一个任务时在当前进程中依次渲染。
+
+    Returns:
+        与 `specs` 顺序一致的输出路径。
+
+    Raises:
+        Exception: 任一任务失败时抛出其异常，全部子进程的暂存输出随之回滚。
+    """
+
+    workers = render_workers() if workers is None else max(1, workers)
+    if workers == 1 or len(specs) <= 1:
+        return [spec.plot(*spec.args) for spec in specs]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    resolve_cjk_font()  # 先在父进程解析，fork 出的子进程直接继承缓存
+    results: List[Tuple[str, List[StagedOutput], List[str]]] = []
+    error: Exception | None = None
+    with ProcessPoolExecutor(max_workers=min(workers, len(specs))) as pool:
+        futures = [pool.submit(_render_staged, spec) for spec in specs]
+        for f in futures:
+            try:
+                results.append(f.result())
+            except Exception as e:
+                error = error or e
+
+    txn = OutputTransaction()
+    for _, staged, messages in results:
+        for line in messages:
+            print(line)
+        txn.adopt(staged)
+    if error is not None:
+        txn.rollback()
+        raise error
+    outer = current_transaction()
+    if outer is not None:
+        outer.adopt(txn.detach())
+    else:
+        txn.commit()
+    return [path for path, _, _ in results]
+
+
+@cached_figure(version="2", dpi=FIGURE_DPI, style=configure_chinese_font)
+def plot_lesson15_temp_anomaly(temp_records: ColumnarSeries) -> str:
+    """生成第15课示例图：全球温度异常折线图。
+
+    Args:
+        temp_records: 年均温度异常序列（`AnnualTempRecord`）。
+
+    Returns:
+        输出图片路径。
+    """
+
+    years = temp_records.years
+    vals = temp_records.values
+
+    plt.figure(figsize=(10, 5), dpi=FIGURE_DPI)
+    plt.plot(years, vals, color="#d62728", linewidth=2, label="温度异常（°C）")
+    plt.title("全球温度异常（年均，GISTEMP）")
+    plt.xlabel("年份")
+    plt.ylabel("温度异常（°C）")
+    plt.grid(True, alpha=0.3)
+    plt.legend()
+    out_path = os.path.join(ASSETS_IMAGES_DIR, "lesson-15-evidence.png")
+    plt.tight_layout()
+    save_figure_png(out_path)
+    plt.close()
+    return out_path
+
+
+@cached_figure(version="2", dpi=FIGURE_DPI, style=configure_chinese_font)
+def plot_lesson21_co2_temp(temp_records: ColumnarSeries, co2_records: ColumnarSeries) -> str:
+    """生成第21课示例图：CO₂ 与温度异常双轴折线图。
+
+    此图通过双轴展示全球年均温度异常与年均 CO₂ 浓度的时间序列关系。
+    为避免部分中文字体缺少下标字符“₂”的显示问题，图中的
+    “CO₂”文本均使用 LaTeX 样式的 mathtext 语法渲染为 ``$\mathrm{CO_2}$``。
+    这不依赖外部 LaTeX 环境，直接使用 Matplotlib 内置的 mathtext 引擎。
+
+    Args:
+        temp_records: 年均温度异常序列（`AnnualTempRecord`）。
+        co2_records: 年均 CO₂ 浓度序列（`AnnualCO2Record`）。
+
+    Returns:
+        输出图片路径。
+    """
+
+    # 对齐年份范围
+    years, temp_vals, co2_vals = temp_records.align(co2_records)
+    if years.size == 0:
+        raise RuntimeError("CO₂ 与温度异常无交集年份，无法绘图")
+
+    plt.figure(figsize=(10, 5), dpi=FIGURE_DPI)
+    ax1 = plt.gca()
+    ax2 = ax1.twinx()
+
+    ax1.plot(years, temp_vals, color="#d62728", linewidth=2, label="温度异常（°C）")
+    ax2.plot(years, co2_vals, color="#1f77b4", linewidth=2, label=r"$\mathrm{CO_2}$（ppm）")
+
+    ax1.set_xlabel("年份")
+    ax1.set_ylabel("温度异常（°C）", color="#d62728")
+    ax2.set_ylabel(r"$\mathrm{CO_2}$（ppm）", color="#1f77b4")
+    plt.title(r"$\mathrm{CO_2}$ 与全球温度异常（年均）")
+    ax1.grid(True, alpha=0.3)
+
+    # 合并图例
+    lines1, labels1 = ax1.get_legend_handles_labels()
+    lines2, labels2 = ax2.get_legend_handles_labels()
+    plt.legend(lines1 + lines2, labels1 + labels2, loc="upper left")
+
+    out_path = os.path.join(ASSETS_IMAGES_DIR, "lesson-21-co2-temp.png")
+    plt.tight_layout()
+    save_figure_png(out_path)
+    plt.close()
+    return out_path
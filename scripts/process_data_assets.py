@@ -4,9 +4,28 @@
 功能概览：
 - 读取 NASA GISTEMP 全球温度异常（年均 J-D）
 - 读取 NOAA Mauna Loa 月均 CO₂ 并计算年均
-- 生成第12课（长期气温与滑动均值）教学用CSV
+- CO₂ 逐月值由 `monthly` 读入按月对齐的数组，年均由其向量化派生
+- 生成第12课（长期气温与滑动均值）教学用CSV，及 GISTEMP/NGRIP/ITRDB 的 5/11/31 年平滑对比
 - 生成第21课（CO₂ 与温度异常关系）教学用CSV
 - 生成示例图像：全球温度异常折线图、CO₂与温度双轴图
+- 增量构建模式（`--incremental`）：按原始数据内容指纹仅重建过期的派生资产
+- 并行模式（`--jobs N`）：互不依赖的课程分支在进程池中并发执行
+- 原始文本解析结果按文件内容缓存于 `.cache/parse-cache`（`--no-parse-cache` 关闭）
+- ITRDB / NGRIP / 石笋 / 湖泊粒度等 NOAA WDS-Paleo 模板文件经 `noaa_paleo` 按 `# Variables` 声明与表头按名取列
+- 整个 ITRDB 区域目录由 `itrdb_batch.py` 在进程池中批量导入，逐站点聚合年均值与样本深度，合并为站点×年份二进制矩阵供第2课出变体
+- 各年序列（GISTEMP、CO₂、GMSL、树轮、δ18O）按年份对齐写入 `.cache/annual-store` 内存映射存储，第15/21课按年切片连接，并行分支共享同一映射
+- GMSL 海平面文本由 `gmsl` 按文件头识别 PO.DAAC V5.x / GMSL_TPJAOS_5.2 / NASA 指标格式后整块解析
+- GMSL 与古气候模板文件可逐批读取（`iter_gmsl_batches` / `iter_paleo_batches`）；第3课经 `stages` 生成器流水线（解析 → 变换 → 外部归并排序 → 流式写出）生成，内存占用有界
+- 学校逐时观测按年月分区落盘于 `.cache/school-store`，每次只解码新增月份；第1/4/5/6课单遍融合导出，并附按日/月预聚合的小表
+- 稠密序列另出 LTTB / 最小最大包络降采样变体（`<文件名>-500.csv`、`-2000.csv`），供图表按视口选用
+- 示例图按 (输入哈希, 绘图版本, 样式, DPI) 缓存于 `.cache/figure-cache`，命中时直接写出 PNG（`--no-figure-cache` 关闭）
+- 示例图以 `FigureSpec` 批量渲染：中文字体每进程解析一次，PNG 去除元数据以保证逐字节可复现；`--render-jobs N` 在进程池中并行渲染，`--mpl-backend` 选择后端
+- 绘图拆入 `plotting`（显式选用无界面 Agg 后端）并于首次绘图时导入，numpy / xlrd 及各分支专用的兄弟模块（`gmsl`、`monthly`、`lesson_engine`、`school_export` 等）亦按需加载；只导入脚本或只刷新元数据的运行不触及它们（`bench_startup.py` 按预算校验）
+- 逐时学校序列另出图表二进制载荷（JSON 头 + 小端 int32 分钟数 / float32 数组块），前端免解析直接映射
+- 原始数据来源集中登记于 `RAW_SOURCES`，汇总元数据、旁注与各课元数据均由其一次派生
+- 各课教学 CSV 由 `lesson_specs()` 登记表声明（输入、连接/窗口/重采样等变换、列格式与输出），`lesson_engine` 统一执行，每个原始输入每次运行只加载一次
+- 覆盖写出前旧文件移入 `.cache/backups` 去重存储（内容未变化则跳过）；`gc` 子命令回收遗留 `.bak-*` 备份
+- 输出先写入同目录临时文件并批量 fsync，整次运行成功后统一原子替换，读者不会看到半成品
 
 注意：本脚本遵循 PEP 257 文档字符串规范；函数级注释完整。
 """
@@ -14,22 +33,43 @@
 from __future__ import annotations
 
 import csv
+import io
+import itertools
 import os
-from dataclasses import dataclass
-from typing import List, Dict, Tuple
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Callable, Iterator, List, Dict, Optional, Tuple
 import json
-import hashlib
 from datetime import datetime, timezone
 
-import matplotlib.pyplot as plt
-import re
-import xlrd
-
-# macOS 中文字体配置（遵循规范）：
-# 使用 Heiti TC 并处理负号显示问题，以避免中文标题/标签异常。
-plt.rcParams['font.family'] = 'Heiti TC'
-plt.rcParams['axes.unicode_minus'] = False
-
+from backups import DEFAULT_GC_ROOTS, DEFAULT_KEEP_LAST, DEFAULT_MAX_AGE_DAYS, BackupManager
+from build_graph import BuildTarget, run_build_graph
+from file_hashing import default_memo, memoized_sha256
+from lazy_imports import lazy_module
+from output_txn import OutputTransaction, StagedOutput, collect_messages, keep_created_at, staging, write_output_bytes
+from parse_cache import cached_parser
+from series import ColumnarSeries
+
+if TYPE_CHECKING:
+    from annual_store import AnnualColumn, AnnualSeriesStore
+    from lesson_engine import LessonEngine, LessonInput, LessonSpec
+    from noaa_paleo import PaleoTable
+    from school_store import SchoolStore
+    from school_xls import SchoolTable
+
+np = lazy_module("numpy")
+# 各分支专用的兄弟模块同样按需加载：只导入本脚本或只写元数据的运行不为其付出导入开销
+# （`annual_store` / `lesson_engine` / `school_store` 与同名的运行内缓存函数重名，在函数内导入）
+chart_payload = lazy_module("chart_payload")
+downsample = lazy_module("downsample")
+gmsl = lazy_module("gmsl")
+itrdb_batch = lazy_module("itrdb_batch")
+monthly = lazy_module("monthly")
+noaa_paleo = lazy_module("noaa_paleo")
+resample = lazy_module("resample")
+school_export = lazy_module("school_export")
+smoothing = lazy_module("smoothing")
+stages = lazy_module("stages")
 
 # 常量：路径定义
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -54,8 +94,162 @@ LESSON02_METADATA_JSON = os.path.join(ASSETS_DATA_DIR, "lesson-02-metadata.json"
 LESSON03_METADATA_JSON = os.path.join(ASSETS_DATA_DIR, "lesson-03-metadata.json")
 RAW_SOURCES_METADATA_JSON = os.path.join(ASSETS_DATA_DIR, "raw-data-metadata.json")
 
+# 第12课平滑对比的窗口长度（年）
+LESSON12_SMOOTHING_WINDOWS = (5, 11, 31)
+
+# 增量构建清单（记录输入指纹与输出状态，不随站点发布）
+BUILD_CACHE_DIR = os.path.join(BASE_DIR, ".cache")
+BUILD_MANIFEST_JSON = os.path.join(BUILD_CACHE_DIR, "build-manifest.json")
+
+# 年度序列共享存储（各年序列按年份对齐的内存映射列，见 `annual_store`）
+ANNUAL_STORE_PATH = os.path.join(BUILD_CACHE_DIR, "annual-store", "annual-series.cgas")
+
+# ===== 原始数据来源登记表 =====
+#
+# 每个原始数据文件在此登记一次；汇总元数据、逐文件旁注、各课元数据与增量构建输入
+# 均由此表派生。新增数据源时只需追加一项。
+
+NOAA_PALEO_CITATION_URL = "https://www.ncei.noaa.gov/access/paleo-search/citation"
+
+
+@dataclass(frozen=True)
+class RawSource:
+    """原始数据来源登记项。
+
+    Attributes:
+        short_name: 数据集短名（如 GISTEMP_v4）。
+        type: 数据类型与单位描述。
+        local_path: 本地原始文件路径。
+        source_url: 来源下载链接。
+        dataset_doi: 数据集 DOI（无则为 None）。
+        citation: 推荐引用文本模板，`{date}` 处填入访问日期。
+        citation_guidelines_url: 引用指南链接。
+        parser: 解析函数名。
+        lessons: 该来源供给的课号。
+        units: 数值单位（可选）。
+        publication_doi: 对应论文 DOI（可选）。
+    """
+
+    short_name: str
+    type: str
+    local_path: str
+    source_url: str | None
+    dataset_doi: str | None
+    citation: str
+    citation_guidelines_url: str | None
+    parser: str
+    lessons: Tuple[int, ...]
+    units: str | None = None
+    publication_doi: str | None = None
+
+
+RAW_SOURCES: List[RawSource] = [
+    RawSource(
+        short_name="GISTEMP_v4",
+        type="Temperature (Anomaly)",
+        local_path=GISTEMP_CSV,
+        source_url="https://data.giss.nasa.gov/gistemp/",
+        dataset_doi=None,
+        citation="GISTEMP Team: GISS Surface Temperature Analysis (GISTEMP v4), NASA GISS. Accessed {date}.",
+        citation_guidelines_url="https://data.giss.nasa.gov/gistemp/faq/",
+        parser="parse_gistemp_annual_jd",
+        lessons=(12, 15, 21),
+        units="°C anomaly",
+    ),
+    RawSource(
+        short_name="NOAA_MaunaLoa_CO2_monthly",
+        type="CO₂ (ppm, monthly)",
+        local_path=NOAA_CO2_MONTHLY_CSV,
+        source_url="https://gml.noaa.gov/ccgg/trends/",
+        dataset_doi=None,
+        citation="NOAA Global Monitoring Laboratory (GML): Mauna Loa CO₂ monthly average. Accessed {date}.",
+        citation_guidelines_url="https://gml.noaa.gov/ccgg/trends/",
+        parser="parse_noaa_co2_annual_mean",
+        lessons=(21,),
+        units="ppm",
+    ),
+    RawSource(
+        short_name="GMSL_ASCII_V52",
+        type="Sea Level (mm)",
+        local_path=SEA_LEVEL_ASCII,
+        source_url=(
+            "https://archive.podaac.earthdata.nasa.gov/podaac-ops-cumulus/Protected/"
+            "MERGED_TP_J1_OSTM_OST_GMSL_ASCII_V52/merged_global_sea_level_v5.2.txt"
+        ),
+        dataset_doi="10.5067/GMSLM-TJ152",
+        citation="NOAA/NASA PO.DAAC: Merged Global Mean Sea Level V5.2 (ASCII). DOI 10.5067/GMSLM-TJ152. Accessed {date}.",
+        citation_guidelines_url="https://podaac.jpl.nasa.gov/",
+        parser="parse_jpl_gmsl_ascii",
+        lessons=(15,),
+        units="mm",
+    ),
+    RawSource(
+        short_name="ITRDB_CANA426",
+        type="Tree Ring Width (mm)",
+        local_path=ITRDB_RWL_CANA426,
+        source_url="https://www.ncei.noaa.gov/pub/data/paleo/treering/measurements/northamerica/canada/cana426-rwl-noaa.txt",
+        dataset_doi=None,
+        citation="NOAA NCEI WDS Paleoclimatology: Tree Ring Measurements CANA426. Accessed {date}.",
+        citation_guidelines_url=NOAA_PALEO_CITATION_URL,
+        parser="parse_itrdb_rwl_template",
+        lessons=(2, 12),
+        units="ring width (mm)",
+    ),
+    RawSource(
+        short_name="NGRIP_Holocene_20yr",
+        type="Ice Core δ18O (‰)",
+        local_path=NGRIP_D18O_20YR,
+        source_url="https://www.ncei.noaa.gov/pub/data/paleo/icecore/greenland/summit/ngrip/vinther2006-gicc05-holocene-ngrip-20yr-noaa.txt",
+        dataset_doi="10.25921/pnba-f878",
+        citation="NOAA NCEI WDS Paleoclimatology: NGRIP Holocene δ18O (20 yr). DOI 10.25921/pnba-f878. Accessed {date}.",
+        citation_guidelines_url=NOAA_PALEO_CITATION_URL,
+        parser="parse_vinther_ngrip_20yr",
+        lessons=(2, 12),
+        units="δ18O (‰)",
+        publication_doi="10.1029/2005JD006921",
+    ),
+    RawSource(
+        short_name="Xianglong_XL16",
+        type="Speleothem Growth Rate (mm/yr)",
+        local_path=SPELEO_XL16,
+        source_url="https://www.ncei.noaa.gov/pub/data/paleo/speleothem/asia/china/xianglong2018-xl16-noaa.txt",
+        dataset_doi="10.25921/8d0j-jt40",
+        citation="NOAA NCEI WDS Paleoclimatology: Xianglong Cave XL-16 growth rate. DOI 10.25921/8d0j-jt40. Accessed {date}.",
+        citation_guidelines_url=NOAA_PALEO_CITATION_URL,
+        parser="parse_speleothem_xl16_growth",
+        lessons=(3,),
+        units="growth rate (mm/yr)",
+    ),
+    RawSource(
+        short_name="LakeWalker_D50",
+        type="Grain Size D50 (µm)",
+        local_path=WALKER_GS,
+        source_url="https://www.ncei.noaa.gov/pub/data/paleo/paleolimnology/northamerica/canada/pq/walker2021gs.txt",
+        dataset_doi="10.25921/9y0x-m754",
+        citation="NOAA NCEI WDS Paleoclimatology: Lake Walker grain size D50. DOI 10.25921/9y0x-m754. Accessed {date}.",
+        citation_guidelines_url=NOAA_PALEO_CITATION_URL,
+        parser="parse_walker_grainsize",
+        lessons=(3,),
+        units="D50 (µm)",
+    ),
+]
+
+
+def find_source(short_name: str) -> RawSource:
+    """按短名查找来源登记项。
+
+    Raises:
+        KeyError: 未登记的短名。
+    """
+
+    for src in RAW_SOURCES:
+        if src.short_name == short_name:
+            return src
+    raise KeyError(short_name)
+
+
 def write_csv_with_backup(out_path: str, header: List[str], rows: List[List[str]]) -> str:
-    """写入 CSV 文件；如目标存在则先备份后覆盖。
+    """写入 CSV 文件（原子替换）；内容未变化时跳过，否则先将旧文件备份入存储后覆盖。
 
     Args:
         out_path: 输出 CSV 路径。
@@ -67,21 +261,18 @@ def write_csv_with_backup(out_path: str, header: List[str], rows: List[List[str]
     """
 
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    if os.path.exists(out_path):
-        ts = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-        bak = f"{out_path}.bak-{ts}"
-        os.rename(out_path, bak)
-        print(f"已备份现有文件 -> {bak}")
-    with open(out_path, "w", encoding="utf-8", newline="") as f:
-        w = csv.writer(f)
-        w.writerow(header)
-        for r in rows:
-            w.writerow(r)
+    buf = io.StringIO(newline="")
+    w = csv.writer(buf)
+    w.writerow(header)
+    w.writerows(rows)
+    write_output_bytes(out_path, buf.getvalue().encode("utf-8"))
     return out_path
 
 
 def write_json_with_backup(out_path: str, obj: Dict) -> str:
-    """写 JSON 文件（如已存在则自动备份）。
+    """写 JSON 文件（原子替换；内容未变化时跳过，否则旧文件先备份入存储）。
+
+    除 `created_at` 外与现有文件内容相同时沿用其 `created_at`（见 `output_txn.keep_created_at`）。
 
     Args:
         out_path: 目标 JSON 路径。
@@ -92,15 +283,8 @@ def write_json_with_backup(out_path: str, obj: Dict) -> str:
     """
 
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    if os.path.exists(out_path):
-        backup_path = f"{out_path}.bak-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        try:
-            os.rename(out_path, backup_path)
-            print(f"已备份现有文件 -> {backup_path}")
-        except Exception as e:
-            print(f"警告：无法备份 {out_path} -> {e}")
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
+    obj = keep_created_at(out_path, obj)
+    write_output_bytes(out_path, json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8"))
     return out_path
 
 
@@ -162,159 +346,107 @@ class CoreGrainSizeRecord:
     d50_um: float
 
 
-def parse_itrdb_rwl_template(path: str) -> List[AnnualTreeRingRecord]:
+@cached_parser(AnnualTreeRingRecord, version="3")
+def parse_itrdb_rwl_template(path: str) -> ColumnarSeries:
     """解析 NOAA/NCEI ITRDB 模板格式的树轮原始测量（rwl-noaa.txt）。
 
-    解析策略：
-    - 跳过以 "#" 开头的元数据头部行。
-    - 数据段为制表符或空白分隔；首列为 `age_CE`（公元年份），其后为多条核心的年度宽度（单位 mm）。
-    - 对同一年份的所有数值取算术平均（过滤缺失，如 "NaN"、空字符串）。
+    经 `noaa_paleo.read_paleo_table` 按 `# Variables` 声明读取：`age_CE` 为公元年份，
+    其余数值变量为各树芯的年度宽度（mm，缺测 `NA`）。对同一年份的所有非缺测宽度取算术平均
+    （聚合见 `itrdb_batch.site_chronology`，批量导入整个 ITRDB 目录时复用同一实现）。
 
     Args:
         path: ITRDB 模板文本文件路径。
 
     Returns:
-        年度树轮宽度记录列表（mm）。
+        年度树轮宽度序列（`AnnualTreeRingRecord`，mm）。
     """
 
     if not os.path.exists(path):
         raise FileNotFoundError(f"未找到树轮数据文件: {path}")
 
-    yearly_values: Dict[int, List[float]] = {}
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            line = raw.strip()
-            if not line or line.startswith("#"):
-                continue
-            parts = [p for p in line.split("\t") if p != ""] if "\t" in line else [p for p in line.split() if p != ""]
-            if not parts:
-                continue
-            # 年份
-            try:
-                year = int(float(parts[0]))
-            except Exception:
-                continue
-            # 收集该年所有数值列
-            values: List[float] = []
-            for p in parts[1:]:
-                s = p.strip()
-                if not s or s.lower() in {"nan", "na"}:
-                    continue
-                try:
-                    values.append(float(s))
-                except ValueError:
-                    continue
-            if values:
-                yearly_values.setdefault(year, []).extend(values)
-
-    records: List[AnnualTreeRingRecord] = []
-    for y, vals in sorted(yearly_values.items()):
-        if not vals:
-            continue
-        avg = sum(vals) / len(vals)
-        records.append(AnnualTreeRingRecord(year=y, ring_width_mm=float(avg)))
-    return records
+    chron = itrdb_batch.site_chronology(path)
+    return ColumnarSeries(AnnualTreeRingRecord, chron.years, chron.mean)
 
 
-def parse_vinther_ngrip_20yr(path: str) -> List[IceCoreRecord]:
+@cached_parser(IceCoreRecord, version="3")
+def parse_vinther_ngrip_20yr(path: str) -> ColumnarSeries:
     """解析 Vinther et al. (2006) GICC05 Holocene 20年分辨率 δ18O 数据。
 
-    文件列通常为（按照 NOAA 模板表头）：
-    0: iceage_BP2k（b2k 年代）、1: iceage_BP1950、2: depth_ngrip1_m、3: d18O_ngrip1、
-    4: depth_ngrip2_m、5: d18O_ngrip2、6: iceage_err。
-    因此 δ18O 列为索引 3 或 5；优先使用 d18O_ngrip1（索引 3），若缺失再回退到索引 5。
-    年份转换遵循 b2k 约定：year_CE = 2000 - age_b2k。
+    按变量名取列：年代 `iceage_BP2k`（b2k），δ18O 优先 `d18O_ngrip1`，该行缺测时回退
+    `d18O_ngrip2`；两者均缺测的行跳过。年份转换遵循 b2k 约定：year_CE = 2000 - age_b2k。
 
     Args:
         path: NGRIP Holocene 20年分辨率文本路径。
 
     Returns:
-        冰芯 δ18O 年记录列表（CE、‰）。
+        冰芯 δ18O 序列（`IceCoreRecord`，CE、‰）。
     """
 
     if not os.path.exists(path):
         raise FileNotFoundError(f"未找到冰芯数据文件: {path}")
 
-    records: List[IceCoreRecord] = []
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            line = raw.strip()
-            if not line or line.startswith("#"):
-                continue
-            parts = [p for p in line.replace("\t", " ").split() if p]
-            if not parts:
-                continue
-            # 年代（b2k）
-            try:
-                age_b2k = float(parts[0])
-            except ValueError:
-                continue
-            # δ18O 列：优先 3 (d18O_ngrip1)，回退 5 (d18O_ngrip2)
-            d18o: float | None = None
-            for idx in (3, 5):
-                if idx < len(parts):
-                    try:
-                        val = float(parts[idx])
-                        if not (val != val):  # 不是 NaN
-                            d18o = val
-                            break
-                    except ValueError:
-                        pass
-            if d18o is None:
-                continue
-            year_ce = int(round(2000 - age_b2k))
-            records.append(IceCoreRecord(year=year_ce, d18o_permille=float(d18o)))
-    return records
+    table = noaa_paleo.read_paleo_table(path, columns=["iceage_BP2k", "d18O_ngrip1", "d18O_ngrip2"])
+    age_b2k = table.column("iceage_BP2k")
+    d18o = table.column("d18O_ngrip1")
+    d18o = np.where(np.isnan(d18o), table.column("d18O_ngrip2"), d18o)
+    keep = ~np.isnan(age_b2k) & ~np.isnan(d18o)
+    years = np.rint(2000 - age_b2k[keep]).astype(np.int64)
+    return ColumnarSeries(IceCoreRecord, years, d18o[keep])
 
 
-def parse_speleothem_xl16_growth(path: str, site_label: str = "Xianglong XL-16") -> List[SpeleothemGrowthRecord]:
+@cached_parser(SpeleothemGrowthRecord, version="3")
+def parse_speleothem_xl16_growth(path: str, site_label: str = "Xianglong XL-16") -> ColumnarSeries:
     """解析 Xianglong Cave XL-16 石笋生长速率（mm/yr）。
 
-    NOAA 模板文件包含变量 `Age`（calendar year before present）与 `GR`（growth rate, mm/yr）。
-    按常规 Paleoclimate 约定，将 BP 参考年视为 1950：year_CE = 1950 - age_BP。
+    按变量名取 `age`（calendar year before present）与 `GR`（growth rate, mm/yr）；首列为
+    `depth_mm`，不参与换算。按常规 Paleoclimate 约定，将 BP 参考年视为 1950：year_CE = 1950 - age_BP。
 
     Args:
         path: 石笋模板文本路径。
         site_label: 样点标签（默认 "Xianglong XL-16"）。
 
     Returns:
-        石笋生长速率记录列表（CE、mm/yr）。
+        石笋生长速率序列（`SpeleothemGrowthRecord`，CE、mm/yr；样点列为 `site_label`）。
     """
 
     if not os.path.exists(path):
         raise FileNotFoundError(f"未找到石笋数据文件: {path}")
 
-    records: List[SpeleothemGrowthRecord] = []
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            line = raw.strip()
-            if not line or line.startswith("#"):
-                continue
-            parts = [p for p in line.split("\t") if p != ""] if "\t" in line else [p for p in line.split() if p != ""]
-            if len(parts) < 3:
-                # 期望至少包含 Age 与 GR 两列
-                continue
-            # 尝试在行中查找 Age 与 GR（鲁棒：取前两个数值作为 Age 与 GR）
-            nums: List[float] = []
-            for p in parts:
-                try:
-                    nums.append(float(p))
-                except ValueError:
-                    continue
-            if len(nums) < 2:
-                continue
-            age_bp = nums[0]
-            gr = nums[1]
-            # 转换到 CE 年份
-            year_ce = int(round(1950 - age_bp))
-            records.append(SpeleothemGrowthRecord(site=site_label, year=year_ce, growth_mm_per_yr=float(gr)))
-    return records
+    years, rates = _xl16_growth_columns(noaa_paleo.read_paleo_table(path, columns=XL16_COLUMNS))
+    return ColumnarSeries.from_columns(SpeleothemGrowthRecord, years, rates, site=site_label)
+
+
+XL16_COLUMNS = ["age", "GR"]
+
+
+def _xl16_growth_columns(table: PaleoTable) -> Tuple[np.ndarray, np.ndarray]:
+    """XL-16 表 -> `(CE 年份, 生长速率)`，剔除缺测行。"""
+
+    age_bp = table.column("age")
+    gr = table.column("GR")
+    keep = ~np.isnan(age_bp) & ~np.isnan(gr)
+    return np.rint(1950 - age_bp[keep]).astype(np.int64), gr[keep]
+
 
+def iter_speleothem_xl16_growth(path: str, site_label: str = "Xianglong XL-16") -> Iterator[Tuple[str, int, float]]:
+    """流式读取 XL-16 生长速率（口径同 `parse_speleothem_xl16_growth`），逐条产出 `(样点, 年份, 速率)`。
 
-def parse_walker_grainsize(path: str, site_label: str = "Lake Walker") -> List[CoreGrainSizeRecord]:
+    Raises:
+        FileNotFoundError: 文件不存在。
+    """
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"未找到石笋数据文件: {path}")
+    for batch in noaa_paleo.iter_paleo_batches(path, columns=XL16_COLUMNS):
+        years, rates = _xl16_growth_columns(batch)
+        yield from zip(itertools.repeat(site_label), years.tolist(), rates.tolist())
+
+
+@cached_parser(CoreGrainSizeRecord, version="3")
+def parse_walker_grainsize(path: str, site_label: str = "Lake Walker") -> ColumnarSeries:
     """解析 Lake Walker 晚全新世纹泥沉积物粒度（D50, µm）。
 
-    文件包含 Varve 年龄上下界（`Varve_yearBP-`, `Varve_yearBP+`）与 D50（µm）。
+    按变量名取 Varve 年龄上下界（`Varve_yearBP-`, `Varve_yearBP+`）与 `D50`（µm）。
     以上下界中值作为年代（BP），再转换为 CE：year_CE = 1950 - ((BP_minus + BP_plus)/2)。
 
     Args:
@@ -322,571 +454,175 @@ def parse_walker_grainsize(path: str, site_label: str = "Lake Walker") -> List[C
         site_label: 样点标签（默认 "Lake Walker"）。
 
     Returns:
-        岩芯粒度记录列表（CE、µm）。
+        岩芯粒度序列（`CoreGrainSizeRecord`，CE、µm；样点列为 `site_label`）。
     """
 
     if not os.path.exists(path):
         raise FileNotFoundError(f"未找到岩芯粒度数据文件: {path}")
 
-    records: List[CoreGrainSizeRecord] = []
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            line = raw.strip()
-            if not line or line.startswith("#"):
-                continue
-            # Walker 文件为制表符或空白分隔，包含多粒度级别；首要提取 Varve 年龄与 D50
-            parts = [p for p in line.split("\t") if p != ""] if "\t" in line else [p for p in line.split() if p != ""]
-            # 搜集该行所有浮点数
-            nums: List[float] = []
-            for p in parts:
-                try:
-                    nums.append(float(p))
-                except ValueError:
-                    continue
-            # 期望顺序：depth(mm), Varve_yearBP-, Varve_yearBP+, Thickness(mm), D50(µm), ...
-            if len(nums) < 5:
-                continue
-            bp_minus = nums[1]
-            bp_plus = nums[2]
-            d50_um = nums[4]
-            bp_mid = (bp_minus + bp_plus) / 2.0
-            year_ce = int(round(1950 - bp_mid))
-            records.append(CoreGrainSizeRecord(site=site_label, year=year_ce, d50_um=float(d50_um)))
-    return records
+    years, d50_um = _walker_grainsize_columns(noaa_paleo.read_paleo_table(path, columns=WALKER_COLUMNS))
+    return ColumnarSeries.from_columns(CoreGrainSizeRecord, years, d50_um, site=site_label)
 
 
-def generate_lesson02_csv(tree_records: List[AnnualTreeRingRecord], ice_records: List[IceCoreRecord]) -> str:
-    """生成第2课教学用 CSV：年份、宽度/mm、δ18O/‰。
+WALKER_COLUMNS = ["Varve_yearBP-", "Varve_yearBP+", "D50"]
 
-    合并策略：
-    - 冰芯为 20 年分辨率（CE 年份）。为获得交集，将树轮按 ±10 年窗口求均值，与冰芯年份对齐。
-    - 过滤窗口内无树轮数据的年份。
 
-    Args:
-        tree_records: 树轮年序列（mm）。
-        ice_records: 冰芯 δ18O 年序列（‰）。
+def _walker_grainsize_columns(table: PaleoTable) -> Tuple[np.ndarray, np.ndarray]:
+    """Lake Walker 表 -> `(CE 年份, D50)`，剔除缺测行。"""
 
-    Returns:
-        输出 CSV 路径 `assets/data/lesson-02-sample.csv`。
-    """
+    bp_mid = (table.column("Varve_yearBP-") + table.column("Varve_yearBP+")) / 2.0
+    d50_um = table.column("D50")
+    keep = ~np.isnan(bp_mid) & ~np.isnan(d50_um)
+    return np.rint(1950 - bp_mid[keep]).astype(np.int64), d50_um[keep]
 
-    tree_map: Dict[int, float] = {r.year: r.ring_width_mm for r in tree_records}
-    rows: List[List[object]] = []
-    for ir in ice_records:
-        y = ir.year
-        window_vals: List[float] = []
-        for yy in range(y - 10, y + 11):
-            v = tree_map.get(yy)
-            if isinstance(v, (int, float)):
-                window_vals.append(float(v))
-        if not window_vals:
-            continue
-        ring_mean = sum(window_vals) / len(window_vals)
-        rows.append([y, round(ring_mean, 3), round(ir.d18o_permille, 3)])
 
-    out_path = os.path.join(ASSETS_DATA_DIR, "lesson-02-sample.csv")
-    write_csv_with_backup(out_path, ["年份", "宽度/mm", "δ18O/‰"], rows)
-    return out_path
+def iter_walker_grainsize(path: str, site_label: str = "Lake Walker") -> Iterator[Tuple[str, int, float]]:
+    """流式读取 Lake Walker 粒度（口径同 `parse_walker_grainsize`），逐条产出 `(样点, 年份, D50)`。
 
+    Raises:
+        FileNotFoundError: 文件不存在。
+    """
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"未找到岩芯粒度数据文件: {path}")
+    for batch in noaa_paleo.iter_paleo_batches(path, columns=WALKER_COLUMNS):
+        years, d50_um = _walker_grainsize_columns(batch)
+        yield from zip(itertools.repeat(site_label), years.tolist(), d50_um.tolist())
 
-def generate_lesson03_csv(speleo_records: List[SpeleothemGrowthRecord], core_records: List[CoreGrainSizeRecord]) -> str:
-    """生成第3课教学用 CSV：样点、年代、速率、粒度。
 
-    输出两类样点：
-    - 石笋：填写 `速率`（mm/yr），`粒度` 留空。
-    - 岩芯：填写 `粒度`（µm），`速率` 留空。
+def source_metadata_entry(src: RawSource, date: str) -> Dict[str, object]:
+    """由登记项构造单个来源的元数据条目（汇总元数据与旁注共用）。
 
     Args:
-        speleo_records: 石笋生长速率记录列表。
-        core_records: 岩芯粒度记录列表。
+        src: 来源登记项。
+        date: 访问日期（UTC，YYYY-MM-DD），填入推荐引用文本。
 
     Returns:
-        输出 CSV 路径 `assets/data/lesson-03-sample.csv`。
+        元数据字典；SHA256 经 `file_hashing` 记忆化，每个文件每次运行至多读取一次。
     """
 
-    rows: List[List[object]] = []
-    for r in speleo_records:
-        rows.append([r.site, r.year, round(r.growth_mm_per_yr, 3), ""])
-    for r in core_records:
-        rows.append([r.site, r.year, "", round(r.d50_um, 3)])
-    # 按样点与年代排序，便于教学演示
-    rows.sort(key=lambda x: (str(x[0]), int(x[1])))
-
-    out_path = os.path.join(ASSETS_DATA_DIR, "lesson-03-sample.csv")
-    write_csv_with_backup(out_path, ["样点", "年代", "速率", "粒度"], rows)
-    return out_path
-
-
-def write_lesson02_metadata(derived_csv: str) -> str:
-    """写出第2课元数据 JSON，记录来源与许可信息。
-
-    元数据包含：数据集短名/DOI/下载链接/本地路径/派生 CSV 等。
-    """
-
-    meta = {
-        "sources": [
-            {
-                "type": "Tree Ring (ITRDB)",
-                "dataset_short_name": "CANA426",
-                "dataset_doi": None,
-                "source_url": "https://www.ncei.noaa.gov/pub/data/paleo/treering/measurements/northamerica/canada/cana426-rwl-noaa.txt",
-                "local_path": ITRDB_RWL_CANA426,
-                "units": "ring width (mm)",
-                "citation_guidelines_url": "https://www.ncei.noaa.gov/access/paleo-search/citation",
-                "citation": f"NOAA NCEI, WDS Paleoclimatology: Tree Ring Measurements, site CANA426. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-            },
-            {
-                "type": "Ice Core (NGRIP)",
-                "dataset_short_name": "GICC05 Holocene 20yr",
-                "dataset_doi": "10.25921/pnba-f878",
-                "publication_doi": "10.1029/2005JD006921",
-                "source_url": "https://www.ncei.noaa.gov/pub/data/paleo/icecore/greenland/summit/ngrip/vinther2006-gicc05-holocene-ngrip-20yr-noaa.txt",
-                "local_path": NGRIP_D18O_20YR,
-                "units": "δ18O (‰)",
-                "citation_guidelines_url": "https://www.ncei.noaa.gov/access/paleo-search/citation",
-                "citation": f"NOAA NCEI, WDS Paleoclimatology: NGRIP Holocene δ18O (20-yr). Dataset DOI 10.25921/pnba-f878. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-            },
-        ],
-        "derived_csv": derived_csv,
-        "download_date": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
-        "license_note": "NOAA/WDS Paleoclimatology data; follow NOAA citation guidelines.",
+    entry: Dict[str, object] = {
+        "dataset_short_name": src.short_name,
+        "type": src.type,
+        "local_path": src.local_path,
+        "source_url": src.source_url,
+        "dataset_doi": src.dataset_doi,
+        "sha256": memoized_sha256(src.local_path) if os.path.isfile(src.local_path) else None,
+        "citation": src.citation.format(date=date),
+        "parser": src.parser,
+        "lessons": list(src.lessons),
     }
-    return write_json_with_backup(LESSON02_METADATA_JSON, meta)
+    if src.publication_doi:
+        entry["publication_doi"] = src.publication_doi
+    if src.units:
+        entry["units"] = src.units
+    if src.citation_guidelines_url:
+        entry["citation_guidelines_url"] = src.citation_guidelines_url
+    return entry
 
 
-def write_lesson03_metadata(derived_csv: str) -> str:
-    """写出第3课元数据 JSON，记录来源与许可信息。"""
+def write_source_metadata() -> Tuple[str, List[str]]:
+    """一次遍历来源登记表，写出汇总元数据与逐文件旁注元数据。
 
-    meta = {
-        "sources": [
-            {
-                "type": "Speleothem",
-                "dataset_short_name": "Xianglong XL-16",
-                "dataset_doi": "10.25921/8d0j-jt40",
-                "source_url": "https://www.ncei.noaa.gov/pub/data/paleo/speleothem/asia/china/xianglong2018-xl16-noaa.txt",
-                "local_path": SPELEO_XL16,
-                "units": "growth rate (mm/yr)",
-                "citation_guidelines_url": "https://www.ncei.noaa.gov/access/paleo-search/citation",
-                "citation": f"NOAA NCEI, WDS Paleoclimatology: Xianglong Cave XL-16 Speleothem Growth Rate. Dataset DOI 10.25921/8d0j-jt40. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-            },
-            {
-                "type": "Paleolimnology",
-                "dataset_short_name": "Lake Walker Grain Size",
-                "dataset_doi": "10.25921/9y0x-m754",
-                "source_url": "https://www.ncei.noaa.gov/pub/data/paleo/paleolimnology/northamerica/canada/pq/walker2021gs.txt",
-                "local_path": WALKER_GS,
-                "units": "D50 (µm)",
-                "citation_guidelines_url": "https://www.ncei.noaa.gov/access/paleo-search/citation",
-                "citation": f"NOAA NCEI, WDS Paleoclimatology: Lake Walker Grain Size (D50). Dataset DOI 10.25921/9y0x-m754. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-            },
-        ],
-        "derived_csv": derived_csv,
-        "download_date": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
-        "license_note": "NOAA/WDS Paleoclimatology data; follow NOAA citation guidelines.",
-    }
-    return write_json_with_backup(LESSON03_METADATA_JSON, meta)
-
-
-def write_raw_sources_metadata() -> str:
-    """写出统一的原始数据元数据 JSON（包含来源与引用方式）。
-
-    此元数据汇总 `data/data/` 下已存在的关键原始数据文件（GISTEMP、NOAA CO₂、海平面、树轮、冰芯、石笋、岩芯），
-    提供：短名、类型、本地路径、来源URL、DOI、SHA256校验、推荐引用文本与引用指南链接。
+    汇总文件为 `assets/data/raw-data-metadata.json`；旁注文件位于原始数据旁，命名形如
+    `<原始文件名>.metadata.json`，内容与汇总条目相同并附 `created_at` 时间戳。
+    仅覆盖本地已存在的原始文件。
 
     Returns:
-        `assets/data/raw-data-metadata.json` 路径。
+        `(汇总元数据路径, 旁注元数据路径列表)`。
     """
 
-    sources: List[Dict[str, str]] = []
-
-    def add_source_if_exists(short: str, typ: str, local: str, url: str | None, dataset_doi: str | None, citation: str, citation_url: str | None = None):
-        if not os.path.exists(local):
-            return
-        entry = {
-            "dataset_short_name": short,
-            "type": typ,
-            "local_path": local,
-            "source_url": url,
-            "dataset_doi": dataset_doi,
-            "sha256": compute_sha256(local) if os.path.isfile(local) else None,
-            "citation": citation,
-        }
-        if citation_url:
-            entry["citation_guidelines_url"] = citation_url
+    date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    # 先在线程池中并发计算全部未记忆的校验值，随后逐项构造条目时均命中记忆
+    _, report = default_memo().sha256_many(src.local_path for src in RAW_SOURCES if os.path.isfile(src.local_path))
+    if report.digests:
+        print(f"原始数据 SHA256：{report.describe()}")
+    sources: List[Dict[str, object]] = []
+    sidecar_paths: List[str] = []
+    for src in RAW_SOURCES:
+        if not os.path.exists(src.local_path):
+            continue
+        entry = source_metadata_entry(src, date)
         sources.append(entry)
+        sidecar = dict(entry, created_at=datetime.now(timezone.utc).isoformat())
+        sidecar_paths.append(write_json_with_backup(f"{src.local_path}.metadata.json", sidecar))
+    meta = {"download_date": date, "sources": sources}
+    return write_json_with_backup(RAW_SOURCES_METADATA_JSON, meta), sidecar_paths
 
-    # NASA GISTEMP（参考页面与推荐引用）
-    add_source_if_exists(
-        short="GISTEMP_v4",
-        typ="Temperature (Anomaly)",
-        local=GISTEMP_CSV,
-        url="https://data.giss.nasa.gov/gistemp/",
-        dataset_doi=None,
-        citation=f"GISTEMP Team: GISS Surface Temperature Analysis (GISTEMP v4), NASA GISS. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://data.giss.nasa.gov/gistemp/faq/",
-    )
-
-    # NOAA Mauna Loa CO₂（参考页面）
-    add_source_if_exists(
-        short="NOAA_MaunaLoa_CO2_monthly",
-        typ="CO₂ (ppm, monthly)",
-        local=NOAA_CO2_MONTHLY_CSV,
-        url="https://gml.noaa.gov/ccgg/trends/",
-        dataset_doi=None,
-        citation=f"NOAA Global Monitoring Laboratory (GML): Mauna Loa CO₂ monthly average. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://gml.noaa.gov/ccgg/trends/",
-    )
-
-    # NASA/NOAA 海平面（PO.DAAC 数据集）
-    add_source_if_exists(
-        short="GMSL_ASCII_V52",
-        typ="Sea Level (mm)",
-        local=SEA_LEVEL_ASCII,
-        url=(
-            "https://archive.podaac.earthdata.nasa.gov/podaac-ops-cumulus/Protected/"
-            "MERGED_TP_J1_OSTM_OST_GMSL_ASCII_V52/merged_global_sea_level_v5.2.txt"
-        ),
-        dataset_doi="10.5067/GMSLM-TJ152",
-        citation=f"NOAA/NASA PO.DAAC: Merged Global Mean Sea Level V5.2 (ASCII). DOI 10.5067/GMSLM-TJ152. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://podaac.jpl.nasa.gov/",
-    )
 
-    # ITRDB 树轮
-    add_source_if_exists(
-        short="ITRDB_CANA426",
-        typ="Tree Ring Width (mm)",
-        local=ITRDB_RWL_CANA426,
-        url="https://www.ncei.noaa.gov/pub/data/paleo/treering/measurements/northamerica/canada/cana426-rwl-noaa.txt",
-        dataset_doi=None,
-        citation=f"NOAA NCEI WDS Paleoclimatology: Tree Ring Measurements CANA426. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://www.ncei.noaa.gov/access/paleo-search/citation",
-    )
+def write_lesson_sources_metadata(lesson: int, out_path: str, derived_csv: str) -> str:
+    """写出某一课的元数据 JSON：登记表中供给该课的来源条目 + 派生 CSV。
 
-    # NGRIP δ18O（20年分辨率）
-    add_source_if_exists(
-        short="NGRIP_Holocene_20yr",
-        typ="Ice Core δ18O (‰)",
-        local=NGRIP_D18O_20YR,
-        url="https://www.ncei.noaa.gov/pub/data/paleo/icecore/greenland/summit/ngrip/vinther2006-gicc05-holocene-ngrip-20yr-noaa.txt",
-        dataset_doi="10.25921/pnba-f878",
-        citation=f"NOAA NCEI WDS Paleoclimatology: NGRIP Holocene δ18O (20 yr). DOI 10.25921/pnba-f878. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://www.ncei.noaa.gov/access/paleo-search/citation",
-    )
-
-    # 石笋 XL-16
-    add_source_if_exists(
-        short="Xianglong_XL16",
-        typ="Speleothem Growth Rate (mm/yr)",
-        local=SPELEO_XL16,
-        url="https://www.ncei.noaa.gov/pub/data/paleo/speleothem/asia/china/xianglong2018-xl16-noaa.txt",
-        dataset_doi="10.25921/8d0j-jt40",
-        citation=f"NOAA NCEI WDS Paleoclimatology: Xianglong Cave XL-16 growth rate. DOI 10.25921/8d0j-jt40. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://www.ncei.noaa.gov/access/paleo-search/citation",
-    )
-
-    # Lake Walker 粒度
-    add_source_if_exists(
-        short="LakeWalker_D50",
-        typ="Grain Size D50 (µm)",
-        local=WALKER_GS,
-        url="https://www.ncei.noaa.gov/pub/data/paleo/paleolimnology/northamerica/canada/pq/walker2021gs.txt",
-        dataset_doi="10.25921/9y0x-m754",
-        citation=f"NOAA NCEI WDS Paleoclimatology: Lake Walker grain size D50. DOI 10.25921/9y0x-m754. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://www.ncei.noaa.gov/access/paleo-search/citation",
-    )
-
-    meta = {
-        "download_date": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
-        "sources": sources,
-    }
-    return write_json_with_backup(RAW_SOURCES_METADATA_JSON, meta)
-
-
-def write_raw_sidecar_metadata() -> List[str]:
-    """为每个原始数据文件写旁注元数据到 `data/data` 目录。
-
-    旁注文件命名形如：`<原始文件名>.metadata.json`，内容包含：短名、类型、本地路径、来源URL、DOI、
-    SHA256、推荐引用与引用指南链接，以及 `created_at` 时间戳。
+    Args:
+        lesson: 课号（如 2、3）。
+        out_path: 元数据 JSON 输出路径。
+        derived_csv: 该课派生 CSV 路径。
 
     Returns:
-        已写入的旁注元数据文件路径列表。
+        写出的元数据 JSON 路径。
     """
 
-    written_paths: List[str] = []
-
-    def add_source_if_exists(short: str, typ: str, local: str, url: str | None, dataset_doi: str | None, citation: str, citation_url: str | None = None):
-        if not os.path.exists(local):
-            return
-        sidecar_path = f"{local}.metadata.json"
-        obj = {
-            "dataset_short_name": short,
-            "type": typ,
-            "local_path": local,
-            "source_url": url,
-            "dataset_doi": dataset_doi,
-            "sha256": compute_sha256(local) if os.path.isfile(local) else None,
-            "citation": citation,
-            "created_at": datetime.now(timezone.utc).isoformat(),
-        }
-        if citation_url:
-            obj["citation_guidelines_url"] = citation_url
-        write_json_with_backup(sidecar_path, obj)
-        written_paths.append(sidecar_path)
-
-    # NASA GISTEMP
-    add_source_if_exists(
-        short="GISTEMP_v4",
-        typ="Temperature (Anomaly)",
-        local=GISTEMP_CSV,
-        url="https://data.giss.nasa.gov/gistemp/",
-        dataset_doi=None,
-        citation=f"GISTEMP Team: GISS Surface Temperature Analysis (GISTEMP v4), NASA GISS. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://data.giss.nasa.gov/gistemp/faq/",
-    )
-
-    # NOAA Mauna Loa CO₂
-    add_source_if_exists(
-        short="NOAA_MaunaLoa_CO2_monthly",
-        typ="CO₂ (ppm, monthly)",
-        local=NOAA_CO2_MONTHLY_CSV,
-        url="https://gml.noaa.gov/ccgg/trends/",
-        dataset_doi=None,
-        citation=f"NOAA Global Monitoring Laboratory (GML): Mauna Loa CO₂ monthly average. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://gml.noaa.gov/ccgg/trends/",
-    )
+    date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    meta = {
+        "sources": [source_metadata_entry(src, date) for src in RAW_SOURCES if lesson in src.lessons],
+        "derived_csv": derived_csv,
+        "download_date": date,
+        "license_note": "NOAA/WDS Paleoclimatology data; follow NOAA citation guidelines.",
+    }
+    return write_json_with_backup(out_path, meta)
 
-    # 海平面（PO.DAAC）
-    add_source_if_exists(
-        short="GMSL_ASCII_V52",
-        typ="Sea Level (mm)",
-        local=SEA_LEVEL_ASCII,
-        url=(
-            "https://archive.podaac.earthdata.nasa.gov/podaac-ops-cumulus/Protected/"
-            "MERGED_TP_J1_OSTM_OST_GMSL_ASCII_V52/merged_global_sea_level_v5.2.txt"
-        ),
-        dataset_doi="10.5067/GMSLM-TJ152",
-        citation=f"NOAA/NASA PO.DAAC: Merged Global Mean Sea Level V5.2 (ASCII). DOI 10.5067/GMSLM-TJ152. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://podaac.jpl.nasa.gov/",
-    )
 
-    # 树轮
-    add_source_if_exists(
-        short="ITRDB_CANA426",
-        typ="Tree Ring Width (mm)",
-        local=ITRDB_RWL_CANA426,
-        url="https://www.ncei.noaa.gov/pub/data/paleo/treering/measurements/northamerica/canada/cana426-rwl-noaa.txt",
-        dataset_doi=None,
-        citation=f"NOAA NCEI WDS Paleoclimatology: Tree Ring Measurements CANA426. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://www.ncei.noaa.gov/access/paleo-search/citation",
-    )
+def write_lesson02_metadata(derived_csv: str) -> str:
+    """写出第2课元数据 JSON（树轮 + 冰芯来源与许可信息）。"""
 
-    # NGRIP δ18O
-    add_source_if_exists(
-        short="NGRIP_Holocene_20yr",
-        typ="Ice Core δ18O (‰)",
-        local=NGRIP_D18O_20YR,
-        url="https://www.ncei.noaa.gov/pub/data/paleo/icecore/greenland/summit/ngrip/vinther2006-gicc05-holocene-ngrip-20yr-noaa.txt",
-        dataset_doi="10.25921/pnba-f878",
-        citation=f"NOAA NCEI WDS Paleoclimatology: NGRIP Holocene δ18O (20 yr). DOI 10.25921/pnba-f878. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://www.ncei.noaa.gov/access/paleo-search/citation",
-    )
+    return write_lesson_sources_metadata(2, LESSON02_METADATA_JSON, derived_csv)
 
-    # 石笋 XL-16
-    add_source_if_exists(
-        short="Xianglong_XL16",
-        typ="Speleothem Growth Rate (mm/yr)",
-        local=SPELEO_XL16,
-        url="https://www.ncei.noaa.gov/pub/data/paleo/speleothem/asia/china/xianglong2018-xl16-noaa.txt",
-        dataset_doi="10.25921/8d0j-jt40",
-        citation=f"NOAA NCEI WDS Paleoclimatology: Xianglong Cave XL-16 growth rate. DOI 10.25921/8d0j-jt40. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://www.ncei.noaa.gov/access/paleo-search/citation",
-    )
 
-    # Lake Walker 粒度
-    add_source_if_exists(
-        short="LakeWalker_D50",
-        typ="Grain Size D50 (µm)",
-        local=WALKER_GS,
-        url="https://www.ncei.noaa.gov/pub/data/paleo/paleolimnology/northamerica/canada/pq/walker2021gs.txt",
-        dataset_doi="10.25921/9y0x-m754",
-        citation=f"NOAA NCEI WDS Paleoclimatology: Lake Walker grain size D50. DOI 10.25921/9y0x-m754. Accessed {datetime.now(timezone.utc).strftime('%Y-%m-%d')}.",
-        citation_url="https://www.ncei.noaa.gov/access/paleo-search/citation",
-    )
+def write_lesson03_metadata(derived_csv: str) -> str:
+    """写出第3课元数据 JSON（石笋 + 湖泊岩芯来源与许可信息）。"""
 
-    return written_paths
+    return write_lesson_sources_metadata(3, LESSON03_METADATA_JSON, derived_csv)
 
-def _extract_degree(text: str | float | int) -> float | None:
-    """从类似 'ESE (123)' 文本中提取角度数值。
+def _write_school_lesson(lesson: str, table: SchoolTable, env_label: Optional[str] = None) -> str:
+    """渲染并写出单课学校观测 CSV（多课同时导出请用 `generate_school_lessons`）。
 
-    支持直接数值或包含括号的方位文本；失败返回 None。
+    `env_label` 缺省为 `school_export.DEFAULT_ENV_LABEL`。
     """
-    if text is None:
-        return None
-    if isinstance(text, (int, float)):
-        return float(text)
-    s = str(text)
-    m = re.search(r"(\d+(?:\.\d+)?)", s)
-    return float(m.group(1)) if m else None
-
-def _to_float(val: str | float | int) -> float | None:
-    """尽可能将值转换为浮点数；失败返回 None。"""
-    if isinstance(val, (int, float)):
-        return float(val)
-    if val is None:
-        return None
-    s = str(val).strip()
-    if s in ("", "-", "NaN"):
-        return None
-    try:
-        return float(s)
-    except Exception:
-        m = re.search(r"(\d+(?:\.\d+)?)", s)
-        return float(m.group(1)) if m else None
 
-def read_school_xls_rows(dir_path: str) -> List[Dict[str, str | float]]:
-    """读取“曹杨中学”目录下所有 .xls，提取核心字段。
+    if env_label is None:
+        env_label = school_export.DEFAULT_ENV_LABEL
+    out = os.path.join(ASSETS_DATA_DIR, school_export.SCHOOL_LESSONS[lesson][0])
+    write_output_bytes(out, school_export.render_school_lessons(table, [lesson], env_label)[lesson])
+    return out
 
-    提取字段：观测时间、气温(℃)、瞬时风向(°)、瞬时风速(m/s)、小时雨量(mm)。
-
-    Args:
-        dir_path: 学校数据目录路径。
-
-    Returns:
-        记录列表，每条记录包含：
-        - time: 字符串时间（YYYY-MM-DD HH:MM）
-        - temp_c: 浮点数气温（℃）
-        - wind_dir_deg: 浮点数风向（度）
-        - wind_speed_ms: 浮点数风速（m/s）
-        - rain_hour_mm: 浮点数小时雨量（mm）
-    """
 
-    records: List[Dict[str, str | float]] = []
-    if not os.path.isdir(dir_path):
-        return records
-    for name in sorted(os.listdir(dir_path)):
-        if not name.lower().endswith(".xls"):
-            continue
-        path = os.path.join(dir_path, name)
-        try:
-            book = xlrd.open_workbook(path)
-            sheet = book.sheet_by_index(0)
-        except Exception as e:
-            print(f"警告：无法打开 {path} -> {e}")
-            continue
-
-        header = sheet.row_values(0)
-        # 映射列索引
-        def idx(label: str) -> int | None:
-            for i, h in enumerate(header):
-                if str(h).strip().startswith(label):
-                    return i
-            return None
-
-        i_time = idx("观测时间")
-        i_temp = idx("气温(℃)")
-        i_wdir = idx("瞬时风向(°)")
-        i_wspd = idx("瞬时风速(m/s)")
-        i_rain = idx("小时雨量(mm)")
-
-        for r in range(1, sheet.nrows):
-            row = sheet.row_values(r)
-            time = row[i_time] if i_time is not None else None
-            temp = _to_float(row[i_temp]) if i_temp is not None else None
-            wdir = _extract_degree(row[i_wdir]) if i_wdir is not None else None
-            wspd = _to_float(row[i_wspd]) if i_wspd is not None else None
-            rain = _to_float(row[i_rain]) if i_rain is not None else None
-
-            # 过滤缺失或异常值
-            if isinstance(time, str) and time.strip():
-                rec: Dict[str, str | float] = {
-                    "time": time.strip(),
-                }
-                if isinstance(temp, (int, float)):
-                    rec["temp_c"] = float(temp)
-                if isinstance(wdir, (int, float)):
-                    rec["wind_dir_deg"] = float(wdir)
-                if isinstance(wspd, (int, float)):
-                    rec["wind_speed_ms"] = float(wspd)
-                if isinstance(rain, (int, float)):
-                    rec["rain_hour_mm"] = float(rain)
-                records.append(rec)
-    return records
-
-def generate_school_lesson01(records: List[Dict[str, str | float]]) -> str:
+def generate_school_lesson01(table: SchoolTable) -> str:
     """基于学校数据生成第1课 CSV（时间、气温/°C）。
 
     输出列：`time,temp_c`。
     """
-    rows: List[List[str]] = []
-    for rec in records:
-        t = rec.get("time")
-        temp = rec.get("temp_c")
-        if t and isinstance(temp, (int, float)):
-            rows.append([str(t), f"{float(temp):.1f}"])
-    out = os.path.join(ASSETS_DATA_DIR, "lesson-01-sample.csv")
-    return write_csv_with_backup(out, ["time", "temp_c"], rows)
-
-def generate_school_lesson04(records: List[Dict[str, str | float]], env_label: str = "校园室外") -> str:
+    return _write_school_lesson("01", table)
+
+def generate_school_lesson04(table: SchoolTable, env_label: Optional[str] = None) -> str:
     """基于学校数据生成第4课 CSV（时间、环境类型、气温/°C）。
 
     输出列：`time,env,temp_c`。环境类型统一标注为 `校园室外`。
     """
-    rows: List[List[str]] = []
-    for rec in records:
-        t = rec.get("time")
-        temp = rec.get("temp_c")
-        if t and isinstance(temp, (int, float)):
-            rows.append([str(t), env_label, f"{float(temp):.1f}"])
-    out = os.path.join(ASSETS_DATA_DIR, "lesson-04-sample.csv")
-    return write_csv_with_backup(out, ["time", "env", "temp_c"], rows)
-
-def generate_school_lesson05(records: List[Dict[str, str | float]]) -> str:
+    return _write_school_lesson("04", table, env_label)
+
+def generate_school_lesson05(table: SchoolTable) -> str:
     """基于学校数据生成第5课 CSV（时间、风向/度、风速/m·s⁻¹）。
 
     输出列：`time,wind_dir_deg,wind_speed_ms`。
     """
-    rows: List[List[str]] = []
-    for rec in records:
-        t = rec.get("time")
-        d = rec.get("wind_dir_deg")
-        s = rec.get("wind_speed_ms")
-        if t and isinstance(d, (int, float)) and isinstance(s, (int, float)):
-            rows.append([str(t), f"{float(d):.1f}", f"{float(s):.2f}"])
-    out = os.path.join(ASSETS_DATA_DIR, "lesson-05-sample.csv")
-    return write_csv_with_backup(out, ["time", "wind_dir_deg", "wind_speed_ms"], rows)
-
-def generate_school_lesson06(records: List[Dict[str, str | float]]) -> str:
-    """基于学校数据生成第6课 CSV（时间、降雨强度/mm·h⁻¹、累计/mm）。
+    return _write_school_lesson("05", table)
 
-    输出列：`time,rain_mm_per_h,cum_mm`；累计为顺序累加小时雨量。
-    """
-    rows: List[List[str]] = []
-    cum = 0.0
-    for rec in records:
-        t = rec.get("time")
-        r = rec.get("rain_hour_mm")
-        if t and isinstance(r, (int, float)):
-            val = float(r)
-            cum += max(val, 0.0)
-            rows.append([str(t), f"{val:.2f}", f"{cum:.2f}"])
-    out = os.path.join(ASSETS_DATA_DIR, "lesson-06-sample.csv")
-    return write_csv_with_backup(out, ["time", "rain_mm_per_h", "cum_mm"], rows)
-
-def compute_sha256(path: str) -> str:
-    """计算指定文件的 SHA256 校验值。
-
-    Args:
-        path: 文件路径。
+def generate_school_lesson06(table: SchoolTable) -> str:
+    """基于学校数据生成第6课 CSV（时间、降雨强度/mm·h⁻¹、累计/mm）。
 
-    Returns:
-        十六进制字符串形式的 SHA256 值。
+    输出列：`time,rain_mm_per_h,cum_mm`；累计为顺序累加小时雨量（负值按 0 计）。
     """
-
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            h.update(chunk)
-    return h.hexdigest()
+    return _write_school_lesson("06", table)
 
 def write_lesson15_metadata(
     dataset_short_name: str,
@@ -933,9 +669,7 @@ def write_lesson15_metadata(
         "derived_image": derived_image,
     }
 
-    os.makedirs(os.path.dirname(LESSON15_METADATA_JSON), exist_ok=True)
-    with open(LESSON15_METADATA_JSON, "w", encoding="utf-8") as f:
-        json.dump(meta, f, ensure_ascii=False, indent=2)
+    write_output_bytes(LESSON15_METADATA_JSON, json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"), backup=False)
     return LESSON15_METADATA_JSON
 
 
@@ -993,7 +727,8 @@ def ensure_dirs() -> None:
     os.makedirs(ASSETS_IMAGES_DIR, exist_ok=True)
 
 
-def parse_gistemp_annual_jd(path: str) -> List[AnnualTempRecord]:
+@cached_parser(AnnualTempRecord, version="2")
+def parse_gistemp_annual_jd(path: str) -> ColumnarSeries:
     """解析 NASA GISTEMP 年均（J-D）温度异常。
 
     该文件的表头为：Year, Jan...Dec, J-D, D-N, DJF, MAM, JJA, SON。
@@ -1003,10 +738,11 @@ def parse_gistemp_annual_jd(path: str) -> List[AnnualTempRecord]:
         path: GISTEMP CSV 文件路径。
 
     Returns:
-        年均温度异常记录列表。
+        年均温度异常序列（`AnnualTempRecord`）。
     """
 
-    records: List[AnnualTempRecord] = []
+    years: List[int] = []
+    values: List[float] = []
     with open(path, "r", encoding="utf-8") as f:
         reader = csv.reader(f)
         header = None
@@ -1039,74 +775,59 @@ def parse_gistemp_annual_jd(path: str) -> List[AnnualTempRecord]:
             except ValueError:
                 # 例如 '.91' 前有符号，仍尝试转换
                 temp_anomaly = float(jd_val.replace(" ", ""))
-            records.append(AnnualTempRecord(year=year, temp_anomaly_c=temp_anomaly))
-    return records
+            years.append(year)
+            values.append(temp_anomaly)
+    return ColumnarSeries(AnnualTempRecord, years, values)
 
 
-def parse_noaa_co2_annual_mean(path: str) -> List[AnnualCO2Record]:
+@cached_parser(AnnualCO2Record, version="3")
+def parse_noaa_co2_annual_mean(path: str) -> ColumnarSeries:
     """解析 NOAA Mauna Loa 月均 CO₂ 并计算年均。
 
     输入为 NOAA GML 提供的月度 CSV。文件包含以 `#` 开头的注释行。
     有效字段表头：`year,month,decimal date,average,deseasonalized,ndays,sdev,unc`。
 
-    年均计算方法：对同一年份的 `average` 取算术平均；若某月缺失（负或缺失），按 NOAA 已处理值参与平均。
+    逐月数据经 `monthly.read_co2_monthly` 读入月度序列，年均为同一年份所有有效 `average` 月值的
+    算术平均（首尾不完整年份按已有月份平均；负值缺测标记不参与）。
 
     Args:
         path: NOAA 月度 CSV 文件路径。
 
     Returns:
-        年均 CO₂ 浓度记录列表。
+        年均 CO₂ 浓度序列（`AnnualCO2Record`）。
     """
 
-    # 跳过注释行，逐行解析
-    yearly: Dict[int, List[float]] = {}
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip() or line.startswith("#"):
-                continue
-            parts = [p.strip() for p in line.split(",")]
-            if len(parts) < 5 or not parts[0].isdigit():
-                continue
-            year = int(parts[0])
-            try:
-                avg = float(parts[3])
-            except ValueError:
-                # 遇到非数值，跳过该月
-                continue
-            yearly.setdefault(year, []).append(avg)
-
-    records: List[AnnualCO2Record] = []
-    for year, values in sorted(yearly.items()):
-        if not values:
-            continue
-        co2_mean = sum(values) / len(values)
-        records.append(AnnualCO2Record(year=year, co2_ppm=co2_mean))
-    return records
+    years, means = monthly.read_co2_monthly(path).annual("co2_average", min_months=1)
+    return ColumnarSeries(AnnualCO2Record, years, means)
 
 
-def moving_average(series: List[Tuple[int, float]], window: int = 5) -> List[Tuple[int, float]]:
-    """计算简单滑动均值。
+def moving_average(
+    series: List[Tuple[int, float]],
+    window: int = 5,
+    kernel: str = "trailing",
+    min_periods: int = 1,
+) -> List[Tuple[int, float]]:
+    """计算滑动均值（向量化，见 `smoothing.rolling_mean`）。
 
     Args:
         series: 序列 `(year, value)` 列表。
         window: 窗口大小，默认 5。
+        kernel: 窗口核（trailing / centered / gaussian / triangular），默认尾随均匀窗口。
+        min_periods: 窗口内最少有效项数，不足时为 NaN；默认 1，即前 `window-1` 项按已有前缀平均。
 
     Returns:
-        与输入长度一致的 `(year, ma_value)` 列表；前 `window-1` 项按已有前缀平均。
+        与输入长度一致的 `(year, ma_value)` 列表。
     """
 
-    acc: List[Tuple[int, float]] = []
-    values: List[float] = []
-    for i, (year, val) in enumerate(series):
-        values.append(val)
-        # 取最近 window 项
-        w = values[max(0, i - window + 1) : i + 1]
-        acc.append((year, sum(w) / len(w)))
-    return acc
+    if not series:
+        return []
+    years = [y for y, _ in series]
+    smoothed = smoothing.rolling_mean([v for _, v in series], window, kernel=kernel, min_periods=min_periods)
+    return list(zip(years, smoothed.tolist()))
 
 
 def write_csv(path: str, header: List[str], rows: List[List[object]]) -> None:
-    """写入 CSV 文件，确保父目录存在。
+    """写入 CSV 文件（原子替换，不备份）。
 
     Args:
         path: 输出文件路径。
@@ -1114,645 +835,714 @@ def write_csv(path: str, header: List[str], rows: List[List[object]]) -> None:
         rows: 数据行列表。
     """
 
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
-        writer.writerows(rows)
+    buf = io.StringIO(newline="")
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    writer.writerows(rows)
+    write_output_bytes(path, buf.getvalue().encode("utf-8"), backup=False)
 
 
-def generate_lesson12_csv(temp_records: List[AnnualTempRecord]) -> str:
-    """生成第12课教学用 CSV：年份、气温/°C、滑动均值。
+def generate_lesson12_smoothing_csv(
+    named_series: List[Tuple[str, ColumnarSeries]],
+    windows: Tuple[int, ...] = LESSON12_SMOOTHING_WINDOWS,
+    kernel: str = "centered",
+) -> str:
+    """生成第12课平滑对比 CSV：每条长序列的多档（默认 5/11/31 年）滑动平滑。
+
+    窗口以“年”为单位，按序列的中位采样间隔换算为项数（如 NGRIP 20 年分辨率下
+    31 年窗口约为 2 项）；窗口内有效项不足一半时留空。
 
     Args:
-        temp_records: 年均温度异常记录列表。
+        named_series: `(序列名, 序列)` 列表，如 GISTEMP、NGRIP、ITRDB。
+        windows: 窗口长度（年）。
+        kernel: 窗口核（trailing / centered / gaussian / triangular）。
 
     Returns:
-        输出文件路径。
+        输出文件路径 `assets/data/lesson-12-smoothing.csv`。
     """
 
-    series = [(r.year, r.temp_anomaly_c) for r in temp_records]
-    ma_series = moving_average(series, window=5)
-
-    rows = []
-    for (year, val), (_, ma) in zip(series, ma_series):
-        rows.append([year, round(val, 3), round(ma, 3)])
-
-    out_path = os.path.join(ASSETS_DATA_DIR, "lesson-12-sample.csv")
-    write_csv(out_path, ["年份", "气温/°C", "滑动均值"], rows)
+    rows: List[List[object]] = []
+    for name, series in named_series:
+        if len(series) == 0:
+            continue
+        order = np.argsort(series.years, kind="stable")
+        years = series.years[order]
+        values = series.values[order]
+        step = float(np.median(np.diff(years))) if years.size > 1 else 1.0
+        counts = [max(1, int(round(w / step))) if step > 0 else 1 for w in windows]
+        smoothed = [col.tolist() for col in smoothing.multi_window(values, counts, kernel=kernel)]
+        for i, (year, val) in enumerate(zip(years.tolist(), values.tolist())):
+            rows.append([name, year, round(val, 3)] + ["" if col[i] != col[i] else round(col[i], 3) for col in smoothed])
+
+    out_path = os.path.join(ASSETS_DATA_DIR, "lesson-12-smoothing.csv")
+    header = ["序列", "年份", "数值"] + [f"{w}年平滑" for w in windows]
+    write_csv(out_path, header, rows)
+    # 各序列分别按 LTTB 降采样（如 NGRIP），供图表按视口宽度选用
+    names, years_col, values_col = zip(*[(r[0], r[1], r[2]) for r in rows]) if rows else ((), (), ())
+    variants = downsample.downsample_rows(rows, years_col, values_col, downsample.DEFAULT_TARGETS, "lttb", groups=names)
+    for target, subset in variants.items():
+        write_csv(downsample.variant_path(out_path, target), header, subset)
     return out_path
 
 
-def generate_lesson21_csv(temp_records: List[AnnualTempRecord], co2_records: List[AnnualCO2Record]) -> str:
-    """生成第21课教学用 CSV：年份、CO₂/ppm、温度异常/°C。
+@cached_parser(AnnualSeaLevelRecord, version="3")
+def parse_jpl_gmsl_ascii(file_path: str) -> ColumnarSeries:
+    """解析 NASA JPL/NOAA 全球海平面高度（GMSL）ASCII 文本，汇总为年度平均。
+
+    格式识别与数值解析由 `gmsl.iter_gmsl_batches` 逐批完成：
+    - PO.DAAC MERGED_TP_J1_OSTM_OST_GMSL_ASCII_V5.x 与 GMSL_TPJAOS_5.2（mm，`HDR` 头部）：
+      按头部列说明取小数年列与列11（GIA applied smoothed），列11缺失时回退列8，
+      过滤缺失标记 `99900.000`
+    - NASA_SSH_GMSL_INDICATOR（首列为日期，单位自适应 cm -> mm）
 
     Args:
-        temp_records: 年均温度异常记录列表。
-        co2_records: 年均 CO₂ 浓度记录列表。
+        file_path: 输入 ASCII 文本文件路径。
 
     Returns:
-        输出文件路径。
+        年均海平面序列（`AnnualSeaLevelRecord`，mm）。
     """
 
-    temp_map = {r.year: r.temp_anomaly_c for r in temp_records}
-    rows = []
-    for r in co2_records:
-        if r.year in temp_map:
-            rows.append([r.year, round(r.co2_ppm, 3), round(temp_map[r.year], 3)])
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"未找到海平面数据文件: {file_path}")
+
+    # 逐批读取并按年累计，内存占用与文件大小无关；单位推断所需的小值计数随批累加
+    fmt: List[gmsl.GmslFormat] = []
+    counts = [0, 0]
 
-    out_path = os.path.join(ASSETS_DATA_DIR, "lesson-21-sample.csv")
-    write_csv(out_path, ["年份", "CO₂/ppm", "温度异常/°C"], rows)
-    return out_path
+    def batches() -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        for batch_fmt, years, values in gmsl.iter_gmsl_batches(file_path):
+            fmt[:] = [batch_fmt]
+            counts[0] += int(np.count_nonzero(np.abs(values) < 20.0))
+            counts[1] += values.size
+            yield years, values
 
+    unique_years, means = stages.grouped_mean_batches(batches())
+    to_mm = gmsl.mm_scale(fmt[0], counts[0], counts[1]) if fmt else 1.0
+    return ColumnarSeries(AnnualSeaLevelRecord, unique_years, means * to_mm)
 
-def configure_matplotlib_for_mac_chinese() -> None:
-    """在 macOS 上配置中文字体显示规范。
 
-    使用 Heiti TC 作为默认中文字体，并设置 `axes.unicode_minus` 为 False。
-    """
+# 已拆入 `plotting` 的绘图接口，经模块 `__getattr__` 按需导入后转发（兼容既有调用方）
+_PLOTTING_NAMES = (
+    "FIGURE_DPI",
+    "FigureSpec",
+    "configure_chinese_font",
+    "configure_matplotlib_for_mac_chinese",
+    "render_figures",
+    "resolve_cjk_font",
+    "save_figure_png",
+    "plot_lesson15_temp_anomaly",
+    "plot_lesson21_co2_temp",
+)
+
+
+def _plotting():
+    """按需导入绘图模块（matplotlib 仅在此时加载，并使用 Agg 后端）。"""
+
+    import plotting
+
+    return plotting
+
 
-    plt.rcParams["font.family"] = "Heiti TC"
-    plt.rcParams["axes.unicode_minus"] = False
+def __getattr__(name: str):
+    if name in _PLOTTING_NAMES:
+        return getattr(_plotting(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-def plot_lesson15_temp_anomaly(temp_records: List[AnnualTempRecord]) -> str:
-    """生成第15课示例图：全球温度异常折线图。
+def write_lesson15_gmsl_metadata(derived_csv: str, derived_image: str) -> str:
+    """以 PO.DAAC GMSL V5.2 数据集信息写出第15课元数据。
 
     Args:
-        temp_records: 年均温度异常记录列表。
+        derived_csv: 第15课 CSV 路径。
+        derived_image: 第15课图像路径。
 
     Returns:
-        输出图片路径。
+        写出的元数据 JSON 文件路径。
     """
 
-    configure_matplotlib_for_mac_chinese()
-    years = [r.year for r in temp_records]
-    vals = [r.temp_anomaly_c for r in temp_records]
-
-    plt.figure(figsize=(10, 5), dpi=160)
-    plt.plot(years, vals, color="#d62728", linewidth=2, label="温度异常（°C）")
-    plt.title("全球温度异常（年均，GISTEMP）")
-    plt.xlabel("年份")
-    plt.ylabel("温度异常（°C）")
-    plt.grid(True, alpha=0.3)
-    plt.legend()
-    out_path = os.path.join(ASSETS_IMAGES_DIR, "lesson-15-evidence.png")
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
-    return out_path
+    src = find_source("GMSL_ASCII_V52")
+    return write_lesson15_metadata(
+        dataset_short_name="MERGED_TP_J1_OSTM_OST_GMSL_ASCII_V52",
+        doi=src.dataset_doi,
+        download_date_utc=datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+        sha256=memoized_sha256(src.local_path),
+        source_url=src.source_url,
+        local_path=src.local_path,
+        derived_csv=derived_csv,
+        derived_image=derived_image,
+    )
 
 
-def parse_jpl_gmsl_ascii(file_path: str) -> List[AnnualSeaLevelRecord]:
-    """解析 NASA JPL/NOAA 全球海平面高度（GMSL）ASCII 文本，汇总为年度平均。
+# ===== 原始数据按需解析（经课程引擎的输入缓存，同一次运行内只解析一次） =====
 
-    支持的数据文件类型：
-    - MERGED_TP_J1_OSTM_OST_GMSL_ASCII_V5.x（PO.DAAC，单位为 mm，带注释行 HDR）
-    - NASA_SSH_GMSL_INDICATOR.txt（单位为 cm，包含 60 天平滑列）
-
-    解析策略（鲁棒）：
-    - 跳过注释与头部行：以 "#"、"HDR" 开头或包含 "Header_End" 的行
-    - 优先空白分隔；兼容逗号分隔
-    - V5.x 行格式：`[type, cycle, year_frac, ... , col6..col13]`
-      - 年份取 `int(float(parts[2]))`
-      - 海平面值优先取列11（`parts[10]`，GIA applied smoothed，mm），若解析失败回退列8（`parts[7]`）
-      - 过滤缺失标记 `99900.000`
-    - 指标文件行格式：首列为日期（YYYY-MM-DD / YYYY/MM/DD），取后续首个数值为海平面值
-    - 单位自适应：若绝大多数值绝对值 < 20，视为 cm，乘以 10 转换为 mm
-    - 按年份聚合平均，输出年度 mm 异常
+def load_temp_records() -> ColumnarSeries:
+    """GISTEMP 年均温度异常（课程输入 `gistemp_jd`，运行内缓存）。"""
 
-    Args:
-        file_path: 输入 ASCII 文本文件路径。
+    return lesson_engine().load("gistemp_jd")
 
-    Returns:
-        年均海平面记录列表（mm）。
+
+def load_co2_records() -> ColumnarSeries:
+    """NOAA CO₂ 年均值（课程输入 `co2_annual`，运行内缓存）。"""
+
+    return lesson_engine().load("co2_annual")
+
+
+def annual_store_columns() -> List[AnnualColumn]:
+    """年度序列存储的列声明（可按年份连接的新序列在此登记；原始文件缺失的列自动略过）。"""
+
+    from annual_store import AnnualColumn
+
+    return [
+        AnnualColumn("gistemp_jd", GISTEMP_CSV, parse_gistemp_annual_jd),
+        AnnualColumn("co2_annual", NOAA_CO2_MONTHLY_CSV, parse_noaa_co2_annual_mean),
+        AnnualColumn("gmsl_annual", SEA_LEVEL_ASCII, parse_jpl_gmsl_ascii),
+        AnnualColumn("tree_ring_cana426", ITRDB_RWL_CANA426, parse_itrdb_rwl_template),
+        AnnualColumn("ngrip_d18o", NGRIP_D18O_20YR, parse_vinther_ngrip_20yr),
+    ]
+
+
+@lru_cache(maxsize=None)
+def annual_store() -> AnnualSeriesStore:
+    """返回年度序列共享存储（运行内只校验一次指纹，输入变化时重建；重建时经课程引擎取列）。"""
+
+    from annual_store import ensure_annual_store
+
+    return ensure_annual_store(ANNUAL_STORE_PATH, annual_store_columns(), load=lambda col: lesson_engine().load(col.name))
+
+
+# ===== 课程规格登记表 =====
+#
+# 各课教学 CSV 由输入、变换、列格式与输出声明，统一由 `lesson_engine.LessonEngine` 执行；
+# 全量、并行与增量模式均由此表派生。新增课程时只需在 `lesson_specs` 中追加一项（按年连接的
+# 输入优先登记到年度序列存储，见 `annual_store_columns`）。登记表与 `annual_store_columns`
+# 一样以函数给出，`lesson_engine` 只在真正生成课程时才导入。
+
+LESSON15_IMAGE = os.path.join(ASSETS_IMAGES_DIR, "lesson-15-evidence.png")
+
+
+@lru_cache(maxsize=None)
+def lesson_inputs() -> List[LessonInput]:
+    """课程共享输入的登记表（键 -> 原始文件与加载函数）。
+
+    年序列的键与 `annual_store_columns` 的列名一致，存储重建时按列名经引擎取用。
     """
 
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"未找到海平面数据文件: {file_path}")
+    from lesson_engine import LessonInput
 
-    # 暂存每日/每周期数值
-    per_year_values: Dict[int, List[float]] = {}
-    candidate_values: List[float] = []
+    return [
+        LessonInput("gistemp_jd", (GISTEMP_CSV,), lambda: parse_gistemp_annual_jd(GISTEMP_CSV)),
+        LessonInput("co2_annual", (NOAA_CO2_MONTHLY_CSV,), lambda: parse_noaa_co2_annual_mean(NOAA_CO2_MONTHLY_CSV)),
+        LessonInput("gmsl_annual", (SEA_LEVEL_ASCII,), lambda: parse_jpl_gmsl_ascii(SEA_LEVEL_ASCII)),
+        LessonInput("tree_ring_cana426", (ITRDB_RWL_CANA426,), lambda: parse_itrdb_rwl_template(ITRDB_RWL_CANA426)),
+        LessonInput("ngrip_d18o", (NGRIP_D18O_20YR,), lambda: parse_vinther_ngrip_20yr(NGRIP_D18O_20YR)),
+        LessonInput("xl16_growth", (SPELEO_XL16,), lambda: iter_speleothem_xl16_growth(SPELEO_XL16), stream=True),
+        LessonInput("walker_grainsize", (WALKER_GS,), lambda: iter_walker_grainsize(WALKER_GS), stream=True),
+    ]
 
-    def is_float(s: str) -> bool:
-        try:
-            float(s)
-            return True
-        except ValueError:
-            return False
-
-    def looks_like_date(token: str) -> bool:
-        token = token.strip()
-        return (
-            len(token) >= 10
-            and token[:4].isdigit()
-            and (token[4] == '-' or token[4] == '/')
-        )
-
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            line = raw.strip()
-            if (
-                not line
-                or line.startswith("#")
-                or line.upper().startswith("HDR")
-                or "Header_End" in line
-            ):
-                continue
 
-            # 逗号或空白分隔
-            parts = (
-                [p for p in line.replace("\t", " ").split(",") if p.strip()]
-                if "," in line
-                else [p for p in line.split() if p.strip()]
-            )
-            if not parts:
-                continue
+@lru_cache(maxsize=None)
+def lesson_specs() -> List[LessonSpec]:
+    """课程规格登记表（按执行与汇总顺序）。"""
 
-            year: int | None = None
-            val: float | None = None
+    from lesson_engine import Column, Concat, Join, LessonSpec, Rolling, Window
 
-            # 识别 V5.x 行（首列/次列为数字且第三列为年小数）
-            if len(parts) >= 11 and parts[0].lstrip("-+").isdigit() and parts[1].lstrip("-+").isdigit() and is_float(parts[2]):
-                try:
-                    year = int(float(parts[2]))
-                except ValueError:
-                    year = None
-                # 优先列11（GIA applied smoothed），回退列8（GIA not applied smoothed）
-                chosen_idx = 10
-                if not is_float(parts[chosen_idx]) and len(parts) >= 8 and is_float(parts[7]):
-                    chosen_idx = 7
-                if is_float(parts[chosen_idx]):
-                    val_candidate = float(parts[chosen_idx])
-                    # 过滤缺失值标记
-                    if abs(val_candidate) < 99900.0:
-                        val = val_candidate
-
-            # 识别指标文件行（首列看起来像日期）
-            elif looks_like_date(parts[0]):
-                year = int(parts[0][:4])
-                # 取日期后的首个数值作为海平面值
-                for p in parts[1:]:
-                    if is_float(p):
-                        val = float(p)
-                        break
-
-            # 若上述均未匹配，但首列形似年份（YYYY）
-            elif len(parts[0]) >= 4 and parts[0][:4].isdigit():
-                year = int(parts[0][:4])
-                for p in parts[1:]:
-                    if is_float(p):
-                        val = float(p)
-                        break
-
-            # 收集并聚合
-            if year is None or val is None:
-                continue
-            candidate_values.append(abs(val))
-            per_year_values.setdefault(year, []).append(val)
-
-    # 单位自适应：若大多数值绝对值 < 20，则视为 cm -> 转 mm
-    to_mm_factor = 1.0
-    if candidate_values:
-        small_fraction = sum(1 for v in candidate_values if v < 20.0) / len(candidate_values)
-        if small_fraction > 0.8:
-            to_mm_factor = 10.0
-
-    records: List[AnnualSeaLevelRecord] = []
-    for year, vals in sorted(per_year_values.items()):
-        if not vals:
-            continue
-        avg_mm = sum(vals) / len(vals) * to_mm_factor
-        records.append(AnnualSeaLevelRecord(year=year, sea_level_mm=float(avg_mm)))
+    return [
+        LessonSpec(
+            name="lesson-12-csv",
+            title="第12课 CSV",
+            output="lesson-12-sample.csv",
+            transform=Rolling("gistemp_jd", window=5),
+            columns=(Column("年份", "year"), Column("气温/°C", "value", 3), Column("滑动均值", "rolling", 3)),
+        ),
+        LessonSpec(
+            name="lesson-21-csv",
+            title="第21课 CSV",
+            output="lesson-21-sample.csv",
+            transform=Join(("co2_annual", "gistemp_jd")),
+            columns=(Column("年份", "year"), Column("CO₂/ppm", "co2_annual", 3), Column("温度异常/°C", "gistemp_jd", 3)),
+        ),
+        LessonSpec(
+            name="lesson-15-csv",
+            title="第15课 CSV",
+            output="lesson-15-sample.csv",
+            transform=Join(("gmsl_annual", "gistemp_jd")),
+            columns=(Column("年份", "year"), Column("温度异常/°C", "gistemp_jd", 3), Column("海平面/mm", "gmsl_annual", 2)),
+            after=lambda path: write_lesson15_gmsl_metadata(path, LESSON15_IMAGE),
+            extra_outputs=(LESSON15_METADATA_JSON,),
+        ),
+        # 冰芯为 20 年分辨率：树轮按 ±10 年窗口聚合到冰芯年份，窗口内无树轮数据的年份剔除
+        LessonSpec(
+            name="lesson-02",
+            title="第2课 CSV",
+            output="lesson-02-sample.csv",
+            transform=Window("ngrip_d18o", "tree_ring_cana426", radius=10),
+            columns=(Column("年份", "year"), Column("宽度/mm", "tree_ring_cana426", 3), Column("δ18O/‰", "ngrip_d18o", 3)),
+            backup=True,
+            after=write_lesson02_metadata,
+            extra_outputs=(LESSON02_METADATA_JSON,),
+            optional=True,
+            version="2",
+        ),
+        # 石笋填 `速率`（mm/yr）、岩芯填 `粒度`（µm），按样点与年代排序便于教学演示
+        LessonSpec(
+            name="lesson-03",
+            title="第3课 CSV",
+            output="lesson-03-sample.csv",
+            transform=Concat(("xl16_growth", "walker_grainsize")),
+            columns=(
+                Column("样点", "site"),
+                Column("年代", "year"),
+                Column("速率", "xl16_growth", 3),
+                Column("粒度", "walker_grainsize", 3),
+            ),
+            sort_by=("site", "year"),
+            backup=True,
+            after=write_lesson03_metadata,
+            extra_outputs=(LESSON03_METADATA_JSON,),
+            optional=True,
+            version="3",
+        ),
+    ]
 
-    return records
 
+@lru_cache(maxsize=None)
+def lesson_engine() -> LessonEngine:
+    """返回运行内共享的课程引擎（各输入在全部课程间只加载一次）。"""
 
-def generate_lesson15_csv(temp_records: List[AnnualTempRecord], sea_records: List[AnnualSeaLevelRecord]) -> str:
-    """生成第15课教学用 CSV：年份、温度异常/°C、海平面/mm。
+    from lesson_engine import LessonEngine
 
-    合并策略：
-    - 以年份为键，将 GISTEMP 年度异常与 GMSL 年度平均按年份合并。
-    - 输出列为 [年份, 温度异常/°C, 海平面/mm]。
+    return LessonEngine(lesson_inputs(), ASSETS_DATA_DIR, store=annual_store)
 
-    Args:
-        temp_records: 年均温度异常记录列表。
-        sea_records: 年均海平面高度记录列表（mm）。
+
+@lru_cache(maxsize=None)
+def school_store() -> SchoolStore:
+    """返回已与曹杨中学数据目录同步的列式存储（运行内仅同步一次，只解码新增/变化的工作簿）。"""
+
+    from school_store import SchoolStore
+
+    store = SchoolStore.for_source(SCHOOL_DIR)
+    report = store.sync(SCHOOL_DIR)
+    if report.ingested or report.removed:
+        print(f"学校观测存储：{report.describe()}")
+    return store
+
+
+def generate_school_lessons(store: SchoolStore) -> List[str]:
+    """融合导出第1/4/5/6课 CSV：从存储一次读取所需各列，单遍渲染四课后批量写出。
+
+    同时写出各课的降采样变体、图表二进制载荷（`*.chart.json` + `*.chart.bin`）与按日/月预聚合的小表（见 `resample.LESSON_RESAMPLES`），供课件展示趋势时
+    免于加载全部逐时记录。
 
     Returns:
-        输出文件路径。
+        按课号顺序的逐时 CSV 输出路径列表。
     """
 
-    temp_map = {r.year: r.temp_anomaly_c for r in temp_records}
-    rows: List[List[float]] = []
-    for r in sea_records:
-        if r.year in temp_map:
-            rows.append([r.year, round(temp_map[r.year], 3), round(r.sea_level_mm, 2)])
+    lessons = ("01", "04", "05", "06")
+    needed = sorted({name for n in lessons for name in school_export.LESSON_COLUMNS[n]})
+    table = store.read(needed)
+    rendered = school_export.render_school_lessons(table, lessons)
+    paths = []
+    for n in lessons:
+        out = os.path.join(ASSETS_DATA_DIR, school_export.SCHOOL_LESSONS[n][0])
+        write_output_bytes(out, rendered[n])
+        paths.append(out)
+        x, y = school_export.lesson_chart_series(table, n)
+        method = school_export.LESSON_CHART_SERIES[n][1]
+        for target, data in downsample.csv_variants(rendered[n], x, y, downsample.DEFAULT_TARGETS, method).items():
+            write_output_bytes(downsample.variant_path(out, target), data, backup=False)
+    for payload in school_export.school_lesson_payloads(table, lessons).values():
+        header_path, blob_path = chart_payload.payload_paths(ASSETS_DATA_DIR, payload.name)
+        header_bytes, blob = payload.encode()
+        write_output_bytes(blob_path, blob, backup=False)
+        write_output_bytes(header_path, header_bytes, backup=False)
+    for filename, (header, rows) in resample.lesson_aggregate_tables(table, lessons).items():
+        write_csv_with_backup(os.path.join(ASSETS_DATA_DIR, filename), header, rows)
+    return paths
 
-    out_path = os.path.join(ASSETS_DATA_DIR, "lesson-15-sample.csv")
-    write_csv(out_path, ["年份", "温度异常/°C", "海平面/mm"], rows)
-    return out_path
 
+def school_output_paths() -> List[str]:
+    """第1/4/5/6课全部输出（逐时 CSV、降采样变体、图表二进制载荷与预聚合表）路径。"""
 
-def plot_lesson21_co2_temp(temp_records: List[AnnualTempRecord], co2_records: List[AnnualCO2Record]) -> str:
-    """生成第21课示例图：CO₂ 与温度异常双轴折线图。
+    hourly = [os.path.join(ASSETS_DATA_DIR, school_export.SCHOOL_LESSONS[n][0]) for n in ("01", "04", "05", "06")]
+    variants = [downsample.variant_path(p, target) for p in hourly for target in downsample.DEFAULT_TARGETS]
+    variants += [path for p in hourly for path in chart_payload.payload_paths(ASSETS_DATA_DIR, os.path.splitext(os.path.basename(p))[0])]
+    aggregates = [filename for n in ("01", "04", "05", "06") for filename, _, _ in resample.LESSON_RESAMPLES[n]]
+    return hourly + variants + [os.path.join(ASSETS_DATA_DIR, name) for name in aggregates]
 
-    此图通过双轴展示全球年均温度异常与年均 CO₂ 浓度的时间序列关系。
-    为避免中文字体 Heiti TC 缺少下标字符“₂”的显示问题，图中的
-    “CO₂”文本均使用 LaTeX 样式的 mathtext 语法渲染为 ``$\mathrm{CO_2}$``。
-    这不依赖外部 LaTeX 环境，直接使用 Matplotlib 内置的 mathtext 引擎。
 
-    Args:
-        temp_records: 年均温度异常记录列表。
-        co2_records: 年均 CO₂ 浓度记录列表。
+def _raw_source_paths() -> List[str]:
+    """返回来源登记表中本地已存在的原始数据文件路径。"""
+
+    return [src.local_path for src in RAW_SOURCES if os.path.isfile(src.local_path)]
+
+
+def build_asset_targets() -> List[BuildTarget]:
+    """声明全部派生资产的构建目标（输入、输出与生成函数）。
+
+    原始输入缺失的可选目标（学校观测、输入缺失的课程规格）不纳入构建图，
+    与全量模式下“跳过”的行为一致。
 
     Returns:
-        输出图片路径。
+        构建目标列表。
     """
 
-    configure_matplotlib_for_mac_chinese()
-    # 对齐年份范围
-    temp_map = {r.year: r.temp_anomaly_c for r in temp_records}
-    co2_map = {r.year: r.co2_ppm for r in co2_records}
-    common_years = sorted(set(temp_map.keys()) & set(co2_map.keys()))
-    if not common_years:
-        raise RuntimeError("CO₂ 与温度异常无交集年份，无法绘图")
-
-    years = common_years
-    temp_vals = [temp_map[y] for y in years]
-    co2_vals = [co2_map[y] for y in years]
-
-    plt.figure(figsize=(10, 5), dpi=160)
-    ax1 = plt.gca()
-    ax2 = ax1.twinx()
-
-    ax1.plot(years, temp_vals, color="#d62728", linewidth=2, label="温度异常（°C）")
-    ax2.plot(years, co2_vals, color="#1f77b4", linewidth=2, label=r"$\mathrm{CO_2}$（ppm）")
-
-    ax1.set_xlabel("年份")
-    ax1.set_ylabel("温度异常（°C）", color="#d62728")
-    ax2.set_ylabel(r"$\mathrm{CO_2}$（ppm）", color="#1f77b4")
-    plt.title(r"$\mathrm{CO_2}$ 与全球温度异常（年均）")
-    ax1.grid(True, alpha=0.3)
-
-    # 合并图例
-    lines1, labels1 = ax1.get_legend_handles_labels()
-    lines2, labels2 = ax2.get_legend_handles_labels()
-    plt.legend(lines1 + lines2, labels1 + labels2, loc="upper left")
-
-    out_path = os.path.join(ASSETS_IMAGES_DIR, "lesson-21-co2-temp.png")
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
-    return out_path
+    raw_paths = _raw_source_paths()
+    engine = lesson_engine()
 
+    targets: List[BuildTarget] = [
+        BuildTarget(
+            name="raw-source-metadata",
+            inputs=raw_paths,
+            outputs=[RAW_SOURCES_METADATA_JSON] + [f"{p}.metadata.json" for p in raw_paths],
+            build=write_source_metadata,
+            version="2",
+        ),
+        BuildTarget(
+            name="lesson-15-image",
+            inputs=[GISTEMP_CSV],
+            outputs=[LESSON15_IMAGE],
+            build=lambda: _plotting().plot_lesson15_temp_anomaly(load_temp_records()),
+        ),
+        BuildTarget(
+            name="lesson-21-image",
+            inputs=[GISTEMP_CSV, NOAA_CO2_MONTHLY_CSV],
+            outputs=[os.path.join(ASSETS_IMAGES_DIR, "lesson-21-co2-temp.png")],
+            build=lambda: _plotting().plot_lesson21_co2_temp(load_temp_records(), load_co2_records()),
+        ),
+    ]
 
-def main() -> None:
-    """主函数：执行数据解析、加工与输出图像生成。
+    def build_smoothing() -> None:
+        for w in run_lesson12_smoothing_branch().warnings:
+            print(w)
 
-    执行步骤：
-    1. 读取并解析 GISTEMP 与 NOAA CO₂ 数据（必需）
-    2. 如存在海平面数据文件，解析并生成第15课 CSV 到 `assets/data`
-    3. 生成第12课与第21课 CSV 到 `assets/data`
-    4. 生成第15课与第21课教学示例图到 `assets/images`
-    """
+    smoothing_csv = os.path.join(ASSETS_DATA_DIR, "lesson-12-smoothing.csv")
+    targets.append(BuildTarget(
+        name="lesson-12-smoothing",
+        inputs=[p for p in (GISTEMP_CSV, NGRIP_D18O_20YR, ITRDB_RWL_CANA426) if os.path.exists(p)],
+        outputs=[smoothing_csv] + [downsample.variant_path(smoothing_csv, target) for target in downsample.DEFAULT_TARGETS],
+        build=build_smoothing,
+        version="2",
+    ))
 
-    ensure_dirs()
+    if os.path.isdir(SCHOOL_DIR):
+        def build_school() -> None:
+            generate_school_lessons(school_store())
+
+        targets.append(BuildTarget(
+            name="school-lessons-01-04-05-06",
+            inputs=[SCHOOL_DIR],
+            outputs=school_output_paths(),
+            build=build_school,
+            version="3",
+        ))
+
+    # 课程规格：原始输入缺失的规格不纳入构建图
+    for spec in lesson_specs():
+        if engine.missing_inputs(spec):
+            continue
+        targets.append(BuildTarget(
+            name=spec.name,
+            inputs=engine.input_paths(spec),
+            outputs=engine.outputs(spec),
+            build=partial(engine.build, spec),
+            version=spec.version,
+        ))
 
-    # 写原始数据元数据（如文件存在）。
-    try:
-        raw_meta_path = write_raw_sources_metadata()
-    except Exception as e:
-        raw_meta_path = None
-        print(f"警告：原始数据元数据写入失败 -> {e}")
+    return targets
 
-    # 为每个原始文件写旁注元数据（下载即写元数据的语义表现）。
-    try:
-        sidecar_paths = write_raw_sidecar_metadata()
-    except Exception as e:
-        sidecar_paths = []
-        print(f"警告：原始数据旁注元数据写入失败 -> {e}")
 
+def run_incremental(force: bool = False) -> None:
+    """增量构建模式：仅重建输入指纹或输出状态发生变化的目标。
+
+    Args:
+        force: 为 True 时忽略构建清单，全部重建（并刷新清单）。
+    """
+
+    ensure_dirs()
     if not os.path.exists(GISTEMP_CSV):
         raise FileNotFoundError(f"未找到 GISTEMP 数据文件: {GISTEMP_CSV}")
     if not os.path.exists(NOAA_CO2_MONTHLY_CSV):
         raise FileNotFoundError(f"未找到 NOAA CO₂ 月度数据文件: {NOAA_CO2_MONTHLY_CSV}")
 
-    temp_records = parse_gistemp_annual_jd(GISTEMP_CSV)
-    co2_records = parse_noaa_co2_annual_mean(NOAA_CO2_MONTHLY_CSV)
+    # 增量模式下后续目标可能读取前序目标的输出，因此逐目标提交
+    targets = build_asset_targets()
+    for target in targets:
+        target.build = in_output_transaction(target.build)
+    report = run_build_graph(targets, BUILD_MANIFEST_JSON, force=force)
+    print("增量构建完成：")
+    print(f"- 已重建（{len(report.built)}）: {', '.join(report.built) or '无'}")
+    print(f"- 已是最新（{len(report.skipped)}）: {', '.join(report.skipped) or '无'}")
+    for name, err in report.failed:
+        print(f"- 失败: {name} -> {err}")
 
-    # 可选：海平面数据（NASA JPL/NOAA）
-    lesson15_csv_path: str | None = None
-    if os.path.exists(SEA_LEVEL_ASCII):
-        sea_records = parse_jpl_gmsl_ascii(SEA_LEVEL_ASCII)
-        lesson15_csv_path = generate_lesson15_csv(temp_records, sea_records)
-    else:
-        print(f"提示：未找到海平面数据文件，跳过第15课 CSV 生成 -> {SEA_LEVEL_ASCII}")
-
-    path12 = generate_lesson12_csv(temp_records)
-    path21 = generate_lesson21_csv(temp_records, co2_records)
-    img15 = plot_lesson15_temp_anomaly(temp_records)
-    img21 = plot_lesson21_co2_temp(temp_records, co2_records)
-
-    # 写出第15课的元数据（如海平面数据存在）
-    if lesson15_csv_path and os.path.exists(SEA_LEVEL_ASCII):
-        sha256 = compute_sha256(SEA_LEVEL_ASCII)
-        dataset_short_name = "MERGED_TP_J1_OSTM_OST_GMSL_ASCII_V52"
-        doi = "10.5067/GMSLM-TJ152"
-        download_date_utc = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        source_url = (
-            "https://archive.podaac.earthdata.nasa.gov/podaac-ops-cumulus/Protected/"
-            "MERGED_TP_J1_OSTM_OST_GMSL_ASCII_V52/merged_global_sea_level_v5.2.txt"
-        )
-        write_lesson15_metadata(
-            dataset_short_name=dataset_short_name,
-            doi=doi,
-            download_date_utc=download_date_utc,
-            sha256=sha256,
-            source_url=source_url,
-            local_path=SEA_LEVEL_ASCII,
-            derived_csv=lesson15_csv_path,
-            derived_image=img15,
-        )
-
-    # 基于“曹杨中学”数据生成第1/4/5/6课配套CSV
-    if os.path.isdir(SCHOOL_DIR):
-        school_records = read_school_xls_rows(SCHOOL_DIR)
-        p01 = generate_school_lesson01(school_records)
-        p04 = generate_school_lesson04(school_records)
-        p05 = generate_school_lesson05(school_records)
-        p06 = generate_school_lesson06(school_records)
-    else:
-        p01 = p04 = p05 = p06 = None
 
-    # 第2/3课：树轮 + 冰芯；石笋 + 岩芯
-    path02 = None
-    path03 = None
-    if os.path.exists(ITRDB_RWL_CANA426) and os.path.exists(NGRIP_D18O_20YR):
-        try:
-            tree_records = parse_itrdb_rwl_template(ITRDB_RWL_CANA426)
-            ice_records = parse_vinther_ngrip_20yr(NGRIP_D18O_20YR)
-            path02 = generate_lesson02_csv(tree_records, ice_records)
-            write_lesson02_metadata(path02)
-        except Exception as e:
-            print(f"警告：第2课数据处理失败 -> {e}")
-    else:
-        print(f"提示：第2课数据不存在或不全，跳过 -> {ITRDB_RWL_CANA426}, {NGRIP_D18O_20YR}")
+@dataclass
+class BranchResult:
+    """一条独立课程分支的执行结果。
 
-    if os.path.exists(SPELEO_XL16) and os.path.exists(WALKER_GS):
-        try:
-            speleo_records = parse_speleothem_xl16_growth(SPELEO_XL16)
-            core_records = parse_walker_grainsize(WALKER_GS)
-            path03 = generate_lesson03_csv(speleo_records, core_records)
-            write_lesson03_metadata(path03)
-        except Exception as e:
-            print(f"警告：第3课数据处理失败 -> {e}")
-    else:
-        print(f"提示：第3课数据不存在或不全，跳过 -> {SPELEO_XL16}, {WALKER_GS}")
+    Attributes:
+        name: 分支名称（如 "lesson-02"）。
+        summary: 汇总输出行（如 "- 第2课 CSV: <路径>"）。
+        warnings: 分支内捕获的警告信息。
+        staged: 分支暂存、尚未提交的输出（由父进程统一提交）。
+        messages: 分支执行期间打印的状态信息（如“内容未变化，跳过写入”），由父进程统一打印。
+    """
 
-    print("生成完成：")
-    print(f"- 第12课 CSV: {path12}")
-    print(f"- 第21课 CSV: {path21}")
-    if lesson15_csv_path:
-        print(f"- 第15课 CSV: {lesson15_csv_path}")
-    else:
-        print("- 第15课 CSV: 跳过（待提供 NASA/NOAA 海平面数据）")
-    print(f"- 第15课 图像: {img15}")
-    print(f"- 第21课 图像: {img21}")
-    if p01:
-        print(f"- 第1课 CSV: {p01}")
-    if p04:
-        print(f"- 第4课 CSV: {p04}")
-    if p05:
-        print(f"- 第5课 CSV: {p05}")
-    if p06:
-        print(f"- 第6课 CSV: {p06}")
-    if raw_meta_path:
-        print(f"- 原始数据元数据: {raw_meta_path}")
-    if sidecar_paths:
-        print(f"- 原始数据旁注元数据（{len(sidecar_paths)} 件）: 示例 {sidecar_paths[0]}")
-    if path02:
-        print(f"- 第2课 CSV: {path02}")
-    else:
-        print("- 第2课 CSV: 跳过（待提供 ITRDB/NGRIP 数据）")
-    if path03:
-        print(f"- 第3课 CSV: {path03}")
-    else:
-        print("- 第3课 CSV: 跳过（待提供 石笋/湖泊岩芯数据）")
+    name: str
+    summary: List[str]
+    warnings: List[str]
+    staged: List[StagedOutput] = field(default_factory=list)
+    messages: List[str] = field(default_factory=list)
 
 
-if __name__ == "__main__":
-    main()
-def parse_jpl_gmsl_ascii(file_path: str) -> List[AnnualSeaLevelRecord]:
-    """解析 NASA JPL/NOAA 全球海平面高度（GMSL）ASCII 文本，汇总为年度平均。
+def run_raw_metadata_branch() -> BranchResult:
+    """分支：写原始数据汇总元数据与逐文件旁注元数据（如文件存在）。"""
 
-    支持的数据文件类型：
-    - MERGED_TP_J1_OSTM_OST_GMSL_ASCII_V5.x（PO.DAAC，单位通常为 mm，带注释行）
-    - NASA_SSH_GMSL_INDICATOR.txt（单位为 cm，包含 60 天平滑列）
+    summary: List[str] = []
+    warnings: List[str] = []
+    # 汇总元数据与逐文件旁注一次遍历写出（下载即写元数据的语义表现）。
+    try:
+        raw_meta_path, sidecar_paths = write_source_metadata()
+        summary.append(f"- 原始数据元数据: {raw_meta_path}")
+        if sidecar_paths:
+            summary.append(f"- 原始数据旁注元数据（{len(sidecar_paths)} 件）: 示例 {sidecar_paths[0]}")
+    except Exception as e:
+        warnings.append(f"警告：原始数据元数据写入失败 -> {e}")
+    return BranchResult("raw-metadata", summary, warnings)
 
-    解析策略：
-    - 跳过注释行（以 "#" 开头）与空行
-    - 对每行进行分隔（优先逗号，其次空白）
-    - 尝试从首列提取日期（优先识别 YYYY-MM-DD；若仅有年度，直接使用）
-    - 从数值列选择第一个海平面值（单位自适应：若绝对值普遍 < 20，视为 cm，乘以 10 转换为 mm）
-    - 按年份聚合平均，输出年度 mm 异常
 
-    Args:
-        file_path: 输入 ASCII 文本文件路径。
+def climate_figure_specs(temp_records: ColumnarSeries, co2_records: ColumnarSeries) -> List:
+    """第15/21课示例图的渲染任务（新增示例图在此登记）。
 
     Returns:
-        年均海平面记录列表（mm）。
+        `plotting.FigureSpec` 列表，顺序即 `render_figures` 返回路径的顺序。
     """
 
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"未找到海平面数据文件: {file_path}")
+    plotting = _plotting()
+    return [
+        plotting.FigureSpec("lesson-15", plotting.plot_lesson15_temp_anomaly, (temp_records,)),
+        plotting.FigureSpec("lesson-21", plotting.plot_lesson21_co2_temp, (temp_records, co2_records)),
+    ]
 
-    # 暂存每日/每周期数值
-    per_year_values: Dict[int, List[float]] = {}
-    candidate_values: List[float] = []
 
-    def parse_year(token: str) -> int | None:
-        # 尝试多格式：YYYY-MM-DD / YYYY/MM/DD / YYYY
-        token = token.strip()
-        if len(token) >= 4 and token[:4].isdigit():
-            try:
-                return int(token[:4])
-            except ValueError:
-                return None
-        return None
+def run_lessons_branch() -> BranchResult:
+    """分支：按 `lesson_specs()` 生成各课教学 CSV 与元数据（共享输入只加载一次）。"""
 
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            line = raw.strip()
-            if not line or line.startswith("#"):
-                continue
-            # 逗号或空白分隔
-            parts = [p for p in line.replace("\t", " ").split(",") if p.strip()] if "," in line else [p for p in line.split() if p.strip()]
-            if not parts:
-                continue
-            year = parse_year(parts[0])
-            # 收集数值列（跳过非数值）
-            values: List[float] = []
-            for p in parts[1:]:
-                try:
-                    values.append(float(p))
-                except ValueError:
-                    # 可能是日期或文本，忽略
-                    continue
-            if not values:
-                continue
-            # 选择第一个数值作为海平面异常
-            val = values[0]
-            candidate_values.append(abs(val))
-            if year is not None:
-                per_year_values.setdefault(year, []).append(val)
-
-    # 单位自适应：若大多数值绝对值 < 20，则视为 cm -> 转 mm
-    to_mm_factor = 1.0
-    if candidate_values:
-        small_fraction = sum(1 for v in candidate_values if v < 20.0) / len(candidate_values)
-        if small_fraction > 0.8:
-            to_mm_factor = 10.0
-
-    records: List[AnnualSeaLevelRecord] = []
-    for year, vals in sorted(per_year_values.items()):
-        if not vals:
-            continue
-        avg_mm = sum(vals) / len(vals) * to_mm_factor
-        records.append(AnnualSeaLevelRecord(year=year, sea_level_mm=float(avg_mm)))
+    results = lesson_engine().run(lesson_specs())
+    return BranchResult(
+        "lessons",
+        [res.summary for res in results],
+        [w for res in results for w in res.warnings],
+    )
 
-    return records
 
+def run_climate_branch() -> BranchResult:
+    """分支：GISTEMP 与 NOAA CO₂ -> 第15/21课图像。"""
 
-def generate_lesson15_csv(temp_records: List[AnnualTempRecord], sea_records: List[AnnualSeaLevelRecord]) -> str:
-    """生成第15课教学用 CSV：年份、温度异常/°C、海平面/mm。
+    temp_records, co2_records = load_temp_records(), load_co2_records()
+    img15, img21 = _plotting().render_figures(climate_figure_specs(temp_records, co2_records))
+    summary = [
+        f"- 第15课 图像: {img15}",
+        f"- 第21课 图像: {img21}",
+    ]
+    return BranchResult("climate", summary, [])
 
-    合并策略：
-    - 以年份为键，将 GISTEMP 年度异常与 GMSL 年度平均按年份合并。
-    - 输出列为 [年份, 温度异常/°C, 海平面/mm]。
 
-    Args:
-        temp_records: 年均温度异常记录列表。
-        sea_records: 年均海平面高度记录列表（mm）。
+def run_lesson12_smoothing_branch() -> BranchResult:
+    """分支：GISTEMP / NGRIP / ITRDB 长序列 -> 第12课 5/11/31 年平滑对比 CSV。
 
-    Returns:
-        输出文件路径。
+    NGRIP 与 ITRDB 为可选序列：文件缺失时略去，解析失败时记警告并略去，其余序列照常平滑。
     """
 
-    temp_map = {r.year: r.temp_anomaly_c for r in temp_records}
-    rows: List[List[float]] = []
-    for r in sea_records:
-        if r.year in temp_map:
-            rows.append([r.year, round(temp_map[r.year], 3), round(r.sea_level_mm, 2)])
+    engine = lesson_engine()
+    named = [("GISTEMP", engine.load("gistemp_jd"))]
+    warnings: List[str] = []
+    optional = [
+        ("NGRIP δ18O", NGRIP_D18O_20YR, "ngrip_d18o"),
+        ("ITRDB CANA426", ITRDB_RWL_CANA426, "tree_ring_cana426"),
+    ]
+    for label, path, key in optional:
+        if not os.path.exists(path):
+            continue
+        try:
+            named.append((label, engine.load(key)))
+        except Exception as e:
+            warnings.append(f"警告：第12课 平滑对比略去 {label}（解析失败）-> {e}")
+    path = generate_lesson12_smoothing_csv(named)
+    return BranchResult("lesson-12-smoothing", [f"- 第12课 平滑对比 CSV: {path}"], warnings)
+
+
+def run_school_branch() -> BranchResult:
+    """分支：曹杨中学逐时观测 -> 第1/4/5/6课 CSV。"""
+
+    if not os.path.isdir(SCHOOL_DIR):
+        return BranchResult("school", [], [])
+    paths = generate_school_lessons(school_store())
+    summary = [f"- 第{n}课 CSV: {p}" for n, p in zip((1, 4, 5, 6), paths)]
+    return BranchResult("school", summary, [])
 
-    out_path = os.path.join(ASSETS_DATA_DIR, "lesson-15-sample.csv")
-    write_csv(out_path, ["年份", "温度异常/°C", "海平面/mm"], rows)
-    return out_path
-def parse_jpl_gmsl_ascii(file_path: str) -> List[AnnualSeaLevelRecord]:
-    """解析 NASA JPL/NOAA 全球海平面高度（GMSL）ASCII 文本，汇总为年度平均。
 
-    支持的数据文件类型：
-    - MERGED_TP_J1_OSTM_OST_GMSL_ASCII_V5.x（PO.DAAC，单位通常为 mm，带注释行）
-    - NASA_SSH_GMSL_INDICATOR.txt（单位为 cm，包含 60 天平滑列）
+def run_branch_staged(branch: Callable[[], BranchResult]) -> BranchResult:
+    """在暂存事务中执行一条分支，输出只写入临时文件并随结果交回调用方提交。
 
-    解析策略：
-    - 跳过注释行（以 "#" 开头）与空行
-    - 对每行进行分隔（优先逗号，其次空白）
-    - 尝试从首列提取日期（优先识别 YYYY-MM-DD；若仅有年度，直接使用）
-    - 从数值列选择第一个海平面值（单位自适应：若绝对值普遍 < 20，视为 cm，乘以 10 转换为 mm）
-    - 按年份聚合平均，输出年度 mm 异常
+    分支打印的状态信息同样不直接输出，收集到结果中由调用方按分支顺序打印。
 
     Args:
-        file_path: 输入 ASCII 文本文件路径。
+        branch: 分支函数。
 
     Returns:
-        年均海平面记录列表（mm）。
+        分支结果，`staged` 字段为已同步到磁盘的暂存输出，`messages` 为收集的状态信息。
     """
 
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"未找到海平面数据文件: {file_path}")
+    txn = OutputTransaction()
+    with collect_messages() as messages, staging(txn):
+        res = branch()
+    res.staged = txn.detach()
+    res.messages = messages
+    return res
 
-    # 暂存每日/每周期数值
-    per_year_values: Dict[int, List[float]] = {}
-    candidate_values: List[float] = []
 
-    def parse_year(token: str) -> int | None:
-        # 尝试多格式：YYYY-MM-DD / YYYY/MM/DD / YYYY
-        token = token.strip()
-        if len(token) >= 4 and token[:4].isdigit():
-            try:
-                return int(token[:4])
-            except ValueError:
-                return None
-        return None
+def in_output_transaction(build: Callable[[], object]) -> Callable[[], object]:
+    """包装构建函数：其全部输出在同一事务中提交（失败则回滚，不留下半成品）。"""
 
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            line = raw.strip()
-            if not line or line.startswith("#"):
-                continue
-            # 逗号或空白分隔
-            parts = [p for p in line.replace("\t", " ").split(",") if p.strip()] if "," in line else [p for p in line.split() if p.strip()]
-            if not parts:
-                continue
-            year = parse_year(parts[0])
-            # 收集数值列（跳过非数值）
-            values: List[float] = []
-            for p in parts[1:]:
-                try:
-                    values.append(float(p))
-                except ValueError:
-                    # 可能是日期或文本，忽略
-                    continue
-            if not values:
-                continue
-            # 选择第一个数值作为海平面异常
-            val = values[0]
-            candidate_values.append(abs(val))
-            if year is not None:
-                per_year_values.setdefault(year, []).append(val)
-
-    # 单位自适应：若大多数值绝对值 < 20，则视为 cm -> 转 mm
-    to_mm_factor = 1.0
-    if candidate_values:
-        small_fraction = sum(1 for v in candidate_values if v < 20.0) / len(candidate_values)
-        if small_fraction > 0.8:
-            to_mm_factor = 10.0
-
-    records: List[AnnualSeaLevelRecord] = []
-    for year, vals in sorted(per_year_values.items()):
-        if not vals:
-            continue
-        avg_mm = sum(vals) / len(vals) * to_mm_factor
-        records.append(AnnualSeaLevelRecord(year=year, sea_level_mm=float(avg_mm)))
+    def wrapped() -> object:
+        with OutputTransaction():
+            return build()
+
+    return wrapped
 
-    return records
 
+# 全量模式的独立分支：彼此不共享状态，可在进程池中并行执行。
+BRANCHES = [
+    run_raw_metadata_branch,
+    run_lessons_branch,
+    run_climate_branch,
+    run_lesson12_smoothing_branch,
+    run_school_branch,
+]
 
-def generate_lesson15_csv(temp_records: List[AnnualTempRecord], sea_records: List[AnnualSeaLevelRecord]) -> str:
-    """生成第15课教学用 CSV：年份、温度异常/°C、海平面/mm。
 
-    合并策略：
-    - 以年份为键，将 GISTEMP 年度异常与 GMSL 年度平均按年份合并。
-    - 输出列为 [年份, 温度异常/°C, 海平面/mm]。
+def run_all(jobs: int = 1) -> None:
+    """全量模式：执行数据解析、加工与输出图像生成。
+
+    执行步骤（各分支互相独立）：
+    1. 写原始数据元数据与旁注
+    2. 课程规格（`lesson_specs()`）-> 第2/3/12/15/21课 CSV 与元数据
+    3. GISTEMP/CO₂ -> 第15/21课图像；GISTEMP/NGRIP/ITRDB -> 第12课平滑对比
+    4. 曹杨中学观测 -> 第1/4/5/6课 CSV
 
     Args:
-        temp_records: 年均温度异常记录列表。
-        sea_records: 年均海平面高度记录列表（mm）。
+        jobs: 并行进程数；大于 1 时各分支在进程池中并发执行，结果按分支声明顺序汇总。
+    """
 
-    Returns:
-        输出文件路径。
+    ensure_dirs()
+
+    if not os.path.exists(GISTEMP_CSV):
+        raise FileNotFoundError(f"未找到 GISTEMP 数据文件: {GISTEMP_CSV}")
+    if not os.path.exists(NOAA_CO2_MONTHLY_CSV):
+        raise FileNotFoundError(f"未找到 NOAA CO₂ 月度数据文件: {NOAA_CO2_MONTHLY_CSV}")
+
+    # 年度序列存储先在父进程中校验/构建，各分支（含子进程）只映射同一文件，不各自解析或复制
+    annual_store()
+
+    # 各分支只暂存输出；全部分支成功后在父进程中一次性原子替换，任一分支异常则整体回滚
+    results: List[BranchResult] = []
+    error: Exception | None = None
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(jobs, len(BRANCHES))) as pool:
+            futures = [pool.submit(run_branch_staged, branch) for branch in BRANCHES]
+            for f in futures:
+                try:
+                    results.append(f.result())
+                except Exception as e:
+                    error = error or e
+    else:
+        for branch in BRANCHES:
+            try:
+                results.append(run_branch_staged(branch))
+            except Exception as e:
+                error = e
+                break
+
+    txn = OutputTransaction()
+    for res in results:
+        for line in res.messages:
+            print(line)
+        txn.adopt(res.staged)
+    if error is not None:
+        txn.rollback()
+        raise error
+    txn.commit()
+
+    for res in results:
+        for w in res.warnings:
+            print(w)
+    print("生成完成：")
+    for res in results:
+        for line in res.summary:
+            print(line)
+
+
+def run_backup_gc(roots: List[str], keep: int, max_age_days: float, dry_run: bool = False) -> None:
+    """备份回收：导入遗留 `.bak-*` 文件、执行保留策略并回收无引用的备份对象。
+
+    Args:
+        roots: 扫描遗留备份文件的目录。
+        keep: 每个文件最多保留的备份份数。
+        max_age_days: 备份最长保留天数。
+        dry_run: 为 True 时仅统计，不修改文件。
     """
 
-    temp_map = {r.year: r.temp_anomaly_c for r in temp_records}
-    rows: List[List[float]] = []
-    for r in sea_records:
-        if r.year in temp_map:
-            rows.append([r.year, round(temp_map[r.year], 3), round(r.sea_level_mm, 2)])
+    report = BackupManager(keep_last=keep, max_age_days=max_age_days).gc(roots, dry_run=dry_run)
+    print("备份回收（仅统计）：" if dry_run else "备份回收完成：")
+    print(f"- 遗留 .bak-* 文件: {report.imported}")
+    print(f"- 按保留策略删除的引用: {report.refs_removed}")
+    print(f"- 回收的无引用对象: {report.objects_removed}")
+    print(f"- 释放空间: {report.bytes_freed / (1024 * 1024):.1f} MiB")
+
+
+def main(argv: List[str] | None = None) -> None:
+    """命令行入口：解析参数，执行全量生成或增量构建。"""
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="将原始数据加工为教学用 CSV、图像与元数据")
+    parser.add_argument("--incremental", action="store_true", help="增量构建：仅重建原始数据发生变化的派生资产")
+    parser.add_argument("--force", action="store_true", help="与 --incremental 搭配：忽略构建清单，全部重建")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N", help="全量模式下并行执行独立课程分支的进程数（默认 1）")
+    parser.add_argument("--no-parse-cache", action="store_true", help="禁用原始数据解析缓存（每次重新解析原始文本）")
+    parser.add_argument("--no-figure-cache", action="store_true", help="禁用示例图缓存（每次重新渲染 PNG）")
+    parser.add_argument("--render-jobs", type=int, default=1, metavar="N", help="全量模式下并行渲染示例图的进程数（默认 1）")
+    parser.add_argument("--mpl-backend", default="", metavar="NAME", help="matplotlib 渲染后端（默认 Agg）")
+    sub = parser.add_subparsers(dest="command")
+    gc_parser = sub.add_parser("gc", help="回收备份：导入遗留 .bak-* 文件并按保留策略清理 .cache/backups")
+    gc_parser.add_argument("roots", nargs="*", help="扫描遗留 .bak-* 文件的目录（默认：assets、data、gh-pages-worktree/assets 等）")
+    gc_parser.add_argument("--keep", type=int, default=DEFAULT_KEEP_LAST, metavar="N", help=f"每个文件最多保留的备份份数（默认 {DEFAULT_KEEP_LAST}）")
+    gc_parser.add_argument("--max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS, metavar="D", help=f"备份最长保留天数（默认 {DEFAULT_MAX_AGE_DAYS:g}）")
+    gc_parser.add_argument("--dry-run", action="store_true", help="仅统计将被清理的内容，不修改文件")
+    args = parser.parse_args(argv)
+
+    if args.command == "gc":
+        run_backup_gc(args.roots or DEFAULT_GC_ROOTS, keep=args.keep, max_age_days=args.max_age_days, dry_run=args.dry_run)
+        return
+
+    if args.no_parse_cache:
+        # 以环境变量传递，进程池子进程同样生效
+        os.environ["CG_NO_PARSE_CACHE"] = "1"
+    if args.no_figure_cache:
+        os.environ["CG_NO_FIGURE_CACHE"] = "1"
+    if args.render_jobs > 1:
+        os.environ["CG_RENDER_JOBS"] = str(args.render_jobs)
+    if args.mpl_backend:
+        os.environ["CG_MPL_BACKEND"] = args.mpl_backend
+
+    if args.incremental:
+        run_incremental(force=args.force)
+    else:
+        run_all(jobs=args.jobs)
+
 
-    out_path = os.path.join(ASSETS_DATA_DIR, "lesson-15-sample.csv")
-    write_csv(out_path, ["年份", "温度异常/°C", "海平面/mm"], rows)
-    return out_path
\ No newline at end of file
+if __name__ == "__main__":
+    main()
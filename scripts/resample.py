@@ -0,0 +1,235 @@
+"""学校逐时观测的日历重采样（逐时 -> 日 / 周 / 月）。
+
+第1/4课 CSV 将全部 8,500 余条逐时记录送到浏览器，而课件只展示趋势。本模块在列式观测表
+（`school_xls.SchoolTable`）上按日历分桶并聚合，生成各课的预聚合小表：
+
+- 分桶：`day`（自然日）、`week`（周一起始的自然周）、`month`（自然月，按当月实际天数）；
+- 聚合：`mean` / `min` / `max` / `sum`，风向用 `vector_mean`（单位向量平均，避免 350° 与 10°
+  平均成 180°）；
+- 缺测处理：每桶统计有效小时数 `hours`，低于桶长 × `min_coverage`（默认 75%）的桶聚合值置空，
+  不以残缺数据冒充全天/全月统计；观测表中完全缺失的小时同样计入缺测。
+
+全部聚合为向量化分组：时间去重排序后同桶记录连续，以 `np.bincount` / `np.*.reduceat` 计算。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+from lazy_imports import lazy_module
+from school_export import DEFAULT_ENV_LABEL
+from school_xls import SchoolTable, decimal64
+
+np = lazy_module("numpy")
+
+
+FREQUENCIES = ("day", "week", "month")
+AGGREGATES = ("mean", "min", "max", "sum", "vector_mean")
+DEFAULT_MIN_COVERAGE = 0.75
+
+MINUTES_PER_HOUR = 60
+MINUTES_PER_DAY = 24 * MINUTES_PER_HOUR
+# 1970-01-01 为周四，距其前一个周一 3 天
+_EPOCH_WEEKDAY = 3
+
+
+@dataclass
+class ResampledTable:
+    """重采样结果。
+
+    Attributes:
+        freq: 分桶粒度（`day`/`week`/`month`）。
+        bucket_min: int64 各桶起始时间（自 1970-01-01 起的分钟数）。
+        expected_hours: 各桶应有的小时数（桶长）。
+        hours: `{列名: 各桶有效小时数}`。
+        values: `{输出名: float64 聚合值}`，覆盖率不足的桶为 NaN。
+    """
+
+    freq: str
+    bucket_min: np.ndarray
+    expected_hours: np.ndarray
+    hours: Dict[str, np.ndarray] = field(default_factory=dict)
+    values: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return int(self.bucket_min.size)
+
+    def labels(self) -> List[str]:
+        """桶标签：日/周为 `YYYY-MM-DD`（周为周一日期），月为 `YYYY-MM`。"""
+
+        unit = "M" if self.freq == "month" else "D"
+        stamps = self.bucket_min.astype("datetime64[m]").astype(f"datetime64[{unit}]")
+        return np.datetime_as_string(stamps, unit=unit).tolist()
+
+
+def bucket_bounds(time_min: np.ndarray, freq: str) -> Tuple[np.ndarray, np.ndarray]:
+    """计算每个时间点所在日历桶的起止时间（分钟数，左闭右开）。
+
+    Args:
+        time_min: int64 时间（分钟数）。
+        freq: 分桶粒度。
+
+    Returns:
+        `(起始, 结束)` 两个 int64 数组。
+
+    Raises:
+        ValueError: 未知的分桶粒度。
+    """
+
+    days = np.floor_divide(np.asarray(time_min, dtype=np.int64), MINUTES_PER_DAY)
+    if freq == "day":
+        start_day, end_day = days, days + 1
+    elif freq == "week":
+        start_day = days - (days + _EPOCH_WEEKDAY) % 7
+        end_day = start_day + 7
+    elif freq == "month":
+        months = days.astype("datetime64[D]").astype("datetime64[M]")
+        start_day = months.astype("datetime64[D]").astype(np.int64)
+        end_day = (months + 1).astype("datetime64[D]").astype(np.int64)
+    else:
+        raise ValueError(f"未知的分桶粒度：{freq}（可选 {', '.join(FREQUENCIES)}）")
+    return start_day * MINUTES_PER_DAY, end_day * MINUTES_PER_DAY
+
+
+def resample(
+    table: SchoolTable,
+    freq: str,
+    aggregates: Sequence[Tuple[str, str, str]],
+    min_coverage: float = DEFAULT_MIN_COVERAGE,
+) -> ResampledTable:
+    """按日历分桶聚合观测表。
+
+    同一时刻的重复记录只计首条；每列独立统计有效小时数与覆盖率。
+
+    Args:
+        table: 逐时观测列式表。
+        freq: 分桶粒度（`day`/`week`/`month`）。
+        aggregates: `(输出名, 观测列, 聚合方式)` 列表，聚合方式见 `AGGREGATES`。
+        min_coverage: 最低覆盖率（有效小时数 / 桶长），不足时聚合值为 NaN；为 0 时不限。
+
+    Returns:
+        重采样结果（仅含有观测的桶，按时间升序）。
+
+    Raises:
+        ValueError: 未知的分桶粒度或聚合方式。
+    """
+
+    for _, _, how in aggregates:
+        if how not in AGGREGATES:
+            raise ValueError(f"未知的聚合方式：{how}（可选 {', '.join(AGGREGATES)}）")
+
+    times, first = np.unique(np.asarray(table.time_min, dtype=np.int64), return_index=True)
+    start, end = bucket_bounds(times, freq)
+    buckets, bucket_of = np.unique(start, return_inverse=True)
+    bucket_end = np.zeros(buckets.size, dtype=np.int64)
+    bucket_end[bucket_of] = end
+    expected = (bucket_end - buckets) // MINUTES_PER_HOUR
+    # times 已升序，同桶记录连续；reduceat 以各桶首行为分段起点
+    seg = np.flatnonzero(np.r_[True, np.diff(bucket_of) != 0])
+
+    out = ResampledTable(freq, buckets, expected)
+    cache: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    for name, column, how in aggregates:
+        if column not in cache:
+            raw = decimal64(table.columns[column])[first]
+            valid = ~np.isnan(raw)
+            cache[column] = (raw, valid)
+            out.hours[column] = np.bincount(bucket_of, weights=valid, minlength=buckets.size).astype(np.int64)
+        raw, valid = cache[column]
+        n = out.hours[column]
+        filled = np.where(valid, raw, 0.0)
+
+        if how in ("mean", "sum"):
+            total = np.bincount(bucket_of, weights=filled, minlength=buckets.size)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result = total / n if how == "mean" else total
+        elif how == "min":
+            result = np.minimum.reduceat(np.where(valid, raw, np.inf), seg)
+        elif how == "max":
+            result = np.maximum.reduceat(np.where(valid, raw, -np.inf), seg)
+        else:
+            rad = np.deg2rad(filled)
+            sx = np.bincount(bucket_of, weights=np.where(valid, np.sin(rad), 0.0), minlength=buckets.size)
+            cx = np.bincount(bucket_of, weights=np.where(valid, np.cos(rad), 0.0), minlength=buckets.size)
+            # 先舍去浮点尾差再取模，避免正北方向得到 360.0 或 -0.0
+            result = np.mod(np.round(np.rad2deg(np.arctan2(sx, cx)), 9), 360.0) + 0.0
+
+        result = np.asarray(result, dtype=np.float64)
+        result[(n == 0) | (n < expected * min_coverage)] = np.nan
+        out.values[name] = result
+    return out
+
+
+def format_values(values: np.ndarray, fmt: str) -> List[str]:
+    """按 `%` 格式格式化数值列，NaN 输出为空串。"""
+
+    return ["" if v != v else fmt % v for v in values.tolist()]
+
+
+# 各课预聚合表：课号 -> [(输出文件名, 粒度, [(输出名, 观测列, 聚合方式, 格式)])]
+LESSON_RESAMPLES: Dict[str, List[Tuple[str, str, List[Tuple[str, str, str, str]]]]] = {
+    "01": [
+        ("lesson-01-daily.csv", "day", [
+            ("temp_mean_c", "temp_c", "mean", "%.1f"),
+            ("temp_min_c", "temp_c", "min", "%.1f"),
+            ("temp_max_c", "temp_c", "max", "%.1f"),
+        ]),
+    ],
+    "04": [
+        ("lesson-04-daily.csv", "day", [
+            ("temp_mean_c", "temp_c", "mean", "%.1f"),
+            ("temp_min_c", "temp_c", "min", "%.1f"),
+            ("temp_max_c", "temp_c", "max", "%.1f"),
+        ]),
+    ],
+    "05": [
+        ("lesson-05-daily.csv", "day", [
+            ("wind_dir_mean_deg", "wind_dir_deg", "vector_mean", "%.1f"),
+            ("wind_speed_mean_ms", "wind_speed_ms", "mean", "%.2f"),
+            ("wind_speed_max_ms", "wind_speed_ms", "max", "%.2f"),
+        ]),
+    ],
+    "06": [
+        ("lesson-06-daily.csv", "day", [("rain_mm", "rain_hour_mm", "sum", "%.1f")]),
+        ("lesson-06-monthly.csv", "month", [("rain_mm", "rain_hour_mm", "sum", "%.1f")]),
+    ],
+}
+
+
+def lesson_aggregate_tables(
+    table: SchoolTable,
+    lessons: Sequence[str] = tuple(LESSON_RESAMPLES),
+    env_label: str = DEFAULT_ENV_LABEL,
+    min_coverage: float = DEFAULT_MIN_COVERAGE,
+) -> Dict[str, Tuple[List[str], List[List[str]]]]:
+    """生成各课预聚合表。
+
+    每表列为：桶标签（`date` 或 `month`）、各聚合值，以及所用观测列的有效小时数
+    `hours`（多列时为最小值）；第4课在日期后附环境类型列。
+
+    Args:
+        table: 逐时观测列式表。
+        lessons: 课号。
+        env_label: 第4课环境类型标注。
+        min_coverage: 最低覆盖率（见 `resample`）。
+
+    Returns:
+        `{输出文件名: (表头, 行)}`。
+    """
+
+    tables: Dict[str, Tuple[List[str], List[List[str]]]] = {}
+    for lesson in lessons:
+        for filename, freq, spec in LESSON_RESAMPLES[lesson]:
+            res = resample(table, freq, [(name, col, how) for name, col, how, _ in spec], min_coverage)
+            hours = np.min(np.vstack([res.hours[col] for _, col, _, _ in spec]), axis=0)
+            header = ["month" if freq == "month" else "date"]
+            columns = [res.labels()]
+            if lesson == "04":
+                header.append("env")
+                columns.append([env_label] * len(res))
+            header += [name for name, _, _, _ in spec] + ["hours"]
+            columns += [format_values(res.values[name], fmt) for name, _, _, fmt in spec]
+            columns.append([str(h) for h in hours.tolist()])
+            tables[filename] = (header, [list(row) for row in zip(*columns)])
+    return tables
@@ -0,0 +1,210 @@
+"""第1/4/5/6课学校观测 CSV 的单遍融合导出。
+
+四课 CSV 均由同一份逐时观测派生，此前各自遍历全表、逐行以 f-string 格式化并经
+`csv.writer` 逐行写出。`render_school_lessons` 对列式表只扫描一次：
+
+- 每个观测列只还原一次十进制读数（`decimal64`）、只计算一次有效掩码；时间字符串只生成一次；
+- 第1课与第4课共用同一份气温格式化结果；第6课累计雨量为向量化 `np.cumsum`；
+- 每课以整行模板（如 `"%s,%.1f\\r\\n"`）一次格式化一行、`"".join` 拼成完整文件后一次写出。
+
+输出与 `csv.writer`（默认方言，`\\r\\n` 行尾）逐字节一致；若某字段含逗号、引号或换行等
+需要加引号的字符，则该课回退为 `csv.writer` 写出。
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+from chart_payload import ChartPayload, PayloadColumn
+from lazy_imports import lazy_module
+from school_xls import SchoolTable, decimal64
+
+np = lazy_module("numpy")
+
+
+# 课号 -> (输出文件名, 表头)
+SCHOOL_LESSONS = {
+    "01": ("lesson-01-sample.csv", ["time", "temp_c"]),
+    "04": ("lesson-04-sample.csv", ["time", "env", "temp_c"]),
+    "05": ("lesson-05-sample.csv", ["time", "wind_dir_deg", "wind_speed_ms"]),
+    "06": ("lesson-06-sample.csv", ["time", "rain_mm_per_h", "cum_mm"]),
+}
+
+# 课号 -> 所需观测列
+LESSON_COLUMNS = {
+    "01": ("temp_c",),
+    "04": ("temp_c",),
+    "05": ("wind_dir_deg", "wind_speed_ms"),
+    "06": ("rain_hour_mm",),
+}
+
+# 课号 -> (图表纵轴观测列, 降采样方法)，见 `downsample`
+LESSON_CHART_SERIES = {
+    "01": ("temp_c", "lttb"),
+    "04": ("temp_c", "lttb"),
+    "05": ("wind_speed_ms", "minmax"),
+    "06": ("rain_hour_mm", "minmax"),
+}
+
+# CSV 列名 -> 单位（图表载荷头部）
+COLUMN_UNITS = {
+    "temp_c": "°C",
+    "wind_dir_deg": "°",
+    "wind_speed_ms": "m/s",
+    "rain_mm_per_h": "mm/h",
+    "cum_mm": "mm",
+}
+
+DEFAULT_ENV_LABEL = "校园室外"
+_QUOTE_CHARS = (",", '"', "\r", "\n")
+
+
+def _needs_quoting(values: Iterable[str]) -> bool:
+    return any(ch in v for v in values for ch in _QUOTE_CHARS)
+
+
+def lesson_row_mask(table: SchoolTable, lesson: str) -> np.ndarray:
+    """返回该课 CSV 保留的行掩码（所需观测列均非 NaN）。"""
+
+    return np.logical_and.reduce([~np.isnan(table.columns[n]) for n in LESSON_COLUMNS[lesson]])
+
+
+def lesson_chart_series(table: SchoolTable, lesson: str) -> Tuple[np.ndarray, np.ndarray]:
+    """返回该课 CSV 各数据行的 `(时间分钟数, 图表纵轴值)`，与 CSV 行一一对应。"""
+
+    ok = lesson_row_mask(table, lesson)
+    return table.time_min[ok], table.columns[LESSON_CHART_SERIES[lesson][0]][ok]
+
+
+def render_csv(header: Sequence[str], template: str, rows: Iterable[Tuple]) -> bytes:
+    """以整行模板批量渲染 CSV（UTF-8，`\\r\\n` 行尾）。
+
+    Args:
+        header: 列名。
+        template: 一行的 `%` 格式模板（含行尾），如 `"%s,%.1f\\r\\n"`。
+        rows: 每行的值元组。
+
+    Returns:
+        完整文件内容。
+    """
+
+    body = "".join(map(template.__mod__, rows))
+    return (",".join(header) + "\r\n" + body).encode("utf-8")
+
+
+def _render_with_writer(header: Sequence[str], formats: Sequence[str], rows: Iterable[Tuple]) -> bytes:
+    buf = io.StringIO(newline="")
+    w = csv.writer(buf)
+    w.writerow(header)
+    w.writerows([fmt % v for fmt, v in zip(formats, row)] for row in rows)
+    return buf.getvalue().encode("utf-8")
+
+
+def render_school_lessons(
+    table: SchoolTable,
+    lessons: Sequence[str] = tuple(SCHOOL_LESSONS),
+    env_label: str = DEFAULT_ENV_LABEL,
+) -> Dict[str, bytes]:
+    """单遍扫描观测表，渲染所选各课 CSV 内容。
+
+    各课只保留其所需观测列均有效（非 NaN）的行，行序同观测表；第6课累计雨量为顺序累加的
+    小时雨量（负值按 0 计）。
+
+    Args:
+        table: 逐时观测列式表（须含所选各课所需的列，见 `LESSON_COLUMNS`）。
+        lessons: 课号（`01`/`04`/`05`/`06`）。
+        env_label: 第4课环境类型标注。
+
+    Returns:
+        `{课号: CSV 字节}`。
+
+    Raises:
+        KeyError: 未知课号，或观测表缺少所需列。
+    """
+
+    needed = sorted({name for lesson in lessons for name in LESSON_COLUMNS[lesson]})
+    values = {name: decimal64(table.columns[name]) for name in needed}
+    valid = {name: ~np.isnan(v) for name, v in values.items()}
+    times = table.time_strings()
+
+    def select(lesson: str) -> Tuple[List[str], List[np.ndarray]]:
+        names = LESSON_COLUMNS[lesson]
+        ok = np.logical_and.reduce([valid[n] for n in names])  # 同 `lesson_row_mask`
+        return times[ok].tolist(), [values[n][ok] for n in names]
+
+    out: Dict[str, bytes] = {}
+    temp_rows: Tuple[List[str], List[str]] | None = None
+    for lesson in lessons:
+        header = SCHOOL_LESSONS[lesson][1]
+        if lesson in ("01", "04"):
+            if temp_rows is None:
+                t, (temp,) = select(lesson)
+                temp_rows = (t, list(map("%.1f".__mod__, temp.tolist())))
+            t, temp_text = temp_rows
+            if lesson == "01":
+                formats, rows, plain = ["%s", "%s"], zip(t, temp_text), [t]
+            else:
+                formats, rows, plain = ["%s", "%s", "%s"], zip(t, [env_label] * len(t), temp_text), [t, [env_label]]
+        elif lesson == "05":
+            t, (d, sp) = select(lesson)
+            formats, rows, plain = ["%s", "%.1f", "%.2f"], zip(t, d.tolist(), sp.tolist()), [t]
+        elif lesson == "06":
+            t, (rain,) = select(lesson)
+            # np.cumsum 按顺序逐项累加，与逐行 `cum += max(val, 0)` 结果一致
+            cum = np.cumsum(np.maximum(rain, 0.0))
+            formats, rows, plain = ["%s", "%.2f", "%.2f"], zip(t, rain.tolist(), cum.tolist()), [t]
+        else:
+            raise KeyError(f"未知课号：{lesson}")
+
+        if any(_needs_quoting(col) for col in plain):
+            out[lesson] = _render_with_writer(header, formats, rows)
+        else:
+            out[lesson] = render_csv(header, ",".join(formats) + "\r\n", rows)
+    return out
+
+
+def school_lesson_payloads(
+    table: SchoolTable,
+    lessons: Sequence[str] = tuple(SCHOOL_LESSONS),
+    env_label: str = DEFAULT_ENV_LABEL,
+) -> Dict[str, ChartPayload]:
+    """构造各课的图表二进制载荷（见 `chart_payload`），行集合与对应 CSV 相同。
+
+    数值列为原始 float32 读数；第6课累计雨量按时间升序累加（CSV 中为工作簿行序累加），
+    使图表上的累计曲线单调不减。第4课环境类型记为常量列。
+
+    Args:
+        table: 逐时观测列式表。
+        lessons: 课号。
+        env_label: 第4课环境类型标注。
+
+    Returns:
+        `{课号: 载荷}`。
+    """
+
+    payloads: Dict[str, ChartPayload] = {}
+    for lesson in lessons:
+        filename, header = SCHOOL_LESSONS[lesson]
+        ok = lesson_row_mask(table, lesson)
+        t = table.time_min[ok]
+        if lesson == "06":
+            rain = table.columns["rain_hour_mm"][ok]
+            order = np.argsort(t, kind="stable")
+            cum = np.empty(rain.size, dtype=np.float64)
+            cum[order] = np.cumsum(np.maximum(decimal64(rain)[order], 0.0))
+            values = {"rain_mm_per_h": rain, "cum_mm": cum}
+        else:
+            values = {name: table.columns[name][ok] for name in LESSON_COLUMNS[lesson]}
+        names = [h for h in header if h in values]
+        payloads[lesson] = ChartPayload(
+            name=os.path.splitext(filename)[0],
+            time_min=t,
+            columns=[PayloadColumn(n, values[n], "float32", COLUMN_UNITS.get(n)) for n in names],
+            constants={"env": env_label} if lesson == "04" else {},
+            source=filename,
+        )
+    return payloads
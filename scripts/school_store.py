@@ -0,0 +1,351 @@
+"""学校逐时观测的持久化列式存储（按年月分区，支持增量追加）。
+
+此前每次运行都要重新解码 `data/data/曹杨中学` 下的全部 `.xls` 工作簿，而通常只有最新一个月
+是新增的。`SchoolStore` 将解码结果按列落盘于 `.cache/school-store/<站点>/`：
+
+- `<YYYY-MM>/<工作簿名>/<列名>.npy`：一个分区片段，对应一个月度工作簿，每列一个 `.npy`
+  （`time_min` 为 int64 分钟数，观测列为 float32），行序与工作簿一致；
+- `manifest.json`：分区清单，记录来源工作簿的 (大小, mtime_ns)、行数与时间范围（min/max）。
+
+月度工作簿末尾通常含下月首日的记录，因此分区以工作簿所属年月（文件名 `syYYYYMM`）
+为键，谓词下推依据清单中的实际时间范围判断，而非分区名。
+
+环境无 Parquet/Arrow 依赖，故以每列一个 `.npy`（`np.load(mmap_mode="r")`）实现同样的
+列投影与分区裁剪：
+
+- `sync()`：仅解码新增或 (大小, mtime_ns) 变化的工作簿并原子替换其分区，来源已删除的
+  分区随之移除；新增一个月的开销只与该月数据量相关；
+- `read(columns, start, end)`：只打开所需列文件、跳过时间范围不相交的分区，拼接为 `SchoolTable`。
+
+命令行：`python scripts/school_store.py [--rebuild] [--jobs N] [目录]` 同步存储并输出分区概况。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from lazy_imports import lazy_module
+from school_xls import SCHOOL_COLUMNS, SchoolTable, decode_workbooks, list_workbooks
+
+np = lazy_module("numpy")
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STORE_ROOT = os.path.join(BASE_DIR, ".cache", "school-store")
+STORE_VERSION = 1
+
+TIME_COLUMN = "time_min"
+MANIFEST_NAME = "manifest.json"
+WORKBOOK_MONTH_RE = re.compile(r"(?P<year>\d{4})(?P<month>\d{2})")
+
+
+@dataclass
+class Partition:
+    """一个分区片段（对应一个月度工作簿）。
+
+    Attributes:
+        month: 分区年月（`YYYY-MM`）。
+        source: 来源工作簿文件名。
+        size: 来源文件大小（字节）。
+        mtime_ns: 来源文件修改时间。
+        rows: 行数。
+        min_time: 最早观测时间（分钟数）；空分区为 None。
+        max_time: 最晚观测时间（分钟数）；空分区为 None。
+    """
+
+    month: str
+    source: str
+    size: int
+    mtime_ns: int
+    rows: int
+    min_time: Optional[int] = None
+    max_time: Optional[int] = None
+
+    @property
+    def relpath(self) -> str:
+        """分区片段相对存储目录的路径。"""
+
+        return os.path.join(self.month, os.path.splitext(self.source)[0])
+
+    def overlaps(self, start: Optional[int], end: Optional[int]) -> bool:
+        """判断分区时间范围是否与 `[start, end)` 相交。"""
+
+        if self.min_time is None or self.max_time is None:
+            return False
+        if start is not None and self.max_time < start:
+            return False
+        if end is not None and self.min_time >= end:
+            return False
+        return True
+
+
+@dataclass
+class SyncReport:
+    """`sync` 的执行结果。
+
+    Attributes:
+        ingested: 新解码并写入的工作簿。
+        removed: 因来源删除而移除的分区。
+        unchanged: 未变化而跳过的工作簿数。
+        rows: 新写入的行数。
+        seconds: 墙钟耗时（秒）。
+    """
+
+    ingested: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+
+    def describe(self) -> str:
+        """返回一行中文统计摘要。"""
+
+        return (
+            f"新增/更新 {len(self.ingested)} 个工作簿（{self.rows} 行），移除 {len(self.removed)} 个分区，"
+            f"跳过 {self.unchanged} 个未变化工作簿，{self.seconds:.2f} 秒"
+        )
+
+
+def workbook_month(path: str, time_min: Optional[np.ndarray] = None) -> str:
+    """确定工作簿所属年月：优先取文件名中的 `YYYYMM`，否则取观测时间的众数月份。"""
+
+    m = WORKBOOK_MONTH_RE.search(os.path.basename(path))
+    if m and 1 <= int(m.group("month")) <= 12:
+        return f"{m.group('year')}-{m.group('month')}"
+    if time_min is not None and time_min.size:
+        months, counts = np.unique(time_min.astype("datetime64[m]").astype("datetime64[M]"), return_counts=True)
+        return str(months[int(np.argmax(counts))])
+    return "unknown"
+
+
+def to_minutes(value) -> Optional[int]:
+    """将时间（`'YYYY-MM-DD[ HH:MM]'` 字符串、`datetime64` 或分钟数）转为自 1970 年起的分钟数。"""
+
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    text = str(value).strip().replace(" ", "T") if isinstance(value, str) else value
+    return int(np.datetime64(text, "m").astype(np.int64))
+
+
+class SchoolStore:
+    """单个站点的分区列式存储。"""
+
+    def __init__(self, store_dir: str, station: str = "") -> None:
+        """打开（或新建）存储目录并加载分区清单；清单版本或列集合不符时视为空存储。
+
+        Args:
+            store_dir: 存储目录（如 `.cache/school-store/曹杨中学`）。
+            station: 站点名；缺省为目录名。
+        """
+
+        self.store_dir = store_dir
+        self.station = station or os.path.basename(os.path.normpath(store_dir))
+        self.partitions: Dict[str, Partition] = self._load_manifest()
+
+    @classmethod
+    def for_source(cls, source_dir: str, root: str = DEFAULT_STORE_ROOT) -> "SchoolStore":
+        """返回与站点数据目录对应的存储（站点名取目录名）。"""
+
+        station = os.path.basename(os.path.normpath(source_dir))
+        return cls(os.path.join(root, station), station)
+
+    # ---------- 清单 ----------
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.store_dir, MANIFEST_NAME)
+
+    def _load_manifest(self) -> Dict[str, Partition]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != STORE_VERSION or data.get("columns") != list(SCHOOL_COLUMNS):
+            return {}
+        try:
+            return {p["source"]: Partition(**p) for p in data.get("partitions", [])}
+        except TypeError:
+            return {}
+
+    def _save_manifest(self) -> None:
+        os.makedirs(self.store_dir, exist_ok=True)
+        data = {
+            "version": STORE_VERSION,
+            "station": self.station,
+            "columns": list(SCHOOL_COLUMNS),
+            "partitions": [p.__dict__ for p in self.ordered()],
+        }
+        tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.manifest_path)
+
+    def ordered(self) -> List[Partition]:
+        """按 (年月, 工作簿名) 排列的分区（即原始工作簿的文件名顺序）。"""
+
+        return sorted(self.partitions.values(), key=lambda p: (p.month, p.source))
+
+    # ---------- 写入 ----------
+
+    def _write_partition(self, part: Partition, time_min: np.ndarray, columns: Dict[str, np.ndarray]) -> None:
+        """先写入同级临时目录再整体替换，读者不会看到写到一半的分区。"""
+
+        final = os.path.join(self.store_dir, part.relpath)
+        tmp = f"{final}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, TIME_COLUMN + ".npy"), np.ascontiguousarray(time_min, dtype=np.int64))
+        for name in SCHOOL_COLUMNS:
+            np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(columns[name], dtype=np.float32))
+        self._drop_dir(final)
+        os.replace(tmp, final)
+
+    def _drop_dir(self, path: str) -> None:
+        if os.path.isdir(path):
+            trash = f"{path}.old-{os.getpid()}"
+            os.replace(path, trash)
+            shutil.rmtree(trash, ignore_errors=True)
+        parent = os.path.dirname(path)
+        if parent != self.store_dir and os.path.isdir(parent) and not os.listdir(parent):
+            os.rmdir(parent)
+
+    def sync(self, source_dir: str, workers: Optional[int] = None, rebuild: bool = False) -> SyncReport:
+        """将数据目录中新增或变化的工作簿追加入存储。
+
+        Args:
+            source_dir: 站点数据目录。
+            workers: 并行解码进程数（见 `school_xls.decode_workbooks`）。
+            rebuild: 为 True 时忽略现有分区，全部重新解码。
+
+        Returns:
+            同步结果汇总。
+        """
+
+        start = time.perf_counter()
+        report = SyncReport()
+        stats = {os.path.basename(p): (p, os.stat(p)) for p in list_workbooks(source_dir)}
+
+        for source in sorted(set(self.partitions) - set(stats)):
+            part = self.partitions.pop(source)
+            self._drop_dir(os.path.join(self.store_dir, part.relpath))
+            report.removed.append(part.relpath)
+
+        pending: List[str] = []
+        for source, (path, st) in stats.items():
+            part = self.partitions.get(source)
+            if not rebuild and part and part.size == st.st_size and part.mtime_ns == st.st_mtime_ns:
+                report.unchanged += 1
+            else:
+                pending.append(path)
+
+        for path, (time_min, columns) in decode_workbooks(pending, workers=workers):
+            source = os.path.basename(path)
+            st = stats[source][1]
+            part = Partition(
+                month=workbook_month(path, time_min),
+                source=source,
+                size=st.st_size,
+                mtime_ns=st.st_mtime_ns,
+                rows=int(time_min.size),
+                min_time=int(time_min.min()) if time_min.size else None,
+                max_time=int(time_min.max()) if time_min.size else None,
+            )
+            previous = self.partitions.get(source)
+            if previous is not None and previous.relpath != part.relpath:
+                self._drop_dir(os.path.join(self.store_dir, previous.relpath))
+            self._write_partition(part, time_min, columns)
+            self.partitions[source] = part
+            report.ingested.append(source)
+            report.rows += part.rows
+
+        if report.ingested or report.removed or not os.path.exists(self.manifest_path):
+            self._save_manifest()
+        report.seconds = time.perf_counter() - start
+        return report
+
+    # ---------- 读取 ----------
+
+    def read(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        start=None,
+        end=None,
+    ) -> SchoolTable:
+        """按列投影与时间范围读取观测表。
+
+        Args:
+            columns: 所需观测列（见 `SCHOOL_COLUMNS`）；缺省为全部列。
+            start: 起始时间（含），见 `to_minutes`；缺省不限。
+            end: 结束时间（不含）；缺省不限。
+
+        Returns:
+            仅含所选列的 `SchoolTable`（行序同原始工作簿）。
+
+        Raises:
+            KeyError: 请求了未知的列名。
+        """
+
+        names = list(SCHOOL_COLUMNS) if columns is None else list(columns)
+        unknown = [n for n in names if n not in SCHOOL_COLUMNS]
+        if unknown:
+            raise KeyError(f"未知的观测列：{', '.join(unknown)}")
+        lo, hi = to_minutes(start), to_minutes(end)
+
+        times: List[np.ndarray] = []
+        parts: Dict[str, List[np.ndarray]] = {n: [] for n in names}
+        for part in self.ordered():
+            if not part.overlaps(lo, hi):
+                continue
+            base = os.path.join(self.store_dir, part.relpath)
+            t = np.load(os.path.join(base, TIME_COLUMN + ".npy"), mmap_mode="r")
+            keep = None
+            if (lo is not None and part.min_time < lo) or (hi is not None and part.max_time >= hi):
+                keep = np.ones(t.size, dtype=bool)
+                if lo is not None:
+                    keep &= t >= lo
+                if hi is not None:
+                    keep &= t < hi
+            times.append(np.array(t if keep is None else t[keep]))
+            for n in names:
+                col = np.load(os.path.join(base, n + ".npy"), mmap_mode="r")
+                parts[n].append(np.array(col if keep is None else col[keep]))
+
+        time_min = np.concatenate(times) if times else np.empty(0, dtype=np.int64)
+        return SchoolTable(
+            time_min=time_min,
+            columns={n: np.concatenate(v) if v else np.empty(0, dtype=np.float32) for n, v in parts.items()},
+            station_codes=np.zeros(time_min.size, dtype=np.uint16),
+            station_labels=[self.station],
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """命令行入口：同步站点数据目录到列式存储并输出分区概况。"""
+
+    import argparse
+
+    default_dir = os.path.join(BASE_DIR, "data", "data", "曹杨中学")
+    parser = argparse.ArgumentParser(description="同步学校逐时观测列式存储")
+    parser.add_argument("source_dir", nargs="?", default=default_dir, help="站点数据目录（默认曹杨中学）")
+    parser.add_argument("--rebuild", action="store_true", help="忽略现有分区，全部重新解码")
+    parser.add_argument("--jobs", type=int, default=None, metavar="N", help="并行解码进程数")
+    args = parser.parse_args(argv)
+
+    store = SchoolStore.for_source(args.source_dir)
+    report = store.sync(args.source_dir, workers=args.jobs, rebuild=args.rebuild)
+    print(f"同步：{report.describe()}")
+    for part in store.ordered():
+        print(f"{part.relpath}  {part.rows} 行")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""学校自动气象站逐时观测（`sy*.xls` 月度工作簿）的列式加载器。
+
+每个工作簿只按列读取所需字段（`sheet.col_values`），每列一次性向量化转换：
+
+- 观测时间 -> int64 “自 1970-01-01 起的分钟数”（`datetime64[m]`）；
+- 气温 / 风速 / 小时雨量 -> float32，缺失（空串、`-`、`NaN`）为 NaN；
+- 瞬时风向（如 `ESE (114)`）-> 取括号内角度后同上转换。
+
+个别无法向量化解析的单元格（如带注记的数值）回退到逐格正则提取，结果与逐格
+解析一致。多个工作簿在进程池中并行解码（xlrd 为纯 Python 实现，受 GIL 限制），
+每个工作簿仅返回紧凑数组，逐时记录约 24 字节/行，可容纳多站点、多年份的数据。
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+xlrd = lazy_module("xlrd")
+
+
+# 输出列名 -> 工作簿表头前缀
+SCHOOL_COLUMNS = {
+    "temp_c": "气温(℃)",
+    "wind_dir_deg": "瞬时风向(°)",
+    "wind_speed_ms": "瞬时风速(m/s)",
+    "rain_hour_mm": "小时雨量(mm)",
+}
+TIME_HEADER = "观测时间"
+MISSING_TOKENS = ("", "-", "NaN")
+DEGREE_COLUMNS = ("wind_dir_deg",)
+
+
+def _extract_degree(text: str | float | int) -> float | None:
+    """从类似 'ESE (123)' 文本中提取角度数值。
+
+    支持直接数值或包含括号的方位文本；失败返回 None。
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    s = str(text)
+    m = re.search(r"(\d+(?:\.\d+)?)", s)
+    return float(m.group(1)) if m else None
+
+
+def _to_float(val: str | float | int) -> float | None:
+    """尽可能将值转换为浮点数；失败返回 None。"""
+    if isinstance(val, (int, float)):
+        return float(val)
+    if val is None:
+        return None
+    s = str(val).strip()
+    if s in ("", "-", "NaN"):
+        return None
+    try:
+        return float(s)
+    except Exception:
+        m = re.search(r"(\d+(?:\.\d+)?)", s)
+        return float(m.group(1)) if m else None
+
+
+def _column_to_float32(values: Sequence, degree: bool = False) -> np.ndarray:
+    """将一列单元格向量化转换为 float32（缺失为 NaN）。
+
+    先按字符串数组整体解析；含非数值单元格时回退为逐格解析（与 `_to_float` /
+    `_extract_degree` 语义一致）。
+
+    Args:
+        values: 单元格值序列（字符串或数值）。
+        degree: 是否为方位文本列（取括号内角度）。
+
+    Returns:
+        float32 数组。
+    """
+
+    if len(values) == 0:
+        return np.empty(0, dtype=np.float32)
+    arr = np.char.strip(np.asarray([str(v) for v in values], dtype=str))
+    if degree:
+        # 'ESE (114)' -> '114'；纯数值保持不变
+        _, sep, tail = np.char.partition(arr, "(").T
+        arr = np.where(sep == "(", np.char.strip(np.char.rstrip(tail, ")")), arr)
+    missing = np.isin(arr, MISSING_TOKENS)
+    arr = np.where(missing, "nan", arr)
+    try:
+        return arr.astype(np.float64).astype(np.float32)
+    except ValueError:
+        convert = _extract_degree if degree else _to_float
+        out = [convert(v) for v in values]
+        return np.array([np.nan if v is None else v for v in out], dtype=np.float32)
+
+
+def decimal64(values: np.ndarray) -> np.ndarray:
+    """将 float32 观测值还原为原始十进制读数对应的 float64。
+
+    float32 转 float64 会带入表示误差（如 0.1 -> 0.10000000149），逐项累加后可能影响
+    末位舍入。观测读数最多 7 位有效数字，float32 的最短往返十进制表示即原始读数，
+    据此还原后与直接解析文本得到的 float64 完全一致。
+    """
+
+    return np.asarray(values, dtype=np.float32).astype(str).astype(np.float64)
+
+
+@dataclass
+class SchoolTable:
+    """逐时观测列式表。
+
+    Attributes:
+        time_min: int64 观测时间（自 1970-01-01 00:00 起的分钟数），保持工作簿行序。
+        columns: `{列名: float32 数组}`，列名见 `SCHOOL_COLUMNS`，缺失为 NaN；按列投影读取时仅含所选列。
+        station_codes: uint16 站点编码（每行）。
+        station_labels: 站点编码 -> 站点名。
+    """
+
+    time_min: np.ndarray
+    columns: Dict[str, np.ndarray]
+    station_codes: np.ndarray
+    station_labels: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return int(self.time_min.size)
+
+    def time_strings(self) -> np.ndarray:
+        """返回 `YYYY-MM-DD HH:MM` 形式的时间字符串数组。"""
+
+        text = np.datetime_as_string(self.time_min.astype("datetime64[m]"), unit="m")
+        return np.char.replace(text, "T", " ")
+
+    @classmethod
+    def concat(cls, tables: Sequence["SchoolTable"]) -> "SchoolTable":
+        """按顺序拼接多个表（站点标签合并重编码）。"""
+
+        labels: List[str] = []
+        codes: List[np.ndarray] = []
+        for t in tables:
+            remap = np.array([_label_index(labels, lab) for lab in t.station_labels], dtype=np.uint16)
+            codes.append(remap[t.station_codes])
+        return cls(
+            time_min=np.concatenate([t.time_min for t in tables]) if tables else np.empty(0, np.int64),
+            columns={
+                name: np.concatenate([t.columns[name] for t in tables]) if tables else np.empty(0, np.float32)
+                for name in SCHOOL_COLUMNS
+            },
+            station_codes=np.concatenate(codes) if codes else np.empty(0, np.uint16),
+            station_labels=labels,
+        )
+
+
+def _label_index(labels: List[str], label: str) -> int:
+    if label not in labels:
+        labels.append(label)
+    return labels.index(label)
+
+
+def read_school_workbook(path: str) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """解码单个月度工作簿为列数组。
+
+    仅保留观测时间为非空字符串的行（与逐行读取时的过滤规则一致）。
+
+    Args:
+        path: `.xls` 文件路径。
+
+    Returns:
+        `(time_min, columns)`。
+
+    Raises:
+        xlrd.XLRDError / OSError: 工作簿无法打开时抛出。
+    """
+
+    book = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        header = [str(h).strip() for h in sheet.row_values(0)]
+
+        def idx(label: str) -> int | None:
+            for i, h in enumerate(header):
+                if h.startswith(label):
+                    return i
+            return None
+
+        n = max(sheet.nrows - 1, 0)
+        i_time = idx(TIME_HEADER)
+        raw_time = sheet.col_values(i_time, 1) if i_time is not None else [None] * n
+        keep = np.array([isinstance(t, str) and bool(t.strip()) for t in raw_time], dtype=bool)
+        times = np.array([t.strip() for t, k in zip(raw_time, keep) if k], dtype="datetime64[m]")
+
+        columns: Dict[str, np.ndarray] = {}
+        for name, label in SCHOOL_COLUMNS.items():
+            i = idx(label)
+            if i is None:
+                columns[name] = np.full(int(keep.sum()), np.nan, dtype=np.float32)
+                continue
+            columns[name] = _column_to_float32(sheet.col_values(i, 1), degree=name in DEGREE_COLUMNS)[keep]
+    finally:
+        book.release_resources()
+    return times.astype(np.int64), columns
+
+
+def _read_workbook_safe(path: str) -> Tuple[str, Optional[Tuple[np.ndarray, Dict[str, np.ndarray]]], Optional[str]]:
+    try:
+        return path, read_school_workbook(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def list_workbooks(dir_path: str) -> List[str]:
+    """按文件名顺序列出目录下的 `.xls` 工作簿（目录不存在时为空）。"""
+
+    if not os.path.isdir(dir_path):
+        return []
+    return [os.path.join(dir_path, n) for n in sorted(os.listdir(dir_path)) if n.lower().endswith(".xls")]
+
+
+def decode_workbooks(
+    paths: Sequence[str], workers: Optional[int] = None
+) -> List[Tuple[str, Tuple[np.ndarray, Dict[str, np.ndarray]]]]:
+    """并行解码多个工作簿，按传入顺序返回成功解码的 `(path, (time_min, columns))`。
+
+    无法打开的工作簿打印警告后跳过，不影响其余文件。
+
+    Args:
+        paths: 工作簿路径。
+        workers: 并行进程数；缺省为 `min(CPU 数, 文件数)`，为 1 时在当前进程顺序解码。
+    """
+
+    workers = workers or min(os.cpu_count() or 1, len(paths))
+    if workers > 1 and len(paths) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_read_workbook_safe, paths))
+    else:
+        results = [_read_workbook_safe(p) for p in paths]
+
+    decoded_ok = []
+    for path, decoded, err in results:
+        if decoded is None:
+            print(f"警告：无法打开 {path} -> {err}")
+            continue
+        decoded_ok.append((path, decoded))
+    return decoded_ok
+
+
+def load_school_table(dir_path: str, station: Optional[str] = None, workers: Optional[int] = None) -> SchoolTable:
+    """并行解码目录下全部 `.xls` 工作簿，按文件名顺序拼接为列式表。
+
+    无法打开的工作簿打印警告后跳过，不影响其余文件（见 `decode_workbooks`）。
+
+    Args:
+        dir_path: 站点数据目录（如 `data/data/曹杨中学`）。
+        station: 站点名；缺省为目录名。
+        workers: 并行进程数；缺省为 `min(CPU 数, 文件数)`，为 1 时在当前进程顺序解码。
+
+    Returns:
+        列式表（目录不存在时为空表）。
+    """
+
+    label = station or os.path.basename(os.path.normpath(dir_path))
+    tables: List[SchoolTable] = []
+    for _, (time_min, columns) in decode_workbooks(list_workbooks(dir_path), workers=workers):
+        tables.append(SchoolTable(time_min, columns, np.zeros(time_min.size, dtype=np.uint16), [label]))
+    return SchoolTable.concat(tables)
@@ -0,0 +1,313 @@
+"""列式年序列容器：以并行数组代替逐行数据类对象。
+
+`ColumnarSeries` 保存：
+- `years`：int64 年份数组；
+- `values`：float64 数值数组；
+- `site_codes` / `site_labels`：可选样点列，按类别编码存储（uint16 编码 + 标签表）。
+
+每个序列关联一个记录数据类（如 `AnnualTempRecord`），迭代或下标访问时按需
+构造记录对象，以兼容按记录读取的既有代码；批量计算（按年分组均值、年份对齐等）
+直接在数组上向量化完成，不再为每行分配对象。
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import struct
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+
+
+SERIES_MAGIC = b"CGCS1\n"
+
+
+def group_mean(keys: Sequence[int], values: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """按键分组求均值（向量化）。
+
+    `np.bincount` 按输入顺序逐项累加，与逐组 `sum(vals) / len(vals)` 的浮点结果一致。
+
+    Args:
+        keys: 分组键（如年份）。
+        values: 与键等长的数值。
+
+    Returns:
+        `(unique_keys, means)`：升序的唯一键与对应均值。
+    """
+
+    keys_arr = np.asarray(keys, dtype=np.int64)
+    values_arr = np.asarray(values, dtype=np.float64)
+    if keys_arr.size == 0:
+        return keys_arr, values_arr
+    unique_keys, inverse = np.unique(keys_arr, return_inverse=True)
+    sums = np.bincount(inverse, weights=values_arr)
+    counts = np.bincount(inverse)
+    return unique_keys, sums / counts
+
+
+class ColumnarSeries:
+    """列式年序列（年份/数值并行数组 + 可选样点类别列）。
+
+    Attributes:
+        years: int64 年份数组。
+        values: float64 数值数组。
+        record_type: 对应的记录数据类（字段为 `year`、数值字段与可选 `site`）。
+        site_codes: 可选 uint16 样点编码数组；无样点列时为 None。
+        site_labels: 样点编码 -> 标签表。
+    """
+
+    __slots__ = ("years", "values", "record_type", "site_codes", "site_labels", "value_field")
+
+    def __init__(
+        self,
+        record_type: Type,
+        years: Sequence[int],
+        values: Sequence[float],
+        site_codes: Optional[Sequence[int]] = None,
+        site_labels: Sequence[str] = (),
+    ) -> None:
+        """构造序列。
+
+        Args:
+            record_type: 记录数据类类型。
+            years: 年份序列。
+            values: 数值序列（与年份等长）。
+            site_codes: 可选样点编码序列。
+            site_labels: 样点标签表。
+
+        Raises:
+            ValueError: 列长度不一致时抛出。
+        """
+
+        self.record_type = record_type
+        self.years = np.asarray(years, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.site_codes = None if site_codes is None else np.asarray(site_codes, dtype=np.uint16)
+        self.site_labels = tuple(site_labels)
+        names = [f.name for f in dataclasses.fields(record_type)]
+        self.value_field = next(n for n in names if n not in ("year", "site"))
+        if self.years.shape != self.values.shape:
+            raise ValueError("年份列与数值列长度不一致")
+        if self.site_codes is not None and self.site_codes.shape != self.years.shape:
+            raise ValueError("样点列与年份列长度不一致")
+
+    # ---------- 构造 ----------
+
+    @classmethod
+    def from_columns(
+        cls,
+        record_type: Type,
+        years: Sequence[int],
+        values: Sequence[float],
+        sites: Optional[Sequence[str]] = None,
+        site: Optional[str] = None,
+    ) -> "ColumnarSeries":
+        """由列数据构造序列，样点标签自动编码。
+
+        Args:
+            record_type: 记录数据类类型。
+            years: 年份序列。
+            values: 数值序列。
+            sites: 逐行样点标签（与 `site` 二选一）。
+            site: 全部行共用的单一样点标签。
+
+        Returns:
+            列式序列。
+        """
+
+        if site is not None:
+            n = len(years)
+            return cls(record_type, years, values, np.zeros(n, dtype=np.uint16), (site,))
+        if sites is None:
+            return cls(record_type, years, values)
+        table: Dict[str, int] = {}
+        codes = [table.setdefault(s, len(table)) for s in sites]
+        return cls(record_type, years, values, codes, list(table))
+
+    @classmethod
+    def from_records(cls, records: Sequence, record_type: Type) -> "ColumnarSeries":
+        """由记录对象列表构造序列。"""
+
+        names = [f.name for f in dataclasses.fields(record_type)]
+        value_field = next(n for n in names if n not in ("year", "site"))
+        years = [r.year for r in records]
+        values = [getattr(r, value_field) for r in records]
+        sites = [r.site for r in records] if "site" in names else None
+        return cls.from_columns(record_type, years, values, sites=sites)
+
+    # ---------- 记录视图 ----------
+
+    def __len__(self) -> int:
+        return int(self.years.size)
+
+    def _record(self, year: int, value: float, code: Optional[int]):
+        kwargs = {"year": year, self.value_field: value}
+        if code is not None:
+            kwargs["site"] = self.site_labels[code]
+        return self.record_type(**kwargs)
+
+    def __iter__(self) -> Iterator:
+        codes = self.site_codes.tolist() if self.site_codes is not None else [None] * len(self)
+        for year, value, code in zip(self.years.tolist(), self.values.tolist(), codes):
+            yield self._record(year, value, code)
+
+    def __getitem__(self, i: int):
+        code = int(self.site_codes[i]) if self.site_codes is not None else None
+        return self._record(int(self.years[i]), float(self.values[i]), code)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ColumnarSeries):
+            return NotImplemented
+        return (
+            self.record_type is other.record_type
+            and np.array_equal(self.years, other.years)
+            and np.array_equal(self.values, other.values, equal_nan=True)
+            and self.sites() == other.sites()
+        )
+
+    def __repr__(self) -> str:
+        return f"ColumnarSeries({self.record_type.__name__}, n={len(self)})"
+
+    def sites(self) -> Optional[List[str]]:
+        """返回逐行样点标签列表；无样点列时返回 None。"""
+
+        if self.site_codes is None:
+            return None
+        labels = self.site_labels
+        return [labels[c] for c in self.site_codes.tolist()]
+
+    def pairs(self) -> List[Tuple[int, float]]:
+        """返回 `(year, value)` 列表。"""
+
+        return list(zip(self.years.tolist(), self.values.tolist()))
+
+    # ---------- 向量化运算 ----------
+
+    def align(self, other: "ColumnarSeries") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """按年份内连接两个序列（两侧年份须唯一）。
+
+        Args:
+            other: 另一序列。
+
+        Returns:
+            `(years, self_values, other_values)`：升序共同年份及两侧对应数值。
+        """
+
+        common, i_self, i_other = np.intersect1d(self.years, other.years, assume_unique=True, return_indices=True)
+        return common, self.values[i_self], other.values[i_other]
+
+    # ---------- 二进制序列化 ----------
+
+    def to_bytes(self) -> bytes:
+        """编码为紧凑二进制：魔数 + 头长度 + JSON 头 + 小端 int64/float64/uint16 列。"""
+
+        header = json.dumps(
+            {
+                "n": len(self),
+                "record_type": self.record_type.__name__,
+                "has_sites": self.site_codes is not None,
+                "site_labels": list(self.site_labels),
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        parts = [SERIES_MAGIC, struct.pack("<I", len(header)), header]
+        parts.append(self.years.astype("<i8", copy=False).tobytes())
+        parts.append(self.values.astype("<f8", copy=False).tobytes())
+        if self.site_codes is not None:
+            parts.append(self.site_codes.astype("<u2", copy=False).tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes, record_type: Type) -> "ColumnarSeries":
+        """由 `to_bytes` 的结果还原序列。
+
+        各列复制为独立的可写数组（不引用 `blob`），与现场解析得到的序列行为一致：
+        解析缓存命中与否，调用方都可以就地修改。
+
+        Raises:
+            ValueError: 魔数或记录类型不匹配时抛出。
+        """
+
+        if not blob.startswith(SERIES_MAGIC):
+            raise ValueError("序列二进制魔数不匹配")
+        offset = len(SERIES_MAGIC)
+        (header_len,) = struct.unpack_from("<I", blob, offset)
+        offset += 4
+        header = json.loads(blob[offset : offset + header_len].decode("utf-8"))
+        offset += header_len
+        if header["record_type"] != record_type.__name__:
+            raise ValueError("序列二进制记录类型不一致")
+        n = header["n"]
+        years = np.frombuffer(blob, dtype="<i8", count=n, offset=offset).astype(np.int64)
+        offset += 8 * n
+        values = np.frombuffer(blob, dtype="<f8", count=n, offset=offset).astype(np.float64)
+        offset += 8 * n
+        codes = None
+        if header["has_sites"]:
+            codes = np.frombuffer(blob, dtype="<u2", count=n, offset=offset).astype(np.uint16)
+        return cls(record_type, years, values, codes, header["site_labels"])
+
+
+WINDOW_AGGREGATES = ("mean", "median", "count")
+
+
+def window_join(
+    left_years: Sequence[int],
+    right_years: Sequence[int],
+    right_values: Sequence[float],
+    radius: int,
+    agg: str = "mean",
+    min_coverage: float = 0.0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """窗口聚合连接：对每个左侧年份，聚合右侧落在 `[year - radius, year + radius]` 内的数值。
+
+    右侧按年份排序一次后，以二分查找（`np.searchsorted`）确定每个窗口的上下界，
+    均值由前缀和相减得到；整体复杂度 O((n + m) log m)，与窗口半径无关。
+    右侧缺失值（NaN）在排序前剔除。
+
+    Args:
+        left_years: 左侧年份（如 NGRIP 20 年分辨率样点年份），无需有序。
+        right_years: 右侧年份（如 ITRDB 年序列）。
+        right_values: 右侧数值。
+        radius: 窗口半径（年），窗口为闭区间。
+        agg: 聚合方式：`mean` / `median` / `count`。
+        min_coverage: 最小覆盖率：窗口内样本数占窗口年数（`2 * radius + 1`）的比例下限；
+            默认 0 表示至少 1 个样本即可。
+
+    Returns:
+        `(values, counts)`：与左侧等长的聚合值（覆盖不足时为 NaN；`count` 聚合返回样本数）
+        与窗口内样本数。
+
+    Raises:
+        ValueError: 未知聚合方式。
+    """
+
+    if agg not in WINDOW_AGGREGATES:
+        raise ValueError(f"未知聚合方式: {agg}（可选 {', '.join(WINDOW_AGGREGATES)}）")
+    left = np.asarray(left_years, dtype=np.int64)
+    r_years = np.asarray(right_years, dtype=np.int64)
+    r_vals = np.asarray(right_values, dtype=np.float64)
+    keep = ~np.isnan(r_vals)
+    order = np.argsort(r_years[keep], kind="stable")
+    r_years = r_years[keep][order]
+    r_vals = r_vals[keep][order]
+
+    lo = np.searchsorted(r_years, left - radius, side="left")
+    hi = np.searchsorted(r_years, left + radius, side="right")
+    counts = hi - lo
+    need = max(1, int(np.ceil(min_coverage * (2 * radius + 1))))
+    ok = counts >= need
+
+    out = np.full(left.size, np.nan)
+    if agg == "count":
+        out[ok] = counts[ok]
+    elif agg == "mean":
+        csum = np.concatenate(([0.0], np.cumsum(r_vals)))
+        out[ok] = (csum[hi[ok]] - csum[lo[ok]]) / counts[ok]
+    else:
+        for i in np.flatnonzero(ok):
+            out[i] = np.median(r_vals[lo[i] : hi[i]])
+    return out, counts
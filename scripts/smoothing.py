@@ -0,0 +1,145 @@
+"""向量化滑动平滑：前缀和（尾随窗口）与卷积（居中窗口）。
+
+支持的窗口核：
+- `trailing`：尾随均匀窗口（当前项及之前 `window-1` 项），与第12课原有滑动均值一致；
+- `centered`：居中均匀窗口（偶数窗口向过去多取一项）；
+- `gaussian`：居中高斯加权窗口（默认 σ = window / 6，窗口约覆盖 ±3σ）；
+- `triangular`：居中三角加权窗口。
+
+缺失值（NaN）不参与计算；窗口内有效值少于 `min_periods` 时结果为 NaN。
+尾随窗口基于累计和，单次 O(n)；居中窗口（均匀与加权）基于 `np.convolve`，复杂度 O(n·w)
+但全部在 C 层完成，且窗口内求和顺序固定，结果不受序列前部数值量级影响。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+
+
+KERNELS = ("trailing", "centered", "gaussian", "triangular")
+
+
+def kernel_weights(window: int, kernel: str, sigma: float | None = None) -> np.ndarray:
+    """返回居中加权窗口的权重（长度为 `window`）。
+
+    Args:
+        window: 窗口长度。
+        kernel: `centered` / `gaussian` / `triangular`。
+        sigma: 高斯核标准差（年）；缺省为 `window / 6`。
+
+    Returns:
+        未归一化的权重数组。
+
+    Raises:
+        ValueError: 未知窗口核。
+    """
+
+    if kernel == "centered":
+        return np.ones(window)
+    # 相对窗口几何中心的偏移（偶数窗口为半整数），保证权重左右对称
+    offsets = np.arange(window) - (window - 1) / 2.0
+    if kernel == "gaussian":
+        sd = sigma if sigma else window / 6.0
+        return np.exp(-0.5 * (offsets / sd) ** 2)
+    if kernel == "triangular":
+        return (window + 1) / 2.0 - np.abs(offsets)
+    raise ValueError(f"未知窗口核: {kernel}（可选 {', '.join(KERNELS)}）")
+
+
+def _trailing_sums(filled: np.ndarray, valid: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """基于累计和计算尾随窗口内的数值和与有效项数。"""
+
+    n = filled.size
+    csum = np.concatenate(([0.0], np.cumsum(filled)))
+    ccnt = np.concatenate(([0], np.cumsum(valid)))
+    idx = np.arange(n)
+    lo = np.maximum(0, idx - window + 1)
+    return csum[idx + 1] - csum[lo], ccnt[idx + 1] - ccnt[lo]
+
+
+def _centered_convolve(a: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """居中窗口卷积：输出位置 i 对应输入 `[i - w//2, i - w//2 + w - 1]`（越界视为 0）。"""
+
+    w = weights.size
+    start = w - 1 - w // 2
+    return np.convolve(a, weights[::-1], mode="full")[start : start + a.size]
+
+
+def rolling_mean(
+    values: Sequence[float],
+    window: int,
+    kernel: str = "trailing",
+    min_periods: int = 1,
+    sigma: float | None = None,
+) -> np.ndarray:
+    """计算滑动（加权）平均。
+
+    Args:
+        values: 等间隔数值序列（允许 NaN 表示缺失）。
+        window: 窗口长度（项数，>= 1）。
+        kernel: 窗口核，见 `KERNELS`。
+        min_periods: 窗口内至少需要的有效项数，不足时输出 NaN。
+        sigma: 高斯核标准差（仅 `gaussian` 使用）。
+
+    Returns:
+        与输入等长的 float64 数组。
+
+    Raises:
+        ValueError: 窗口长度非法或窗口核未知。
+    """
+
+    if window < 1:
+        raise ValueError("窗口长度须 >= 1")
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.size == 0:
+        return arr.copy()
+    valid = ~np.isnan(arr)
+    filled = np.where(valid, arr, 0.0)
+
+    if kernel == "trailing":
+        sums, counts = _trailing_sums(filled, valid, window)
+        weight_sums = counts.astype(np.float64)
+    else:
+        weights = kernel_weights(window, kernel, sigma)
+        valid_f = valid.astype(np.float64)
+        sums = _centered_convolve(filled, weights)
+        weight_sums = _centered_convolve(valid_f, weights)
+        counts = np.rint(_centered_convolve(valid_f, np.ones(window))).astype(np.int64)
+
+    out = np.full(arr.size, np.nan)
+    ok = (counts >= max(1, min_periods)) & (weight_sums > 0)
+    out[ok] = sums[ok] / weight_sums[ok]
+    return out
+
+
+def multi_window(
+    values: Sequence[float],
+    windows: Sequence[int],
+    kernel: str = "trailing",
+    min_periods: int | None = None,
+) -> List[np.ndarray]:
+    """一次调用计算多个窗口长度的平滑结果（如第12课 5/11/31 年三档平滑）。
+
+    相同的窗口长度只计算一次（如低分辨率序列上多档年窗口换算为同一项数）。
+
+    Args:
+        values: 等间隔数值序列。
+        windows: 窗口长度列表（项数）。
+        kernel: 窗口核。
+        min_periods: 最少有效项数；缺省为各窗口长度的一半（向上取整）。
+
+    Returns:
+        与 `windows` 一一对应的平滑结果数组。
+    """
+
+    arr = np.asarray(values, dtype=np.float64)
+    computed: Dict[int, np.ndarray] = {}
+    for w in windows:
+        if w not in computed:
+            mp = min_periods if min_periods is not None else (w + 1) // 2
+            computed[w] = rolling_mean(arr, w, kernel=kernel, min_periods=mp)
+    return [computed[w] for w in windows]
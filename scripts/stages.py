@@ -0,0 +1,235 @@
+"""基于生成器的流水线阶段：解析 → 过滤 → 变换 → 汇出，内存占用有界。
+
+原解析器与课程生成函数先把全部记录物化为列表、拼接后整体排序，再一次性拼出 CSV 文本；
+远大于样例的 GMSL / 古气候文件在小内存构建机上难以处理。这里提供：
+
+- `Pipeline`：包装任意可迭代源，`filter` / `map` / `sorted` 均惰性组合，`sink` 时才逐条拉取；
+- `external_sort`：外部归并排序。每 `run_rows` 条记录在内存中排序为一个有序段，超过一段时
+  溢写到临时文件（pickle 分批），最后以 `heapq.merge` 多路归并；同键记录保持输入顺序，结果
+  与整体 `sorted` 一致；
+- `csv_chunks` / `csv_sink`：按批编码 CSV 行并经 `output_txn.write_output_stream` 写入暂存文件；
+- `grouped_mean_batches`：按批向量化分组求均值，同一键跨批时把该键的记录留到下一批，
+  键有序输入时与整体 `series.group_mean` 逐位一致。
+
+环境变量 `CG_SORT_RUN_ROWS` 可覆盖默认有序段长度（子进程同样生效），便于在小样例上演练溢写路径。
+"""
+
+from __future__ import annotations
+
+import csv
+import heapq
+import io
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from lazy_imports import lazy_module
+from output_txn import write_output_stream
+
+np = lazy_module("numpy")
+
+T = TypeVar("T")
+
+DEFAULT_SORT_RUN_ROWS = 200_000
+SPILL_BATCH_ROWS = 4096
+CSV_FLUSH_ROWS = 4096
+
+
+def sort_run_rows() -> int:
+    """外部排序的有序段长度（`CG_SORT_RUN_ROWS` 优先）。"""
+
+    try:
+        return max(1, int(os.environ.get("CG_SORT_RUN_ROWS", "")))
+    except ValueError:
+        return DEFAULT_SORT_RUN_ROWS
+
+
+class Pipeline:
+    """惰性记录流水线。
+
+    各阶段只组合生成器，不拉取数据；`sink` 或迭代时逐条流过全部阶段。
+    """
+
+    __slots__ = ("_rows",)
+
+    def __init__(self, source: Iterable) -> None:
+        self._rows = iter(source)
+
+    def __iter__(self) -> Iterator:
+        return self._rows
+
+    def filter(self, predicate: Callable[[object], bool]) -> "Pipeline":
+        """只保留 `predicate` 为真的记录。"""
+
+        return Pipeline(r for r in self._rows if predicate(r))
+
+    def map(self, fn: Callable[[object], object]) -> "Pipeline":
+        """逐条变换记录。"""
+
+        return Pipeline(map(fn, self._rows))
+
+    def sorted(self, key: Callable[[object], object], run_rows: Optional[int] = None) -> "Pipeline":
+        """按 `key` 稳定排序（外部归并排序，见 `external_sort`）。"""
+
+        return Pipeline(external_sort(self._rows, key, run_rows))
+
+    def sink(self, consumer: Callable[[Iterator], T]) -> T:
+        """将记录流交给汇出函数（如 `csv_sink(...)`），返回其结果。"""
+
+        return consumer(self._rows)
+
+
+def _spill(run: List, directory: str, index: int) -> str:
+    """将一个有序段分批 pickle 写入临时文件。"""
+
+    path = os.path.join(directory, f"run-{index:06d}.pkl")
+    with open(path, "wb") as f:
+        for i in range(0, len(run), SPILL_BATCH_ROWS):
+            pickle.dump(run[i : i + SPILL_BATCH_ROWS], f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_run(path: str) -> Iterator:
+    """逐批读回有序段（每次只持有一批）。"""
+
+    with open(path, "rb") as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+
+def external_sort(
+    rows: Iterable[T],
+    key: Callable[[T], object],
+    run_rows: Optional[int] = None,
+    tmp_dir: Optional[str] = None,
+) -> Iterator[T]:
+    """外部归并排序（稳定）。
+
+    输入不超过一个有序段时直接在内存中排序，不产生临时文件；否则内存中最多同时持有一个
+    有序段与每段一批归并缓冲。临时文件在迭代结束（或生成器被关闭）时删除。
+
+    Args:
+        rows: 记录（须可 pickle）。
+        key: 排序键。
+        run_rows: 每个有序段的记录数；缺省见 `sort_run_rows`。
+        tmp_dir: 溢写目录的父目录；缺省为系统临时目录。
+
+    Yields:
+        按键升序的记录。
+    """
+
+    run_rows = run_rows or sort_run_rows()
+    it = iter(rows)
+    first: List[T] = []
+    for row in it:
+        first.append(row)
+        if len(first) >= run_rows:
+            break
+    else:
+        first.sort(key=key)
+        yield from first
+        return
+
+    directory = tempfile.mkdtemp(prefix="cg-sort-", dir=tmp_dir)
+    try:
+        first.sort(key=key)
+        paths = [_spill(first, directory, 0)]
+        del first
+        run: List[T] = []
+        for row in it:
+            run.append(row)
+            if len(run) >= run_rows:
+                run.sort(key=key)
+                paths.append(_spill(run, directory, len(paths)))
+                run = []
+        if run:
+            run.sort(key=key)
+            paths.append(_spill(run, directory, len(paths)))
+            del run
+        # heapq.merge 对相等键按输入序列顺序产出，有序段按输入顺序排列，故整体保持稳定
+        yield from heapq.merge(*(_read_run(p) for p in paths), key=key)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def csv_chunks(header: Sequence[str], rows: Iterable[Sequence[object]], flush_rows: int = CSV_FLUSH_ROWS) -> Iterator[bytes]:
+    """按批将 CSV 行编码为 UTF-8 字节块（拼接结果与一次性 `csv.writer` 输出逐字节相同）。"""
+
+    buf = io.StringIO(newline="")
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= flush_rows:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    yield buf.getvalue().encode("utf-8")
+
+
+def csv_sink(path: str, header: Sequence[str], backup: bool = True) -> Callable[[Iterable[Sequence[object]]], str]:
+    """返回 CSV 汇出函数：消费记录流并写出到 `path`（原子替换，内容未变化时跳过）。"""
+
+    def consume(rows: Iterable[Sequence[object]]) -> str:
+        write_output_stream(path, csv_chunks(header, rows), backup=backup)
+        return path
+
+    return consume
+
+
+def grouped_mean_batches(batches: Iterable[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """逐批按键分组求均值，内存占用为一批数据加各组累计量。
+
+    每批末尾键（可能延续到下一批）的记录暂留并入下一批，故键有序的输入中每组都在同一批内
+    一次累加，结果与整体 `series.group_mean` 逐位一致；键无序时跨批出现的组累计求和，
+    仅在末位舍入上可能不同。
+
+    Args:
+        batches: `(keys, values)` 批次（int64 键与 float64 数值）。
+
+    Returns:
+        `(unique_keys, means)`：升序的唯一键与对应均值。
+    """
+
+    key_parts: List[np.ndarray] = []
+    sum_parts: List[np.ndarray] = []
+    count_parts: List[np.ndarray] = []
+    carry_keys = np.empty(0, dtype=np.int64)
+    carry_values = np.empty(0)
+
+    def reduce(keys: np.ndarray, values: np.ndarray) -> None:
+        if keys.size == 0:
+            return
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        key_parts.append(unique_keys)
+        sum_parts.append(np.bincount(inverse, weights=values))
+        count_parts.append(np.bincount(inverse))
+
+    for keys, values in batches:
+        keys = np.concatenate([carry_keys, np.asarray(keys, dtype=np.int64)])
+        values = np.concatenate([carry_values, np.asarray(values, dtype=np.float64)])
+        if keys.size == 0:
+            continue
+        tail = keys == keys[-1]
+        carry_keys, carry_values = keys[tail], values[tail]
+        reduce(keys[~tail], values[~tail])
+    reduce(carry_keys, carry_values)
+
+    if not key_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    if len(key_parts) == 1:
+        return key_parts[0], sum_parts[0] / count_parts[0]
+    all_keys = np.concatenate(key_parts)
+    unique_keys, inverse = np.unique(all_keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=np.concatenate(sum_parts))
+    counts = np.bincount(inverse, weights=np.concatenate(count_parts))
+    return unique_keys, sums / counts